@@ -1,10 +1,21 @@
+import os
+import asyncio
 from fastapi import FastAPI
-from .routes import analyze_optimized
+from starlette.middleware.gzip import GZipMiddleware
+from .routes import analyze_optimized, admin
+from .modules import retention, repository, profiler, artifacts, embedding_store, report_state
+from .modules.rag_ultra_fast import ultra_inserter, ultra_processor
+from .modules.rag_optimized import processor
 from dotenv import load_dotenv
 
 # .env dosyasını yükle
 load_dotenv()
 
+# Bu boyutun (byte) üzerindeki yanıtlar sıkıştırılır
+COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+# Başlangıçta embedding modellerini ısıt ve batch bütçesini ölç (0 = kapalı)
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "1") != "0"
+
 # Uygulamayı başlat
 app = FastAPI(
     title="AI Service - Hızlandırılmış Versiyon",
@@ -12,12 +23,72 @@ app = FastAPI(
     version="2.0.0"
 )
 
+# Yanıt sıkıştırma - brotli-asgi kuruluysa brotli (gzip fallback), değilse gzip
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+# "Sonraki N istek" profil modu için istek sayacı (oturum yokken maliyetsiz)
+app.add_middleware(profiler.RequestTracker)
+
 # Hızlandırılmış route'lar (önerilen)
 app.include_router(analyze_optimized.router, prefix="/analyze", tags=["Analyze-Fast"])
 
+# Admin route'ları (X-Admin-Key gerekli)
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+
+
+@app.on_event("startup")
+async def start_retention_sweeper():
+    """Süresi dolmuş raporları periyodik temizleyen arka plan görevi"""
+    app.state.retention_task = asyncio.create_task(retention.sweeper_loop())
+
+
+@app.on_event("startup")
+async def check_embedding_store():
+    """Embedding shard store açıksa dizinin kalıcı ve yazılabilir olduğunu doğrula (değilse kapatılır)"""
+    embedding_store.validate()
+
+
+@app.on_event("startup")
+async def start_artifact_workers():
+    """Embedding sonrası dashboard/AI yanıtlarını hazırlayan sınırlı worker havuzu"""
+    artifacts.start_workers()
+
+
+@app.on_event("startup")
+async def warm_up_encoders():
+    """Model init/kernel warm-up ve batch bütçesi ölçümü arka planda - worker hemen istek kabul eder,
+    ölçüm bitene kadar varsayılan bütçe kullanılır; ölçüm makine başına bir kez yapılıp paylaşılır"""
+    if not EMBEDDING_WARMUP:
+        return
+    app.state.encoder_warmup_task = asyncio.create_task(_warm_up_encoders())
+
+
+async def _warm_up_encoders():
+    loop = asyncio.get_event_loop()
+    try:
+        app.state.encoder_warmup = await loop.run_in_executor(None, ultra_processor.batcher.warm_up)
+        if processor.model is not ultra_processor.model:
+            # Sorgu encoder'ı tek/az metin encode eder - ölçüm gerekmez
+            await loop.run_in_executor(None, processor.batcher.warm_up, False)
+    except Exception as e:
+        print(f"⚠️ Encoder warm-up hatası: {e}")
+
+
+@app.on_event("shutdown")
+async def close_insert_pool():
+    """Artifact worker'larını, kalıcı insert bağlantılarını ve async DB havuzunu kapat"""
+    await artifacts.stop_workers()
+    ultra_inserter.close()
+    await repository.close_pool()
+
 
 
 # Basit healthcheck route’u ekleyelim
 @app.get("/")
 async def root():
-    return {"status": "ok", "message": "AI Service çalışıyor"}
\ No newline at end of file
+    return {"status": "ok", "message": "AI Service çalışıyor",
+            "shared_state": "degraded" if report_state.degraded() else "ok"}
\ No newline at end of file
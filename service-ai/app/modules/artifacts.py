@@ -0,0 +1,107 @@
+import os
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+from . import repository
+from .serialization import dumps
+
+# Warm-up kuyruğu: en fazla bu kadar token bekler, dolarsa yeni iş atlanır (upload'lar yavaşlamaz)
+QUEUE_SIZE = int(os.getenv("ARTIFACT_QUEUE_SIZE", "8"))
+# Aynı anda çalışan warm-up işi (Gemini kotasını ve encoder executor'ını korur)
+WORKERS = int(os.getenv("ARTIFACT_WORKERS", "1"))
+# Process başına bellekte tutulan artifact sayısı
+MEMORY_CACHE_SIZE = 256
+
+GET_ARTIFACT_SQL = """
+    SELECT payload::text
+    FROM report_artifacts
+    WHERE token = $1 AND name = $2 AND file_hash = $3
+"""
+PUT_ARTIFACT_SQL = """
+    INSERT INTO report_artifacts (token, name, file_hash, payload)
+    VALUES ($1, $2, $3, $4::jsonb)
+    ON CONFLICT (token, name) DO UPDATE
+    SET file_hash = EXCLUDED.file_hash, payload = EXCLUDED.payload, created_at = CURRENT_TIMESTAMP
+"""
+
+# (token, name, file_hash) -> JSON byte'ları
+_memory: "OrderedDict[tuple, bytes]" = OrderedDict()
+_queue: Optional[asyncio.Queue] = None
+_workers = []
+
+
+def _remember(key: tuple, body: bytes):
+    _memory[key] = body
+    _memory.move_to_end(key)
+    if len(_memory) > MEMORY_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+async def get(token: str, name: str, file_hash: Optional[str]) -> Optional[bytes]:
+    """Hazır yanıt gövdesi (JSON) - önce process belleği, sonra report_artifacts tablosu"""
+    if not token or not file_hash:
+        return None
+    key = (token, name, file_hash)
+    body = _memory.get(key)
+    if body is not None:
+        _memory.move_to_end(key)
+        return body
+    try:
+        pool = await repository.get_pool()
+        payload = await pool.fetchval(GET_ARTIFACT_SQL, token, name, file_hash)
+    except Exception as e:
+        print(f"⚠️ Artifact okunamadı ({name}): {e}")
+        return None
+    if payload is None:
+        return None
+    body = payload.encode("utf-8")
+    _remember(key, body)
+    return body
+
+
+async def put(token: str, name: str, file_hash: str, payload) -> bytes:
+    body = dumps(payload)
+    _remember((token, name, file_hash), body)
+    pool = await repository.get_pool()
+    await pool.execute(PUT_ARTIFACT_SQL, token, name, file_hash, body.decode("utf-8"))
+    return body
+
+
+def submit(job, *args) -> bool:
+    """Warm-up işini sınırlı kuyruğa ekle; kuyruk doluysa veya worker yoksa False"""
+    if _queue is None:
+        return False
+    try:
+        _queue.put_nowait((job, args))
+        return True
+    except asyncio.QueueFull:
+        print("⚠️ Artifact warm-up kuyruğu dolu, iş atlandı")
+        return False
+
+
+async def _worker_loop():
+    while True:
+        job, args = await _queue.get()
+        try:
+            await job(*args)
+        except Exception as e:
+            print(f"❌ Artifact warm-up hatası: {e}")
+        finally:
+            _queue.task_done()
+
+
+def start_workers():
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        _workers.extend(asyncio.create_task(_worker_loop()) for _ in range(WORKERS))
+
+
+async def stop_workers():
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import tempfile
+import contextlib
+from typing import List, Optional
+
+import numpy as np
+import torch
+
+try:
+    import psutil
+except ImportError:  # opsiyonel - yoksa CPU bellek sınırı uygulanmaz
+    psutil = None
+
+try:
+    import fcntl
+except ImportError:  # Windows - ölçüm worker'lar arasında kilitlenmez
+    fcntl = None
+
+# Sabit token bütçesi (batch_size * en uzun metin); 0 ise warm-up'ta ölçülür
+ENCODE_TOKEN_BUDGET = int(os.getenv("ENCODE_TOKEN_BUDGET", "0"))
+# Ölçülmeden önce kullanılan bütçe
+DEFAULT_TOKEN_BUDGET = 8192
+# Warm-up sırasında denenecek bütçeler (throughput artışı durunca durulur)
+CANDIDATE_BUDGETS = (2048, 4096, 8192, 16384, 32768, 65536)
+# Bir bütçe ancak bu oranda daha hızlıysa tercih edilir
+MIN_SPEEDUP = 1.05
+# Boş belleğin batch aktivasyonları için kullanılabilecek kısmı
+MEMORY_FRACTION = float(os.getenv("ENCODE_MEMORY_FRACTION", "0.5"))
+# Tek batch'te en fazla metin
+MAX_BATCH_SIZE = int(os.getenv("ENCODE_MAX_BATCH_SIZE", "1024"))
+# Ölçüm yapılamazsa token başına aktivasyon tahmini için güvenlik çarpanı
+ACTIVATION_SAFETY = 4
+# Ölçülen bütçeler (model@cihaz -> sonuç) - aynı makinedeki worker'lar ölçümü tekrarlamaz
+CALIBRATION_FILE = os.getenv("ENCODE_CALIBRATION_FILE", os.path.join(tempfile.gettempdir(), "encoder_calibration.json"))
+
+_SAMPLE_COUNTIES = ["Kadıköy", "Beşiktaş", "Üsküdar", "Şişli", "Bağcılar", "Esenyurt", "Sarıyer", "Fatih"]
+
+
+def representative_texts(count: int = 1024) -> List[str]:
+    """Warm-up için gerçek dokümanlara benzeyen metinler (satır ve rollup formatında)"""
+    rng = np.random.default_rng(0)
+    texts = []
+    for i in range(count):
+        county = _SAMPLE_COUNTIES[i % len(_SAMPLE_COUNTIES)]
+        day = f"2024-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}"
+        if i % 8 == 0:
+            texts.append(
+                f"Dönem:{day[:7]}, İlçe:{county}, Abone:{rng.integers(1000, 90000)}, Kayıt:{rng.integers(20, 900)}, "
+                f"Ortalama:{rng.uniform(5, 90):.1f}, Min:1, Max:{rng.integers(100, 999)}, Pay:%{rng.uniform(1, 20):.1f}, "
+                f"Yabancı:{rng.integers(100, 9000)}, Yerli:{rng.integers(1000, 80000)}"
+            )
+        else:
+            kind = "Yerli" if i % 3 else "Yabancı"
+            texts.append(f"Tarih:{day}, İlçe:{county}, Abone:{rng.integers(1, 500)}, Tip:{kind}")
+    return texts
+
+
+@contextlib.contextmanager
+def _calibration_lock():
+    """Makine genelinde tek ölçüm - kilidi bekleyen worker'lar ölçüm bitince sonucu dosyadan okur"""
+    if fcntl is None:
+        yield
+        return
+    with open(CALIBRATION_FILE + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_calibration(key: str) -> Optional[dict]:
+    try:
+        with open(CALIBRATION_FILE) as f:
+            return json.load(f).get(key)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_calibration(key: str, result: dict):
+    try:
+        with open(CALIBRATION_FILE) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    saved[key] = result
+    tmp_path = f"{CALIBRATION_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(saved, f)
+    os.replace(tmp_path, CALIBRATION_FILE)
+
+
+class AdaptiveBatcher:
+    """Metinleri token uzunluğuna göre sıralayıp bellek/token bütçesine göre batch'ler, sonucu orijinal sıraya döndürür"""
+
+    def __init__(self, model, token_budget: Optional[int] = None, max_batch_size: int = MAX_BATCH_SIZE,
+                 name: str = "encoder"):
+        self.model = model
+        self.name = name
+        self.token_budget = token_budget or ENCODE_TOKEN_BUDGET or DEFAULT_TOKEN_BUDGET
+        self.max_batch_size = max_batch_size
+        self.calibrated = bool(token_budget or ENCODE_TOKEN_BUDGET)
+        self.bytes_per_token = None
+
+    @property
+    def device(self) -> str:
+        return str(getattr(self.model, "device", "cpu"))
+
+    def token_lengths(self, texts: List[str]) -> np.ndarray:
+        """Model tokenizer'ı ile (max_seq_length'e kırpılmış) token sayıları"""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        max_length = getattr(self.model, "max_seq_length", None) or 512
+        if tokenizer is not None:
+            try:
+                encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_length,
+                                    return_attention_mask=False, return_token_type_ids=False, return_length=True)
+                return np.asarray(encoded["length"], dtype=np.int64)
+            except Exception:
+                pass
+        # Tokenizer yoksa ~4 karakter / token
+        return np.minimum(np.fromiter((len(t) // 4 + 2 for t in texts), dtype=np.int64, count=len(texts)), max_length)
+
+    def plan(self, sorted_lengths: np.ndarray) -> List[tuple]:
+        """Azalan uzunluklu dizi için [start, end) batch sınırları: batch_size * en uzun <= bütçe"""
+        batches = []
+        start, total = 0, len(sorted_lengths)
+        while start < total:
+            longest = max(int(sorted_lengths[start]), 1)
+            size = max(1, min(self.max_batch_size, self.token_budget // longest))
+            batches.append((start, min(start + size, total)))
+            start += size
+        return batches
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True) -> np.ndarray:
+        """Uzunluğa göre sıralı, bütçeye göre boyutlanmış batch'lerle encode et"""
+        if not texts:
+            dimension = self.model.get_sentence_embedding_dimension()
+            return np.zeros((0, dimension), dtype=np.float32)
+
+        lengths = self.token_lengths(texts)
+        # En uzunlar önce: bellek sınırına takılacaksak ilk batch'te anlaşılır
+        order = np.argsort(-lengths, kind="stable")
+        sorted_lengths = lengths[order]
+        output = None
+
+        start = 0
+        while start < len(texts):
+            end = self.plan(sorted_lengths[start:])[0][1] + start
+            indices = order[start:end]
+            try:
+                embeddings = self.model.encode(
+                    [texts[i] for i in indices],
+                    batch_size=len(indices),
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalize_embeddings,
+                )
+            except torch.cuda.OutOfMemoryError:
+                if self.token_budget <= sorted_lengths[start]:
+                    raise
+                self.token_budget //= 2
+                torch.cuda.empty_cache()
+                print(f"⚠️ Encode bellek yetmedi, token bütçesi {self.token_budget}'e düşürüldü")
+                continue
+
+            if output is None:
+                output = np.empty((len(texts), embeddings.shape[1]), dtype=embeddings.dtype)
+            output[indices] = embeddings
+            start = end
+        return output
+
+    def _memory_token_cap(self) -> float:
+        """Boş belleğe göre izin verilen en büyük token bütçesi"""
+        if self.bytes_per_token is None:
+            return float("inf")
+        if self.device.startswith("cuda"):
+            free, _ = torch.cuda.mem_get_info()
+        elif psutil is not None:
+            free = psutil.virtual_memory().available
+        else:
+            return float("inf")
+        return free * MEMORY_FRACTION / self.bytes_per_token
+
+    def _measure_bytes_per_token(self, texts: List[str]):
+        """Token başına aktivasyon belleği: GPU'da peak ölçümü, CPU'da model boyutlarından tahmin"""
+        if self.device.startswith("cuda"):
+            lengths = self.token_lengths(texts)
+            torch.cuda.synchronize()
+            baseline = torch.cuda.memory_allocated()
+            torch.cuda.reset_peak_memory_stats()
+            self.model.encode(texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True)
+            torch.cuda.synchronize()
+            peak = torch.cuda.max_memory_allocated() - baseline
+            padded = len(texts) * int(lengths.max())
+            self.bytes_per_token = max(peak / padded, 1.0)
+            return
+
+        try:
+            config = self.model[0].auto_model.config
+            per_token = (4 * config.hidden_size + config.intermediate_size
+                         + config.num_attention_heads * (getattr(self.model, "max_seq_length", None) or 512))
+            self.bytes_per_token = per_token * 4 * ACTIVATION_SAFETY
+        except Exception:
+            self.bytes_per_token = None
+
+    def warm_up(self, calibrate: bool = True, sample_count: int = 1024) -> dict:
+        """Lazy init ve kernel warm-up'ı öde; istenirse token bütçesini ölç veya başka worker'ın ölçümünü al.
+        Ölçüm bitene kadar encode varsayılan bütçeyle çalışmaya devam eder"""
+        texts = representative_texts(sample_count)
+        start = time.time()
+        self.model.encode(texts[:64], batch_size=64, show_progress_bar=False, convert_to_numpy=True)
+        self._measure_bytes_per_token(texts[:64])
+
+        result = {"device": self.device, "warmup_seconds": round(time.time() - start, 2)}
+        if calibrate and not self.calibrated:
+            result.update(self._shared_calibration(texts))
+        result["token_budget"] = self.token_budget
+        return result
+
+    def _shared_calibration(self, texts: List[str]) -> dict:
+        key = f"{self.name}@{self.device}"
+        saved = _read_calibration(key)
+        source = "shared"
+        if saved is None:
+            with _calibration_lock():
+                # Kilidi bekleyen worker'lar burada ilk worker'ın sonucunu bulur
+                saved = _read_calibration(key)
+                if saved is None:
+                    saved = self.calibrate(texts)
+                    source = "measured"
+                    try:
+                        _write_calibration(key, saved)
+                    except OSError as e:
+                        print(f"⚠️ Encoder ölçümü kaydedilemedi: {e}")
+        self.token_budget = saved["token_budget"]
+        self.calibrated = True
+        if source == "shared":
+            print(f"🔥 Encoder bütçesi paylaşılan ölçümden ({self.device}): {self.token_budget}")
+        return {**saved, "source": source}
+
+    def calibrate(self, texts: List[str]) -> dict:
+        """En hızlı token bütçesini ölç - denemeler ayrı batcher'larla yapılır, canlı bütçe değişmez"""
+        memory_cap = self._memory_token_cap()
+        best_budget, best_rate = self.token_budget, 0.0
+        rates = {}
+        for budget in CANDIDATE_BUDGETS:
+            if budget > memory_cap:
+                break
+            probe = AdaptiveBatcher(self.model, token_budget=budget, max_batch_size=self.max_batch_size)
+            began = time.perf_counter()
+            probe.encode(texts)
+            rate = len(texts) / (time.perf_counter() - began)
+            if probe.token_budget < budget:
+                # Bellek yetmedi (bütçe yarıya indi) - daha büyük bütçeler denenmez
+                break
+            rates[budget] = round(rate, 1)
+            if rate > best_rate * MIN_SPEEDUP:
+                best_budget, best_rate = budget, rate
+            else:
+                break
+
+        print(f"🔥 Encoder warm-up ({self.device}): token bütçesi {best_budget}, {best_rate:.0f} texts/sec")
+        return {"token_budget": best_budget, "texts_per_sec": round(best_rate, 1), "measured": rates}
@@ -0,0 +1,103 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from . import query_filters, repository
+
+# Prompt'a girecek context'in token bütçesi
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# MMR: 1.0 = yalnızca alaka, 0.0 = yalnızca çeşitlilik
+MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# Seçilmiş bir kayda bu benzerliğin üzerindeki adaylar tekrar sayılıp atılır
+DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.95"))
+# Cursor'dan her seferinde çekilen aday sayısı
+FETCH_BATCH_SIZE = 500
+# Bütçe dolmasa bile taranacak en fazla aday
+MAX_CANDIDATES = 20000
+
+
+def estimate_tokens(text: str) -> int:
+    """Yaklaşık token sayısı (~4 karakter / token)"""
+    return len(text) // 4 + 1
+
+
+class ContextPacker:
+    """Aday kayıtları MMR ile seçip token bütçesine sığdırır"""
+
+    def __init__(self, query_embedding: np.ndarray, token_budget: int,
+                 mmr_lambda: float = MMR_LAMBDA, duplicate_threshold: float = DUPLICATE_THRESHOLD):
+        query = np.asarray(query_embedding, dtype=np.float32)
+        self.query = query / (np.linalg.norm(query) or 1.0)
+        self.remaining = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.selected_texts: List[str] = []
+        self.selected_vectors: List[np.ndarray] = []
+        self.skipped_duplicates = 0
+        self.min_cost = None
+
+    @property
+    def full(self) -> bool:
+        # Görülen en kısa kayıt bile sığmıyorsa bütçe dolmuştur
+        return self.remaining <= 0 or (self.min_cost is not None and self.remaining < self.min_cost)
+
+    def add_batch(self, texts: List[str], embeddings: np.ndarray):
+        """Bir aday grubunu greedy MMR ile işle"""
+        if not texts:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+        relevance = vectors @ self.query
+        if self.selected_vectors:
+            redundancy = (vectors @ np.stack(self.selected_vectors).T).max(axis=1)
+        else:
+            redundancy = np.full(len(texts), -1.0, dtype=np.float32)
+        costs = np.fromiter((estimate_tokens(t) for t in texts), dtype=np.int64, count=len(texts))
+        batch_min = int(costs.min())
+        self.min_cost = batch_min if self.min_cost is None else min(self.min_cost, batch_min)
+        available = np.ones(len(texts), dtype=bool)
+
+        while available.any() and not self.full:
+            scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * np.maximum(redundancy, 0)
+            scores[~available] = -np.inf
+            pick = int(scores.argmax())
+            available[pick] = False
+
+            if redundancy[pick] >= self.duplicate_threshold:
+                self.skipped_duplicates += 1
+                continue
+            if costs[pick] > self.remaining:
+                continue
+
+            self.selected_texts.append(texts[pick])
+            self.selected_vectors.append(vectors[pick])
+            self.remaining -= int(costs[pick])
+            redundancy = np.maximum(redundancy, vectors @ vectors[pick])
+
+
+async def build_context(token: str, question: str, query_embedding: np.ndarray,
+                        token_budget: int = CONTEXT_TOKEN_BUDGET, known_values: Optional[dict] = None,
+                        reduced: int = 0) -> List[str]:
+    """Adayları vektör yakınlığı sırasıyla cursor ile parça parça çek,
+    MMR ile tekrarları ele ve bütçe dolduğunda dur - bellek ve prompt boyutu sınırlı kalır"""
+    known_values = known_values or {"counties": [], "types": []}
+    filters = query_filters.extract_filters(question, known_values["counties"], known_values["types"])
+    packer = ContextPacker(query_embedding, token_budget)
+
+    def consume(texts, embeddings) -> bool:
+        packer.add_batch(texts, embeddings)
+        return not packer.full
+
+    scanned = await repository.scan_nearest(token, query_embedding, filters, consume,
+                                            MAX_CANDIDATES, FETCH_BATCH_SIZE, reduced)
+    # Filtreler hiç aday döndürmezse tüm token üzerinde tekrar dene
+    if scanned == 0 and query_filters.has_filters(filters):
+        scanned = await repository.scan_nearest(token, query_embedding, {}, consume,
+                                                MAX_CANDIDATES, FETCH_BATCH_SIZE, reduced)
+
+    print(f"📦 Context: {len(packer.selected_texts)} kayıt, {scanned} aday tarandı, "
+          f"{packer.skipped_duplicates} tekrar atıldı, kalan bütçe {packer.remaining} token")
+    return packer.selected_texts
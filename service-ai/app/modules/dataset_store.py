@@ -0,0 +1,138 @@
+import os
+import json
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Parse edilmiş veri setlerinin kolon bazlı (.npy) saklandığı yerel dizin.
+# Aynı makinedeki tüm worker'lar dosyaları kopyalamadan mmap ile paylaşır.
+DATASET_STORE_DIR = os.getenv("DATASET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "dataset_cache"))
+# Dizinin üst sınırı - aşılırsa en eski veri setleri silinir
+DATASET_STORE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+META_FILE = "meta.json"
+
+# Process başına mmap edilmiş DataFrame'ler (path -> df)
+_mapped = {}
+
+
+def dataset_path(file_hash: str) -> str:
+    return os.path.join(DATASET_STORE_DIR, file_hash)
+
+
+def exists(file_hash: str) -> bool:
+    return os.path.exists(os.path.join(dataset_path(file_hash), META_FILE))
+
+
+def _codes_dtype(category_count: int):
+    # pandas'ın Categorical kod tipi seçimiyle aynı - from_codes kopya yapmaz
+    if category_count < np.iinfo(np.int8).max:
+        return np.int8
+    if category_count < np.iinfo(np.int16).max:
+        return np.int16
+    if category_count < np.iinfo(np.int32).max:
+        return np.int32
+    return np.int64
+
+
+def save(file_hash: str, df: pd.DataFrame) -> str:
+    """DataFrame'i kolon başına bir .npy olarak yaz: sayısal kolonlar ham, metin kolonları
+    kategorik kod + kategori listesi. Dizin atomik olarak yerine konur."""
+    path = dataset_path(file_hash)
+    if exists(file_hash):
+        return path
+
+    os.makedirs(DATASET_STORE_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=DATASET_STORE_DIR, prefix=".tmp-")
+    try:
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            entry = {"name": str(name), "file": f"{i}.npy"}
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy()
+                entry["kind"] = "numeric"
+            elif pd.api.types.is_datetime64_dtype(series):
+                values = series.to_numpy().view(np.int64)
+                entry["kind"] = "datetime"
+                entry["dtype"] = str(series.dtype)
+            else:
+                codes, categories = pd.factorize(series, sort=True)
+                values = codes.astype(_codes_dtype(len(categories)))
+                entry["kind"] = "categorical"
+                entry["categories"] = [str(c) if not isinstance(c, (int, float, str)) else c for c in categories]
+            np.save(os.path.join(tmp_dir, entry["file"]), np.ascontiguousarray(values))
+            columns.append(entry)
+
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump({"rows": len(df), "columns": columns}, f, ensure_ascii=False)
+
+        try:
+            os.rename(tmp_dir, path)
+        except OSError:
+            # Başka bir worker aynı veri setini aynı anda yazdı
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        _evict(keep=path)
+        return path
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def to_datetime(series: pd.Series) -> pd.Series:
+    """pd.to_datetime(errors='coerce') - kategorik kolonlarda her kategori bir kez parse edilir.
+    pandas'ın tarih cache'i kategorik girdide kategorik döndürdüğü için load() sonrası kolonlar burada çözülür"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.to_datetime(series, errors='coerce')
+    parsed = pd.to_datetime(series.cat.categories.astype(str), errors='coerce').to_numpy()
+    # -1 (eksik) kodu son elemana (NaT) düşer
+    parsed = np.append(parsed, np.datetime64('NaT', 'ns'))
+    return pd.Series(parsed[np.asarray(series.cat.codes)], index=series.index, name=series.name)
+
+
+def load(path: str) -> Optional[pd.DataFrame]:
+    """Veri setini mmap ile aç (process başına bir kez); sayfalar işletim sistemi cache'inde
+    worker'lar arasında paylaşılır"""
+    df = _mapped.get(path)
+    if df is not None:
+        return df
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    data = {}
+    for entry in meta["columns"]:
+        values = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+        if entry["kind"] == "categorical":
+            data[entry["name"]] = pd.Categorical.from_codes(values, categories=entry["categories"])
+        elif entry["kind"] == "datetime":
+            data[entry["name"]] = values.view(entry["dtype"])
+        else:
+            data[entry["name"]] = values
+    df = pd.DataFrame(data, copy=False)
+
+    # Önceki aktif veri setini bırak - her worker'da tek mmap
+    _mapped.clear()
+    _mapped[path] = df
+    return df
+
+
+def _evict(keep: str):
+    entries = []
+    for name in os.listdir(DATASET_STORE_DIR):
+        full = os.path.join(DATASET_STORE_DIR, name)
+        if name.startswith(".") or full == keep or not os.path.isdir(full):
+            continue
+        size = sum(e.stat().st_size for e in os.scandir(full))
+        entries.append((os.stat(full).st_mtime, size, full))
+    total = sum(size for _, size, _ in entries)
+    for _, size, full in sorted(entries):
+        if total <= DATASET_STORE_MAX_BYTES:
+            break
+        shutil.rmtree(full, ignore_errors=True)
+        total -= size
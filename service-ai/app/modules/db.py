@@ -43,12 +43,98 @@ def init_database():
             );
         """)
         
+        # Hybrid retrieval için yapısal filtre kolonları (vektör aramasından önce WHERE)
+        cur.execute("""
+            ALTER TABLE documents
+                ADD COLUMN IF NOT EXISTS county VARCHAR(255),
+                ADD COLUMN IF NOT EXISTS subscription_date DATE,
+                ADD COLUMN IF NOT EXISTS subscriber_type VARCHAR(255);
+        """)
+        
+        # Boyut indirgeme modunda token'a özel projeksiyonla indirgenmiş vektör (boyut token'a göre değişir);
+        # index'leri boyut başına kısmi ifade index'i olarak projection.ensure_index kurar
+        cur.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS embedding_reduced vector;")
+        
         # Index oluştur (hızlı arama için)
         cur.execute("""
             CREATE INDEX IF NOT EXISTS documents_embedding_idx 
             ON documents USING ivfflat (embedding vector_cosine_ops) 
             WITH (lists = 100);
         """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS documents_token_filters_idx
+            ON documents(token, county, subscription_date);
+        """)
+        
+        # Retention: token başına TTL ve son erişim zamanı
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS report_tokens (
+                token VARCHAR(255) PRIMARY KEY,
+                filename VARCHAR(255),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ttl_seconds INTEGER NOT NULL DEFAULT 604800
+            );
+        """)
+        
+        # Upload dedup: dosya içeriği hash'i + embedding ayarı -> mevcut token
+        # (token retention ile silinince eşleşme de silinir)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS upload_hashes (
+                file_hash CHAR(64) NOT NULL,
+                embedding_key VARCHAR(255) NOT NULL,
+                token VARCHAR(255) NOT NULL REFERENCES report_tokens(token) ON DELETE CASCADE,
+                filename VARCHAR(255),
+                row_count INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (file_hash, embedding_key)
+            );
+        """)
+        
+        # Token başına projeksiyon matrisi (sorgular aynı matrisle indirgenir)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS token_projections (
+                token VARCHAR(255) PRIMARY KEY REFERENCES report_tokens(token) ON DELETE CASCADE,
+                method VARCHAR(16) NOT NULL,
+                input_dim INTEGER NOT NULL,
+                output_dim INTEGER NOT NULL,
+                mean BYTEA NOT NULL,
+                components BYTEA NOT NULL,
+                explained_variance REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        
+        # Aktif rapor durumu - uvicorn worker'ları arasında paylaşılır
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS report_state (
+                state_key VARCHAR(64) PRIMARY KEY,
+                report_id VARCHAR(64),
+                filename VARCHAR(255),
+                file_hash CHAR(64),
+                dataset_path TEXT,
+                token VARCHAR(255),
+                embedding_status JSONB,
+                sketch JSONB,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        cur.execute("ALTER TABLE report_state ADD COLUMN IF NOT EXISTS sketch JSONB;")
+        
+        # Embedding sonrası önceden hesaplanan dashboard/AI yanıtları (token silinince gider)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS report_artifacts (
+                token VARCHAR(255) REFERENCES report_tokens(token) ON DELETE CASCADE,
+                name VARCHAR(32) NOT NULL,
+                file_hash CHAR(64) NOT NULL,
+                payload JSONB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (token, name)
+            );
+        """)
+        
+        # Opsiyonel lexical skor (trigram benzerliği) için
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
         
         conn.commit()
         conn.close()
@@ -0,0 +1,68 @@
+import numpy as np
+
+# Desteklenen görsel örnekleme yöntemleri
+METHODS = ("lttb", "minmax")
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets - şekli koruyan örnekleme, seçilen indeksleri döndürür"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # İlk ve son nokta sabit, aradaki noktalar threshold-2 kovaya bölünür
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Sonraki kovanın ortalaması (son kova için son nokta)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # Önceki seçili nokta, aday ve sonraki ortalama arasındaki üçgen alanı
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+
+def min_max(y, threshold: int) -> np.ndarray:
+    """Min/max kovalama - her kovadan en küçük ve en büyük noktayı seçer (tamamen vektörel)"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+
+    # İlk/son nokta + kova başına iki nokta threshold'u aşmasın
+    bucket_count = (threshold - 2) // 2
+    buckets = np.arange(n) * bucket_count // n
+    order = np.lexsort((y, buckets))
+    sorted_buckets = buckets[order]
+    first = np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]]
+    last = np.r_[sorted_buckets[1:] != sorted_buckets[:-1], True]
+
+    selected = np.concatenate(([0, n - 1], order[first], order[last]))
+    return np.unique(selected)
+
+
+def select_indices(x, y, max_points: int, method: str = "lttb") -> np.ndarray:
+    """Seriyi en fazla max_points noktaya indir, korunacak indeksleri sıralı döndür"""
+    if method not in METHODS:
+        raise ValueError(f"Geçersiz downsample yöntemi: {method}")
+    if method == "minmax":
+        return min_max(y, max_points)
+    return lttb(x, y, max_points)
@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import datetime
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from . import projection
+
+# Token başına embedding shard'larının (.npy) saklandığı dizin - yeniden encode etmeden
+# documents tablosu, index veya bellek içi arama bu dosyalardan kurulabilir.
+# Boş = kapalı (varsayılan); açılacaksa kalıcı bir volume gösterilmeli (validate)
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "")
+# Dizinin üst sınırı - aşılırsa en eski token'ların shard'ları silinir (DB satırları kalır)
+EMBEDDING_STORE_MAX_BYTES = int(os.getenv("EMBEDDING_STORE_MAX_BYTES", str(20 * 1024 ** 3)))
+# Yazılmayı bekleyen en fazla token - dolarsa yeni token'ın shard'ı atlanır (vektörler bellekte birikmez)
+MAX_PENDING_WRITES = int(os.getenv("EMBEDDING_STORE_MAX_PENDING", "2"))
+# Shard başına satır sayısı (384 boyutta 100k satır ~150MB)
+SHARD_ROWS = int(os.getenv("EMBEDDING_SHARD_ROWS", "100000"))
+
+MANIFEST_FILE = "manifest.json"
+PROJECTION_FILE = "projection.npz"
+# 2: ids shard'ları documents.id değerlerini tutar (1: token içi sıra)
+MANIFEST_VERSION = 2
+
+# Shard yazımı ve silme tek arka plan thread'inde sıralı - ingestion yanıtı disk yazımını beklemez
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-store")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(EMBEDDING_STORE_DIR)
+
+
+def validate() -> bool:
+    """Başlangıç kontrolü: dizin mutlak, geçici dizin dışında ve yazılabilir olmalı; değilse store kapatılır"""
+    global EMBEDDING_STORE_DIR
+    if not enabled():
+        return False
+    path = os.path.abspath(EMBEDDING_STORE_DIR)
+    tmp = os.path.abspath(tempfile.gettempdir())
+    problem = None
+    if not os.path.isabs(EMBEDDING_STORE_DIR):
+        problem = "mutlak yol değil"
+    elif path == tmp or path.startswith(tmp + os.sep):
+        problem = "geçici dizin kalıcı değil"
+    else:
+        try:
+            os.makedirs(path, exist_ok=True)
+            if not os.access(path, os.W_OK):
+                problem = "yazılabilir değil"
+        except OSError as e:
+            problem = str(e)
+    if problem:
+        print(f"⚠️ EMBEDDING_STORE_DIR={EMBEDDING_STORE_DIR}: {problem} - embedding store kapalı")
+        EMBEDDING_STORE_DIR = ""
+        return False
+    print(f"💽 Embedding store: {path} (üst sınır {EMBEDDING_STORE_MAX_BYTES / 1024 ** 3:.1f} GB)")
+    return True
+
+
+def token_path(token: str) -> str:
+    return os.path.join(EMBEDDING_STORE_DIR, token)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime.date) else value
+
+
+def _write_shard(directory: str, index: int, offset: int, ids: np.ndarray, texts: List[str],
+                 embeddings: np.ndarray, metadata: List[tuple]) -> dict:
+    names = {kind: f"{kind}-{index:05d}.{ext}" for kind, ext in
+             (("vectors", "npy"), ("ids", "npy"), ("documents", "jsonl"))}
+    np.save(os.path.join(directory, names["vectors"]), np.ascontiguousarray(embeddings, dtype=np.float32))
+    # Satır id'si = documents.id - arama sonuçları ve reload doğrudan DB satırlarıyla eşleşir
+    np.save(os.path.join(directory, names["ids"]), np.ascontiguousarray(ids, dtype=np.int64))
+    with open(os.path.join(directory, names["documents"]), "w", encoding="utf-8") as f:
+        for text, meta in zip(texts, metadata):
+            f.write(json.dumps([text, *(_json_value(v) for v in meta)], ensure_ascii=False))
+            f.write("\n")
+    return {"offset": offset, "rows": len(texts), **names}
+
+
+def save(token: str, filename: str, ids: np.ndarray, texts: List[str], embeddings: np.ndarray,
+         metadata: List[tuple], embedding_column: str = "embedding", reducer=None,
+         chunking: Optional[str] = None, shard_rows: int = SHARD_ROWS) -> Optional[str]:
+    """Insert edilen vektörleri (ids: documents.id, texts ile aynı sırada) shard'lar + manifest olarak yaz.
+    Dizin atomik olarak yerine konur; manifest varsa shard'lar eksiksizdir."""
+    if not enabled() or not texts:
+        return None
+    path = token_path(token)
+    tmp_dir = None
+    try:
+        os.makedirs(EMBEDDING_STORE_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=EMBEDDING_STORE_DIR, prefix=".tmp-")
+        start = time.time()
+        shards = [
+            _write_shard(tmp_dir, i // shard_rows, i, ids[i:i + shard_rows], texts[i:i + shard_rows],
+                         embeddings[i:i + shard_rows], metadata[i:i + shard_rows])
+            for i in range(0, len(texts), shard_rows)
+        ]
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "token": token,
+            "filename": filename,
+            "chunking": chunking,
+            "embedding_column": embedding_column,
+            "rows": len(texts),
+            "dim": int(embeddings.shape[1]),
+            "dtype": "float32",
+            "metadata_columns": ["county", "subscription_date", "subscriber_type"],
+            "projection": None,
+            "created_at": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+            "shards": shards,
+        }
+        if reducer is not None:
+            # Sorgular aynı matrisle indirgenmeli - veritabanı olmadan da arama yapılabilsin
+            np.savez(os.path.join(tmp_dir, PROJECTION_FILE), mean=reducer.mean, components=reducer.components)
+            manifest["projection"] = {"method": reducer.method, "file": PROJECTION_FILE,
+                                      "input_dim": int(reducer.components.shape[0]),
+                                      "explained_variance": reducer.explained_variance}
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_dir, path)
+        _evict(keep=path)
+        print(f"💽 Embedding shard'ları yazıldı: {len(shards)} shard, {len(texts)} satır ({time.time() - start:.2f}s)")
+        return path
+    except Exception as e:
+        # Shard'lar yardımcı kopya - yazılamazsa ingestion başarısız sayılmaz
+        print(f"⚠️ Embedding shard'ları yazılamadı: {e}")
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return None
+
+
+def save_async(token: str, filename: str, ids: np.ndarray, texts: List[str], embeddings: np.ndarray,
+               metadata: List[tuple], embedding_column: str = "embedding", reducer=None,
+               chunking: Optional[str] = None) -> Optional[Future]:
+    """save'i arka plan writer'ına sırala; kapalıysa veya kuyruk doluysa None"""
+    global _pending
+    if not enabled() or not texts:
+        return None
+    with _pending_lock:
+        if _pending >= MAX_PENDING_WRITES:
+            print(f"⚠️ Embedding store kuyruğu dolu ({_pending}), shard'lar atlandı (token: {token})")
+            return None
+        _pending += 1
+
+    def write():
+        global _pending
+        try:
+            return save(token, filename, ids, texts, embeddings, metadata, embedding_column, reducer, chunking)
+        finally:
+            with _pending_lock:
+                _pending -= 1
+
+    return _writer.submit(write)
+
+
+def flush():
+    """Sıradaki tüm yazma/silme işlerinin bitmesini bekle"""
+    _writer.submit(lambda: None).result()
+
+
+def _evict(keep: str):
+    """Üst sınır aşılırsa en eski token dizinlerini sil (dataset_store ile aynı kural)"""
+    entries = []
+    for name in os.listdir(EMBEDDING_STORE_DIR):
+        full = os.path.join(EMBEDDING_STORE_DIR, name)
+        if name.startswith(".") or full == keep or not os.path.isdir(full):
+            continue
+        size = sum(e.stat().st_size for e in os.scandir(full))
+        entries.append((os.path.getmtime(full), size, full))
+    total = sum(size for _, size, _ in entries) + sum(e.stat().st_size for e in os.scandir(keep))
+    for _, size, full in sorted(entries):
+        if total <= EMBEDDING_STORE_MAX_BYTES:
+            break
+        shutil.rmtree(full, ignore_errors=True)
+        total -= size
+        print(f"🧹 Embedding store sınırı aşıldı, silindi: {os.path.basename(full)}")
+
+
+def manifest(token: str) -> Optional[dict]:
+    manifest_path = os.path.join(token_path(token), MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def list_tokens() -> List[dict]:
+    """Shard'ı olan token'lar ve disk boyutları"""
+    if not enabled() or not os.path.isdir(EMBEDDING_STORE_DIR):
+        return []
+    tokens = []
+    for name in sorted(os.listdir(EMBEDDING_STORE_DIR)):
+        info = None if name.startswith(".") else manifest(name)
+        if info is None:
+            continue
+        size = sum(e.stat().st_size for e in os.scandir(token_path(name)))
+        entry = {key: info[key] for key in ("token", "filename", "rows", "dim", "embedding_column", "created_at")}
+        entry.update(shards=len(info["shards"]), bytes=size)
+        tokens.append(entry)
+    return tokens
+
+
+def remove(token: str):
+    """Token silinince shard'ları da sil (retention) - bekleyen yazımdan sonra çalışsın diye writer'da sıralanır"""
+    if enabled():
+        _writer.submit(shutil.rmtree, token_path(token), True)
+
+
+def _read_documents(path: str, shard: dict) -> List[tuple]:
+    documents = []
+    with open(os.path.join(path, shard["documents"]), encoding="utf-8") as f:
+        for line in f:
+            content, county, date, kind = json.loads(line)
+            documents.append((content, (county, datetime.date.fromisoformat(date) if date else None, kind)))
+    return documents
+
+
+def iter_shards(token: str, with_documents: bool = False) -> Iterator[tuple]:
+    """(ids, vektörler, dokümanlar) - vektörler ve id'ler mmap; dokümanlar yalnızca istenirse okunur.
+    Doküman: (içerik, (ilçe, tarih, tip)) - documents tablosuna yazılan sırayla"""
+    info = manifest(token)
+    if info is None:
+        raise FileNotFoundError(f"Token için embedding shard'ı yok: {token}")
+    path = token_path(token)
+    for shard in info["shards"]:
+        vectors = np.load(os.path.join(path, shard["vectors"]), mmap_mode="r")
+        ids = np.load(os.path.join(path, shard["ids"]), mmap_mode="r")
+        yield ids, vectors, _read_documents(path, shard) if with_documents else None
+
+
+def load_projection(token: str):
+    """Manifest'te projeksiyon varsa Projection nesnesi (yoksa None)"""
+    info = manifest(token)
+    if info is None or not info.get("projection"):
+        return None
+    data = np.load(os.path.join(token_path(token), info["projection"]["file"]))
+    return projection.Projection(info["projection"]["method"], data["mean"], data["components"],
+                      info["projection"].get("explained_variance"))
+
+
+class ShardSearcher:
+    """Shard'lar üzerinde bellek içi kosinüs araması - vektörler mmap, normlar açılışta bir kez hesaplanır"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.manifest = manifest(token)
+        if self.manifest is None:
+            raise FileNotFoundError(f"Token için embedding shard'ı yok: {token}")
+        self.projection = load_projection(token)
+        self.shards = []
+        for ids, vectors, _ in iter_shards(token):
+            norms = np.linalg.norm(vectors, axis=1)
+            self.shards.append((ids, vectors, np.where(norms == 0, 1.0, norms).astype(np.float32)))
+
+    def search(self, queries: np.ndarray, k: int = 10) -> List[List[tuple]]:
+        """Tam boyutlu sorgu vektörleri (n, d) -> sorgu başına [(id, skor), ...] (skora göre azalan)"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.projection is not None:
+            queries = self.projection.transform(queries)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1.0, norms)
+
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for ids, vectors, vector_norms in self.shards:
+            scores = (queries @ vectors.T) / vector_norms
+            top = min(k, scores.shape[1])
+            # Shard başına top-k, ardından önceki en iyilerle birleştirme
+            idx = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            best_ids = np.concatenate([best_ids, np.asarray(ids)[idx]], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, idx, axis=1)], axis=1)
+            if best_ids.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_ids = np.take_along_axis(best_ids, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_ids = np.take_along_axis(best_ids, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        return [[(int(i), float(s)) for i, s in zip(row_ids, row_scores)]
+                for row_ids, row_scores in zip(best_ids, best_scores)]
+
+    def documents(self, ids) -> dict:
+        """documents.id -> (içerik, metadata) - yalnızca istenen id'leri içeren shard'ların JSONL'i okunur"""
+        path = token_path(self.token)
+        wanted = np.asarray(list(ids), dtype=np.int64)
+        found = {}
+        for shard, (shard_ids, _, _) in zip(self.manifest["shards"], self.shards):
+            positions = np.flatnonzero(np.isin(shard_ids, wanted))
+            if len(positions):
+                documents = _read_documents(path, shard)
+                found.update((int(shard_ids[p]), documents[p]) for p in positions)
+        return found
@@ -1,9 +1,215 @@
-def key_insights(df):
+import os
+import numpy as np
+import pandas as pd
+from . import query_filters
+
+# |z| bu eşiği aşan ilçe-gün değerleri sıçrama/düşüş sayılır
+Z_THRESHOLD = float(os.getenv("INSIGHT_Z_THRESHOLD", "3.0"))
+# Haftalık büyüme için önceki haftada gereken en az abone (küçük tabanlı yüzdeler yanıltıcı)
+MIN_WEEKLY_BASE = int(os.getenv("INSIGHT_MIN_WEEKLY_BASE", "10"))
+# Her kategoride döndürülecek en fazla kayıt
+TOP_N = int(os.getenv("INSIGHT_TOP_N", "5"))
+
+NS_PER_DAY = 86_400_000_000_000
+# 1970-01-01 perşembe - (gün + 3) // 7 pazartesi başlangıçlı hafta numarası verir
+_MONDAY_SHIFT = 3
+
+
+def _codes(series):
+    """Kolonu (kod, etiket) çiftine çevir - kategorik kolonlarda mevcut kodlar kullanılır.
+    Filtrelenmiş çerçevede kullanılmayan kategoriler boş ilçe satırı üretmesin diye atılır"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.cat.remove_unused_categories()
+        return np.asarray(series.cat.codes), series.cat.categories.astype(str).to_numpy()
+    codes, labels = pd.factorize(series, sort=True)
+    return codes, np.asarray(labels).astype(str)
+
+
+def _day_numbers(series):
+    """Tarih kolonunu epoch'tan itibaren gün numarasına çevir (parse edilemeyenler -1)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Her farklı tarih bir kez parse edilir
+        parsed = pd.to_datetime(series.cat.categories.astype(str), errors='coerce')
+        category_days = np.where(parsed.isna(), -1, parsed.asi8 // NS_PER_DAY)
+        codes = np.asarray(series.cat.codes)
+        return np.where(codes >= 0, category_days[codes], -1)
+    parsed = pd.to_datetime(series, errors='coerce')
+    return np.where(parsed.isna(), -1, parsed.to_numpy().view(np.int64) // NS_PER_DAY)
+
+
+def _matrix(df):
+    """İlçe × gün abone matrisi (tek bincount geçişi) ve opsiyonel yabancı abone matrisi"""
+    values = pd.to_numeric(df['NUMBER_OF_SUBSCRIBER'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    days = _day_numbers(df['SUBSCRIPTION_DATE'])
+    if 'SUBSCRIPTION_COUNTY' in df.columns:
+        county_codes, counties = _codes(df['SUBSCRIPTION_COUNTY'])
+    else:
+        county_codes, counties = np.zeros(len(df), dtype=np.int64), np.array(["Tümü"])
+
+    # İlçe toplamları tarihi parse edilemeyen satırları da içerir
+    known = county_codes >= 0
+    county_totals = np.bincount(county_codes[known], weights=values[known], minlength=len(counties))
+    valid = (days >= 0) & known
+    if not valid.any():
+        return None
+    days, county_codes, values = days[valid], county_codes[valid].astype(np.int64), values[valid]
+    first_day = days.min()
+    day_count = int(days.max() - first_day) + 1
+    flat = county_codes * day_count + (days - first_day)
+    size = len(counties) * day_count
+    matrix = np.bincount(flat, weights=values, minlength=size).reshape(len(counties), day_count)
+
+    foreign = None
+    if 'SUBSCRIBER_DOMESTIC_FOREIGN' in df.columns:
+        type_codes, types = _codes(df['SUBSCRIBER_DOMESTIC_FOREIGN'])
+        canonical = [query_filters.TYPE_SYNONYMS.get(t, t) for t in map(query_filters.normalize, types)]
+        is_foreign = np.append(np.array([c == "yabanci" for c in canonical], dtype=bool), False)
+        # -1 (eksik) kodu son elemana (False) düşer
+        mask = is_foreign[type_codes[valid]]
+        foreign = np.bincount(flat[mask], weights=values[mask], minlength=size).reshape(len(counties), day_count)
+
+    return {"matrix": matrix, "foreign": foreign, "counties": counties, "county_totals": county_totals,
+            "first_day": int(first_day)}
+
+
+def _day_label(day: int) -> str:
+    return str(np.datetime64(int(day), 'D'))
+
+
+def _weekly(matrix, first_day: int):
+    """Günlük matrisi pazartesi başlangıçlı haftalara topla; yalnızca tam haftalar döner"""
+    lead = (first_day + _MONDAY_SHIFT) % 7
+    day_count = matrix.shape[1]
+    # Baştaki ve sondaki yarım haftaları at
+    start = (7 - lead) % 7
+    full_weeks = (day_count - start) // 7
+    if full_weeks <= 0:
+        return None, None
+    weekly = matrix[:, start:start + full_weeks * 7].reshape(matrix.shape[0], full_weeks, 7).sum(axis=2)
+    return weekly, first_day + start
+
+
+def _spikes(matrix, counties, first_day: int):
+    """İlçe bazlı z-skoru: her ilçenin günlük serisi kendi ortalama/std'sine göre"""
+    mean = matrix.mean(axis=1, keepdims=True)
+    std = matrix.std(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(std > 0, (matrix - mean) / std, 0.0)
+
+    flat = np.flatnonzero(np.abs(z) >= Z_THRESHOLD)
+    if flat.size == 0:
+        return []
+    order = flat[np.argsort(-np.abs(z.ravel()[flat]), kind='stable')][:TOP_N * 2]
+    rows, cols = np.unravel_index(order, matrix.shape)
+    return [
+        {
+            "county": counties[r],
+            "date": _day_label(first_day + c),
+            "value": float(matrix[r, c]),
+            "expected": round(float(mean[r, 0]), 2),
+            "z_score": round(float(z[r, c]), 2),
+            "kind": "spike" if z[r, c] > 0 else "drop",
+        }
+        for r, c in zip(rows, cols)
+    ]
+
+
+def _weekly_changes(weekly, foreign_weekly, counties, week_start: int):
+    """Son iki tam hafta: büyüme liderleri, toplam değişime katkı ve yabancı pay kayması"""
+    last, prev = weekly[:, -1], weekly[:, -2]
+    period = {
+        "previous_week": _day_label(week_start + 7 * (weekly.shape[1] - 2)),
+        "last_week": _day_label(week_start + 7 * (weekly.shape[1] - 1)),
+    }
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(prev >= MIN_WEEKLY_BASE, (last - prev) / prev, np.nan)
+    eligible = np.flatnonzero(~np.isnan(growth))
+    leaders = [
+        {"county": counties[i], "previous": float(prev[i]), "last": float(last[i]),
+         "growth_pct": round(float(growth[i]) * 100, 1)}
+        for i in eligible[np.argsort(-growth[eligible], kind='stable')][:TOP_N]
+    ]
+
+    change = last - prev
+    total_change = float(change.sum())
+    contributions = []
+    if np.any(change):
+        # Pay: ilçe değişiminin toplam değişime oranı (toplam 0 ise mutlak değişimlere göre)
+        denominator = total_change if total_change else float(np.abs(change).sum())
+        for i in np.argsort(-np.abs(change), kind='stable')[:TOP_N]:
+            if change[i] == 0:
+                break
+            contributions.append({"county": counties[i], "change": float(change[i]),
+                                  "share_of_change_pct": round(float(change[i]) / denominator * 100, 1)})
+
+    share_shifts = []
+    if foreign_weekly is not None:
+        f_last, f_prev = foreign_weekly[:, -1], foreign_weekly[:, -2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share_last = np.where(last > 0, f_last / last, np.nan)
+            share_prev = np.where(prev > 0, f_prev / prev, np.nan)
+        shift = share_last - share_prev
+        eligible = np.flatnonzero(~np.isnan(shift) & (shift != 0))
+        share_shifts = [
+            {"county": counties[i], "previous_foreign_pct": round(float(share_prev[i]) * 100, 1),
+             "last_foreign_pct": round(float(share_last[i]) * 100, 1),
+             "shift_pp": round(float(shift[i]) * 100, 1)}
+            for i in eligible[np.argsort(-np.abs(shift[eligible]), kind='stable')][:TOP_N]
+        ]
+
+    return {**period, "total_change": total_change, "growth_leaders": leaders,
+            "contributions": contributions, "share_shifts": share_shifts}
+
+
+def analyze(df) -> dict:
+    """Cümle listesi (key_insights) ve yapısal detaylar - ilçe × gün matrisi üzerinde vektörel"""
     insights = []
+    details = {}
+    if 'NUMBER_OF_SUBSCRIBER' not in df.columns:
+        return {"key_insights": insights, "details": details}
+
+    data = _matrix(df) if 'SUBSCRIPTION_DATE' in df.columns else None
+    if data is None:
+        # Tarih yoksa (veya hiçbiri parse edilemezse) yalnızca ilçe özeti
+        if 'SUBSCRIPTION_COUNTY' in df.columns:
+            top_county = df.groupby('SUBSCRIPTION_COUNTY', observed=True)['NUMBER_OF_SUBSCRIBER'].sum().idxmax()
+            insights.append(f"En çok abone {top_county} ilçesinde bağlandı.")
+        return {"key_insights": insights, "details": details}
+
+    matrix, counties, first_day = data["matrix"], data["counties"], data["first_day"]
     if 'SUBSCRIPTION_COUNTY' in df.columns:
-        top_county = df.groupby('SUBSCRIPTION_COUNTY')['NUMBER_OF_SUBSCRIBER'].sum().idxmax()
-        insights.append(f"En çok abone {top_county} ilçesinde bağlandı.")
-    if 'SUBSCRIPTION_DATE' in df.columns:
-        top_date = df.groupby('SUBSCRIPTION_DATE')['NUMBER_OF_SUBSCRIBER'].sum().idxmax()
-        insights.append(f"En yoğun tarih {top_date} oldu.")
-    return insights
+        insights.append(f"En çok abone {counties[data['county_totals'].argmax()]} ilçesinde bağlandı.")
+    insights.append(f"En yoğun tarih {_day_label(first_day + matrix.sum(axis=0).argmax())} oldu.")
+
+    spikes = _spikes(matrix, counties, first_day)
+    details["anomalies"] = spikes
+    for item in spikes[:2]:
+        word = "sıçrama" if item["kind"] == "spike" else "düşüş"
+        insights.append(f"{item['county']} ilçesinde {item['date']} tarihinde olağandışı {word} "
+                        f"({item['value']:.0f} abone, z={item['z_score']}).")
+
+    weekly, week_start = _weekly(matrix, first_day)
+    if weekly is not None and weekly.shape[1] >= 2:
+        foreign_weekly = None
+        if data["foreign"] is not None:
+            foreign_weekly, _ = _weekly(data["foreign"], first_day)
+        changes = _weekly_changes(weekly, foreign_weekly, counties, week_start)
+        details["week_over_week"] = changes
+        if changes["growth_leaders"]:
+            leader = changes["growth_leaders"][0]
+            insights.append(f"Haftalık en hızlı büyüme {leader['county']} ilçesinde (%{leader['growth_pct']}).")
+        if changes["contributions"]:
+            top = changes["contributions"][0]
+            insights.append(f"Son haftadaki toplam değişim {changes['total_change']:+.0f} abone; "
+                            f"en büyük katkı {top['county']} ilçesinden ({top['change']:+.0f}).")
+        if changes["share_shifts"]:
+            shift = changes["share_shifts"][0]
+            insights.append(f"{shift['county']} ilçesinde yabancı abone payı {shift['shift_pp']:+} puan değişti "
+                            f"(%{shift['previous_foreign_pct']} → %{shift['last_foreign_pct']}).")
+
+    return {"key_insights": insights, "details": details}
+
+
+def key_insights(df):
+    return analyze(df)["key_insights"]
@@ -1,13 +1,199 @@
-import pandas as pd
-from io import BytesIO
+import os
+import re
 import mimetypes
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Iterator, List
 
-def parse_file(filename: str, file_bytes: bytes):
-    content_type, _ = mimetypes.guess_type(filename)
-    if content_type in ['text/csv', 'application/vnd.ms-excel'] or filename.endswith(".csv"):
-        df = pd.read_csv(BytesIO(file_bytes))
-    elif filename.lower().endswith('.xlsx'):
-        df = pd.read_excel(BytesIO(file_bytes))
-    else:
-        df = pd.DataFrame()
+import numpy as np
+import pandas as pd
+
+# CSV'ler bu satır sayısında parçalar halinde okunur
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "200000"))
+# Paralel sayfa/sheet işleme için en fazla worker
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Bir PDF worker'ına verilecek en az sayfa (küçük PDF'lerde process açmaya değmez)
+PDF_PAGES_PER_WORKER = 8
+# PDF tablo başlığı, hemen ardından bu kadar aynı genişlikte ve sayısal hücreli satır gelirse kabul edilir
+PDF_HEADER_MIN_ROWS = 2
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".xlsb", ".ods")
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # opsiyonel - yoksa openpyxl ile okunur
+    CalamineWorkbook = None
+
+
+def _integral_floats_to_int(df: pd.DataFrame) -> pd.DataFrame:
+    """Excel sayıları float gelir - tamamı tam sayı olan kolonları int64'e çevir"""
+    for column in df.select_dtypes(include="float").columns:
+        values = df[column].to_numpy()
+        if not np.isnan(values).any() and (values % 1 == 0).all():
+            df[column] = values.astype(np.int64)
     return df
+
+
+def _read_calamine_sheet(file_bytes: bytes, sheet_name: str) -> pd.DataFrame:
+    """Tek sheet'i calamine (Rust) ile oku - her thread kendi workbook nesnesini açar"""
+    workbook = CalamineWorkbook.from_filelike(BytesIO(file_bytes))
+    rows = workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=True)
+    if not rows:
+        return pd.DataFrame()
+    header = [str(c) for c in rows[0]]
+    df = pd.DataFrame(rows[1:], columns=header).replace("", np.nan).infer_objects()
+    return _integral_floats_to_int(df)
+
+
+def _iter_excel(file_bytes: bytes) -> Iterator[pd.DataFrame]:
+    """Tüm sheet'leri paralel oku; ilk sheet ile aynı kolonlara sahip olanları sırayla akıt"""
+    if CalamineWorkbook is not None:
+        sheet_names = CalamineWorkbook.from_filelike(BytesIO(file_bytes)).sheet_names
+        with ThreadPoolExecutor(max_workers=max(1, min(PARSER_WORKERS, len(sheet_names)))) as executor:
+            frames = executor.map(lambda name: _read_calamine_sheet(file_bytes, name), sheet_names)
+            yield from _matching_sheets(frames)
+    else:
+        sheets = pd.read_excel(BytesIO(file_bytes), sheet_name=None)
+        yield from _matching_sheets(sheets.values())
+
+
+def _matching_sheets(frames) -> Iterator[pd.DataFrame]:
+    columns = None
+    for df in frames:
+        if df.empty:
+            continue
+        if columns is None:
+            columns = list(df.columns)
+        elif list(df.columns) != columns:
+            # Farklı yapıdaki sheet'ler (not, özet vb.) veri setine karıştırılmaz
+            print(f"⚠️ Farklı kolonlara sahip sheet atlandı: {list(df.columns)[:5]}")
+            continue
+        yield df
+
+
+def _extract_pdf_pages(file_bytes: bytes, start: int, end: int) -> List[tuple]:
+    """Process worker'ı: [start, end) sayfalarının metnini çıkar"""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(BytesIO(file_bytes))
+    return [(page_no + 1, reader.pages[page_no].extract_text() or "") for page_no in range(start, end)]
+
+
+def _is_header(tokens: List[str]) -> bool:
+    return len(tokens) >= 2 and all(re.fullmatch(r"[A-Za-z_][\w]*", t) for t in tokens)
+
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token.replace(",", ""))
+        return True
+    except ValueError:
+        return False
+
+
+def _find_header(lines: List[str]) -> List[str]:
+    """Başlık adayı ancak ardından aynı genişlikte, sayısal hücre içeren satırlar geliyorsa kabul edilir
+    (düz metin PDF'lerde ilk cümle başlık sanılıp diğer satırlar atılmasın)"""
+    rows = [line.split() for line in lines if line.strip()]
+    for i, tokens in enumerate(rows):
+        if not _is_header(tokens):
+            continue
+        following = rows[i + 1:i + 1 + PDF_HEADER_MIN_ROWS]
+        if following and all(
+            len(row) == len(tokens) and any(_is_number(cell) for cell in row) for row in following
+        ):
+            return tokens
+    return []
+
+
+def _pdf_pages_to_frame(pages: List[tuple], header: List[str]) -> pd.DataFrame:
+    """Sayfa metinlerini tabloya (başlık bulunduysa) ya da satır satır metne çevir"""
+    if header:
+        rows = []
+        skipped = 0
+        for _, text in pages:
+            for line in text.splitlines():
+                tokens = line.split()
+                # Her sayfada tekrarlanan başlık satırları atlanır
+                if len(tokens) == len(header) and tokens != header:
+                    rows.append(tokens)
+                elif tokens and tokens != header:
+                    skipped += 1
+        if skipped:
+            print(f"⚠️ PDF: tablo genişliğine uymayan {skipped} satır atlandı")
+        df = pd.DataFrame(rows, columns=header)
+        for column in df.columns:
+            converted = pd.to_numeric(df[column], errors="coerce")
+            if converted.notna().all():
+                df[column] = converted
+        return df
+
+    records = [
+        (page_no, line.strip())
+        for page_no, text in pages
+        for line in text.splitlines()
+        if line.strip()
+    ]
+    return pd.DataFrame(records, columns=["PAGE", "TEXT"])
+
+
+def _iter_pdf(file_bytes: bytes) -> Iterator[pd.DataFrame]:
+    """PDF sayfalarını process pool ile paralel çıkar, sayfa sırasıyla tablo parçaları akıt"""
+    from PyPDF2 import PdfReader
+    page_count = len(PdfReader(BytesIO(file_bytes)).pages)
+    if page_count == 0:
+        return
+
+    workers = max(1, min(PARSER_WORKERS, page_count // PDF_PAGES_PER_WORKER))
+    bounds = np.linspace(0, page_count, workers + 1).astype(int)
+    ranges = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    if workers == 1:
+        page_batches = (_extract_pdf_pages(file_bytes, a, b) for a, b in ranges)
+        yield from _pdf_batches_to_frames(page_batches)
+        return
+
+    # spawn: torch/db thread'leri olan ana process'i fork etmek güvenli değil
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_extract_pdf_pages, file_bytes, a, b) for a, b in ranges]
+        yield from _pdf_batches_to_frames(f.result() for f in futures)
+
+
+def _pdf_batches_to_frames(page_batches) -> Iterator[pd.DataFrame]:
+    header = None
+    for pages in page_batches:
+        if header is None:
+            # Tablo başlığı ilk sayfa grubunda aranır; bulunamazsa satırlar metin olarak döner
+            header = _find_header([line for _, text in pages for line in text.splitlines()])
+        frame = _pdf_pages_to_frame(pages, header)
+        if not frame.empty:
+            yield frame
+
+
+def iter_file_frames(filename: str, file_bytes: bytes) -> Iterator[pd.DataFrame]:
+    """Dosyayı formatına göre DataFrame parçaları halinde akıt (CSV chunk, Excel sheet, PDF sayfa grubu)"""
+    lower = filename.lower()
+    content_type, _ = mimetypes.guess_type(filename)
+
+    if lower.endswith(".csv"):
+        yield from pd.read_csv(BytesIO(file_bytes), chunksize=CSV_CHUNK_ROWS)
+    elif lower.endswith(EXCEL_EXTENSIONS):
+        yield from _iter_excel(file_bytes)
+    elif lower.endswith(".pdf"):
+        yield from _iter_pdf(file_bytes)
+    elif content_type in ['text/csv', 'application/vnd.ms-excel']:
+        yield from pd.read_csv(BytesIO(file_bytes), chunksize=CSV_CHUNK_ROWS)
+
+
+def parse_file(filename: str, file_bytes: bytes, on_frame=None):
+    """Tüm parçaları tek DataFrame'de birleştir; on_frame her parça okunduğunda çağrılır"""
+    frames = []
+    for frame in iter_file_frames(filename, file_bytes):
+        if on_frame is not None:
+            on_frame(frame)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
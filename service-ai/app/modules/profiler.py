@@ -0,0 +1,183 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import threading
+from collections import Counter
+from typing import Optional
+
+# Örnekleme aralığı (ms) - 10ms ~ %1-3 ek yük
+DEFAULT_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+# Tek profil oturumunun en uzun süresi
+MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "300"))
+# JSON raporunda listelenecek fonksiyon sayısı
+TOP_FUNCTIONS = 50
+
+# Bekleyen thread'lerin yaprak fonksiyonları (idle örnekler varsayılan olarak sayılmaz)
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"),
+    ("thread.py", "_worker"), ("threading.py", "_wait_for_tstate_lock"),
+}
+_THREAD_SUFFIX = re.compile(r"[_-]\d+$")
+
+_session: Optional["ProfileSession"] = None
+
+
+def _thread_group(name: str) -> str:
+    """ThreadPoolExecutor-0_3 -> ThreadPoolExecutor-0, db-insert_5 -> db-insert (flame graph kökü)"""
+    return _THREAD_SUFFIX.sub("", name)
+
+
+def _label(code) -> str:
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """sys._current_frames ile tüm thread'leri (event loop, executor'lar, insert havuzu) örnekleyen oturum"""
+
+    def __init__(self, interval_ms: float = DEFAULT_INTERVAL_MS, include_idle: bool = False,
+                 request_limit: Optional[int] = None):
+        self.interval = interval_ms / 1000
+        self.include_idle = include_idle
+        self.request_limit = request_limit
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.requests = []
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._loop = None
+        self._done = None
+
+    def start(self):
+        self._loop = asyncio.get_event_loop()
+        self._done = asyncio.Event()
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                names = {t.ident: _thread_group(t.name) for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                leaf = frame.f_code
+                if not self.include_idle and (leaf.co_filename.rsplit("/", 1)[-1], leaf.co_name) in _IDLE_LEAVES:
+                    self.idle_samples += 1
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                self.stacks[(names.get(ident, str(ident)), tuple(reversed(codes)))] += 1
+            self.samples += 1
+
+    def stop(self):
+        if self.stopped_at is None:
+            self._stop.set()
+            self._thread.join()
+            self.stopped_at = time.perf_counter()
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._done.set)
+
+    def request_finished(self, method: str, path: str, elapsed: float, status: int):
+        self.requests.append({"method": method, "path": path, "status": status, "ms": round(elapsed * 1000, 1)})
+        if self.request_limit and len(self.requests) >= self.request_limit:
+            self.stop()
+
+    async def wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.stop()
+
+    def collapsed(self) -> list:
+        """Brendan Gregg collapsed formatı: thread;kök;...;yaprak sayı (flamegraph.pl, speedscope)"""
+        lines = []
+        for (thread, codes), count in self.stacks.most_common():
+            lines.append(";".join([thread, *(_label(c) for c in codes)]) + f" {count}")
+        return lines
+
+    def report(self) -> dict:
+        elapsed = (self.stopped_at or time.perf_counter()) - self.started_at
+        # Gerçek örnek aralığı (istenen aralık + örnekleme maliyeti)
+        seconds_per_sample = elapsed / self.samples if self.samples else self.interval
+        cumulative, own, threads = Counter(), Counter(), Counter()
+        for (thread, codes), count in self.stacks.items():
+            threads[thread] += count
+            own[codes[-1]] += count
+            # Özyinelemeli fonksiyonlar örnek başına bir kez sayılır
+            for code in set(codes):
+                cumulative[code] += count
+
+        def function_row(code):
+            return {
+                "function": _label(code),
+                "cumulative_seconds": round(cumulative[code] * seconds_per_sample, 3),
+                "self_seconds": round(own[code] * seconds_per_sample, 3),
+                "cumulative_samples": cumulative[code],
+                "self_samples": own[code],
+            }
+
+        return {
+            "pid": os.getpid(),
+            "duration_seconds": round(elapsed, 3),
+            "interval_ms": round(self.interval * 1000, 2),
+            "samples": self.samples,
+            "idle_samples_skipped": self.idle_samples,
+            "threads": {name: round(count * seconds_per_sample, 3) for name, count in threads.most_common()},
+            "functions": [function_row(code) for code, _ in cumulative.most_common(TOP_FUNCTIONS)],
+            # Zamanın fiilen harcandığı yaprak fonksiyonlar (iterrows, tokenizer, execute_values, soket okuma...)
+            "hot_functions": [function_row(code) for code, _ in own.most_common(TOP_FUNCTIONS)],
+            "requests": self.requests,
+            "collapsed": self.collapsed(),
+        }
+
+
+def start(interval_ms: float = DEFAULT_INTERVAL_MS, include_idle: bool = False,
+          request_limit: Optional[int] = None) -> ProfileSession:
+    """Yeni oturum başlat - process başına aynı anda tek oturum"""
+    global _session
+    if _session is not None and _session.stopped_at is None:
+        raise RuntimeError("Devam eden bir profil oturumu var")
+    _session = ProfileSession(interval_ms, include_idle, request_limit)
+    _session.start()
+    return _session
+
+
+class RequestTracker:
+    """Saf ASGI middleware: "sonraki N istek" modunda tamamlanan istekleri oturuma bildirir.
+    Oturum yokken tek bir kontrol maliyeti vardır."""
+
+    def __init__(self, app, exclude_prefix: str = "/admin"):
+        self.app = app
+        self.exclude_prefix = exclude_prefix
+
+    async def __call__(self, scope, receive, send):
+        session = _session
+        if (scope["type"] != "http" or session is None or session.request_limit is None
+                or session.stopped_at is not None or scope["path"].startswith(self.exclude_prefix)):
+            await self.app(scope, receive, send)
+            return
+
+        status = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.request_finished(scope["method"], scope["path"], time.perf_counter() - start, status[0])
@@ -0,0 +1,181 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .db import get_connection
+from . import repository
+
+# Boyut indirgeme varsayılanı: 0 = kapalı (tam boyutlu vektörler saklanır)
+DEFAULT_REDUCED_DIM = int(os.getenv("EMBEDDING_REDUCED_DIM", "0"))
+# "pca": örneklem üzerinde PCA, "random": Gaussian rastgele projeksiyon (fit gerektirmez)
+DEFAULT_METHOD = os.getenv("EMBEDDING_PROJECTION", "pca")
+METHODS = ("pca", "random")
+# PCA'nın fit edileceği en fazla vektör sayısı
+FIT_SAMPLE_SIZE = int(os.getenv("PROJECTION_SAMPLE_SIZE", "20000"))
+# Process başına cache'lenen projeksiyon sayısı
+CACHE_SIZE = 64
+# Aynı boyutun index'ini aynı anda iki worker kurmasın (pg_advisory_lock(id, boyut))
+INDEX_LOCK_ID = 7_310_044
+
+SAVE_PROJECTION_SQL = """
+    INSERT INTO token_projections (token, method, input_dim, output_dim, mean, components, explained_variance)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (token) DO UPDATE
+    SET method = EXCLUDED.method, input_dim = EXCLUDED.input_dim, output_dim = EXCLUDED.output_dim,
+        mean = EXCLUDED.mean, components = EXCLUDED.components,
+        explained_variance = EXCLUDED.explained_variance
+"""
+
+# embedding_reduced boyutsuz bir kolon - index'lenebilmesi için her boyuta ayrı kısmi ifade index'i.
+# HNSW eğitim gerektirmez: ilk token'la boş tabloda kurulup sonraki insert'lerde büyür.
+# Sorgular aynı ifadeyi (embedding_reduced::vector(N)) ve koşulu kullanmalı (repository._column)
+REDUCED_INDEX_SQL = """
+    CREATE INDEX CONCURRENTLY {name}
+    ON documents USING hnsw ((embedding_reduced::vector({dim})) vector_cosine_ops)
+    WHERE vector_dims(embedding_reduced) = {dim}
+"""
+
+# token -> Projection (indirgeme yapılmamış token'lar için None)
+_cache: "OrderedDict[str, Optional[Projection]]" = OrderedDict()
+# Bu process'te index'i doğrulanmış boyutlar
+_indexed_dims = set()
+
+
+def resolve(method: Optional[str], dim: Optional[int]) -> Optional[Tuple[str, int]]:
+    """İstek parametrelerini varsayılanlarla birleştir; indirgeme kapalıysa None"""
+    dim = DEFAULT_REDUCED_DIM if dim is None else dim
+    if not dim:
+        return None
+    method = method or DEFAULT_METHOD
+    if method not in METHODS:
+        raise ValueError(f"Geçersiz projeksiyon yöntemi: {method} (pca, random)")
+    if not 1 <= dim < repository.EMBEDDING_DIM:
+        raise ValueError(f"İndirgenmiş boyut 1-{repository.EMBEDDING_DIM - 1} arasında olmalı: {dim}")
+    return method, dim
+
+
+class Projection:
+    """x -> (x - mean) @ components; sorgu ve dokümanlar aynı matrisle indirgenir"""
+
+    def __init__(self, method: str, mean: np.ndarray, components: np.ndarray, explained_variance: float = None):
+        self.method = method
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.explained_variance = explained_variance
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, method: str, dim: int,
+            sample_size: int = FIT_SAMPLE_SIZE, seed: int = 0) -> "Projection":
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        input_dim = embeddings.shape[1]
+        rng = np.random.default_rng(seed)
+
+        if method == "random":
+            # Johnson-Lindenstrauss: iç çarpımlar beklenen değerde korunur
+            components = rng.standard_normal((input_dim, dim)).astype(np.float32) / np.sqrt(dim)
+            return cls(method, np.zeros(input_dim, dtype=np.float32), components)
+
+        if len(embeddings) > sample_size:
+            embeddings = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+        mean = embeddings.mean(axis=0)
+        centered = (embeddings - mean).astype(np.float64)
+        # d x d kovaryansın özvektörleri - örneklem boyutundan bağımsız, SVD'den hızlı
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered / max(len(centered) - 1, 1))
+        order = np.argsort(eigenvalues)[::-1][:dim]
+        total = float(eigenvalues.sum())
+        explained = float(eigenvalues[order].sum() / total) if total > 0 else 1.0
+        return cls(method, mean, eigenvectors[:, order], round(explained, 4))
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Tek vektör veya (n, d) matris; sonuç float32"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return (vectors - self.mean) @ self.components
+
+    def to_row(self, token: str) -> tuple:
+        return (token, self.method, self.components.shape[0], self.output_dim,
+                self.mean.tobytes(), self.components.tobytes(), self.explained_variance)
+
+    @classmethod
+    def from_record(cls, record) -> "Projection":
+        input_dim, output_dim = record["input_dim"], record["output_dim"]
+        mean = np.frombuffer(record["mean"], dtype=np.float32)
+        components = np.frombuffer(record["components"], dtype=np.float32).reshape(input_dim, output_dim)
+        return cls(record["method"], mean, components, record["explained_variance"])
+
+
+def save(token: str, projection: Projection) -> bool:
+    """Projeksiyon matrisini token'la birlikte sakla (ingestion executor'ında, senkron)"""
+    conn = get_connection()
+    if conn is None:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute(SAVE_PROJECTION_SQL, projection.to_row(token))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ Projeksiyon kayıt hatası: {e}")
+        return False
+    finally:
+        conn.close()
+    ensure_index(projection.output_dim)
+    return True
+
+
+def index_name(dim: int) -> str:
+    return f"documents_embedding_reduced_{int(dim)}_idx"
+
+
+def ensure_index(dim: int) -> bool:
+    """Boyuta özel kısmi vektör index'i yoksa (veya yarım kalmış CONCURRENTLY'den geçersizse) kur"""
+    if dim in _indexed_dims:
+        return True
+    conn = get_connection()
+    if conn is None:
+        return False
+    name = index_name(dim)
+    # CREATE INDEX CONCURRENTLY transaction dışında çalışmalı
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s, %s)", (INDEX_LOCK_ID, dim))
+        try:
+            cur.execute("""
+                SELECT i.indisvalid FROM pg_index i
+                WHERE i.indexrelid = to_regclass(%s)
+            """, (name,))
+            row = cur.fetchone()
+            if row is None or not row[0]:
+                start = time.time()
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                cur.execute(REDUCED_INDEX_SQL.format(name=name, dim=int(dim)))
+                print(f"🧭 {name} oluşturuldu ({time.time() - start:.1f}s)")
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s, %s)", (INDEX_LOCK_ID, dim))
+        _indexed_dims.add(dim)
+        return True
+    except Exception as e:
+        # Index yoksa arama yine çalışır (token filtresi + sıralama), yalnızca daha yavaş
+        print(f"⚠️ {name} oluşturulamadı: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+async def for_token(token: str) -> Optional[Projection]:
+    """Token'ın projeksiyonu (yoksa None) - process başına LRU cache"""
+    if token in _cache:
+        _cache.move_to_end(token)
+        return _cache[token]
+    record = await repository.fetch_projection(token)
+    projection = Projection.from_record(record) if record is not None else None
+    _cache[token] = projection
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return projection
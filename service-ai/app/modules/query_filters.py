@@ -0,0 +1,135 @@
+import re
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .dataset_store import to_datetime
+
+# Türkçe karakterleri sadeleştirerek eşleştirme (KADIKÖY == Kadıköy == kadikoy)
+_TR_FOLD = str.maketrans({
+    "ç": "c", "Ç": "c", "ğ": "g", "Ğ": "g", "ı": "i", "I": "i", "İ": "i",
+    "ö": "o", "Ö": "o", "ş": "s", "Ş": "s", "ü": "u", "Ü": "u",
+})
+
+# Ay adları (sadeleştirilmiş Türkçe + İngilizce) -> ay numarası
+MONTHS = {
+    "ocak": 1, "subat": 2, "mart": 3, "nisan": 4, "mayis": 5, "haziran": 6,
+    "temmuz": 7, "agustos": 8, "eylul": 9, "ekim": 10, "kasim": 11, "aralik": 12,
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+
+# Abone tipi eş anlamlıları (sadeleştirilmiş)
+TYPE_SYNONYMS = {
+    "domestic": "yerli", "local": "yerli",
+    "foreign": "yabanci", "international": "yabanci",
+}
+
+_MONTH_PATTERN = "|".join(sorted(MONTHS, key=len, reverse=True))
+_ISO_DAY = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_ISO_MONTH = re.compile(r"\b(\d{4})-(\d{1,2})\b")
+_MONTH_YEAR = re.compile(rf"\b({_MONTH_PATTERN})\w*\s+(\d{{4}})\b")
+_YEAR_MONTH = re.compile(rf"\b(\d{{4}})\s+({_MONTH_PATTERN})\w*\b")
+_YEAR = re.compile(r"\b((?:19|20)\d{2})\b")
+
+
+def normalize(text: str) -> str:
+    return str(text).translate(_TR_FOLD).lower()
+
+
+def row_metadata(df) -> List[Tuple[Optional[str], Optional[datetime.date], Optional[str]]]:
+    """Her satır için filtre kolonları (ilçe, tarih, tip) - documents tablosuna yazılır"""
+    n = len(df)
+    counties = df['SUBSCRIPTION_COUNTY'].astype(str).tolist() if 'SUBSCRIPTION_COUNTY' in df.columns else [None] * n
+    types = df['SUBSCRIBER_DOMESTIC_FOREIGN'].astype(str).tolist() if 'SUBSCRIBER_DOMESTIC_FOREIGN' in df.columns else [None] * n
+    if 'SUBSCRIPTION_DATE' in df.columns:
+        dates = to_datetime(df['SUBSCRIPTION_DATE'])
+        dates = [d.date() if not pd.isna(d) else None for d in dates]
+    else:
+        dates = [None] * n
+    return list(zip(counties, dates, types))
+
+
+def _month_range(year: int, month: int) -> Tuple[datetime.date, datetime.date]:
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + (month == 12), month % 12 + 1, 1)
+    return start, end
+
+
+def extract_date_ranges(question: str) -> List[Tuple[datetime.date, datetime.date]]:
+    """Sorudaki tarih ifadelerini [başlangıç, bitiş) aralıklarına çevir"""
+    text = normalize(question)
+    ranges = []
+
+    for y, m, d in _ISO_DAY.findall(text):
+        try:
+            day = datetime.date(int(y), int(m), int(d))
+            ranges.append((day, day + datetime.timedelta(days=1)))
+        except ValueError:
+            pass
+    text = _ISO_DAY.sub(" ", text)
+
+    for y, m in _ISO_MONTH.findall(text):
+        if 1 <= int(m) <= 12:
+            ranges.append(_month_range(int(y), int(m)))
+    text = _ISO_MONTH.sub(" ", text)
+
+    for name, y in _MONTH_YEAR.findall(text):
+        ranges.append(_month_range(int(y), MONTHS[name]))
+    text = _MONTH_YEAR.sub(" ", text)
+
+    for y, name in _YEAR_MONTH.findall(text):
+        ranges.append(_month_range(int(y), MONTHS[name]))
+    text = _YEAR_MONTH.sub(" ", text)
+
+    for y in _YEAR.findall(text):
+        ranges.append((datetime.date(int(y), 1, 1), datetime.date(int(y) + 1, 1, 1)))
+
+    return ranges
+
+
+def _match_known(text: str, known: List[str]) -> List[str]:
+    """Normalize edilmiş soruda kelime başında geçen bilinen değerler (Kadıköy'de, Beşiktaşta...)"""
+    matches = []
+    for value in known:
+        key = normalize(value).strip()
+        if key and re.search(rf"(?<!\w){re.escape(key)}", text):
+            matches.append(value)
+    return matches
+
+
+def extract_filters(question: str, known_counties: List[str], known_types: List[str]) -> Dict:
+    """Sorudan veri setinin bilinen değerleriyle eşleşen yapısal filtreleri çıkar"""
+    text = normalize(question)
+    for synonym, canonical in TYPE_SYNONYMS.items():
+        text = re.sub(rf"(?<!\w){synonym}", canonical, text)
+
+    return {
+        "counties": _match_known(text, known_counties),
+        "types": _match_known(text, known_types),
+        "date_ranges": extract_date_ranges(question),
+    }
+
+
+def build_where(token: str, filters: Dict) -> Tuple[str, list]:
+    """Filtreleri vektör sıralamasından önce uygulanacak SQL WHERE koşuluna çevir"""
+    clauses = ["token = %s"]
+    params = [token]
+    if filters.get("counties"):
+        clauses.append("county = ANY(%s)")
+        params.append(filters["counties"])
+    if filters.get("types"):
+        clauses.append("subscriber_type = ANY(%s)")
+        params.append(filters["types"])
+    if filters.get("date_ranges"):
+        date_clauses = []
+        for start, end in filters["date_ranges"]:
+            date_clauses.append("(subscription_date >= %s AND subscription_date < %s)")
+            params.extend([start, end])
+        clauses.append("(" + " OR ".join(date_clauses) + ")")
+    return " AND ".join(clauses), params
+
+
+def has_filters(filters: Dict) -> bool:
+    return bool(filters.get("counties") or filters.get("types") or filters.get("date_ranges"))
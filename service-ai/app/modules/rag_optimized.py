@@ -1,7 +1,6 @@
 import uuid
 import os
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import google.generativeai as genai
 from .db import get_connection
 from dotenv import load_dotenv
@@ -9,42 +8,35 @@ from dotenv import load_dotenv
 # .env dosyasını yükle
 load_dotenv()
 import asyncio
+import asyncpg
 import concurrent.futures
 from typing import List, Optional
 import torch
 import psycopg2.extras
 from concurrent.futures import ThreadPoolExecutor
 import time
+from . import query_filters
+from . import retention, repository, projection
+from .context_builder import build_context, CONTEXT_TOKEN_BUDGET
+from .batching import AdaptiveBatcher
+from .rag_ultra_fast import get_model as shared_model
 
 # GPU desteği kontrol et
 device = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"🚀 Embedding device: {device}")
 
-# Daha hızlı ve küçük model seçenekleri
-FAST_MODELS = {
-    "fastest": "all-MiniLM-L6-v2",      # 384 dim, en hızlı
-    "balanced": "all-mpnet-base-v2",     # 768 dim, orta hız
-    "multilingual": "paraphrase-multilingual-MiniLM-L12-v2"  # 384 dim, Türkçe desteği
-}
-
-# Model'i global olarak yükle (tek seferlik)
-model = None
+# Encoder modeli rag_ultra_fast ile paylaşılır - aynı model süreçte iki kez yüklenmez
 def get_model(model_name: str = "fastest"):
-    global model
-    if model is None:
-        model_path = FAST_MODELS.get(model_name, FAST_MODELS["fastest"])
-        print(f"📥 Loading model: {model_path}")
-        model = SentenceTransformer(model_path, device=device)
-        print(f"✅ Model loaded on {device}")
-    return model
+    return shared_model(model_name)
 
 # Gemini ayarı
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
 class EmbeddingProcessor:
-    def __init__(self, model_name: str = "fastest", batch_size: int = 32, max_workers: int = 4):
+    def __init__(self, model_name: str = "fastest", max_workers: int = 4):
         self.model = get_model(model_name)
-        self.batch_size = batch_size
+        # Batch boyutu sabit değil: token uzunluğu ve ölçülen bellek bütçesine göre
+        self.batcher = AdaptiveBatcher(self.model, name=model_name)
         self.max_workers = max_workers
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
     
@@ -60,17 +52,11 @@ class EmbeddingProcessor:
     
     def batch_encode(self, texts: List[str]) -> np.ndarray:
         """Batch halinde encoding - GPU kullanımını optimize eder"""
-        print(f"🔄 Encoding {len(texts)} texts in batches of {self.batch_size}")
+        print(f"🔄 Encoding {len(texts)} texts (token budget {self.batcher.token_budget}/batch)")
         start_time = time.time()
         
-        # Batch processing ile encode et
-        embeddings = self.model.encode(
-            texts, 
-            batch_size=self.batch_size,
-            show_progress_bar=True,
-            convert_to_numpy=True,
-            normalize_embeddings=True  # Cosine similarity için optimize
-        )
+        # Cosine similarity için normalize
+        embeddings = self.batcher.encode(texts, normalize_embeddings=True)
         
         elapsed = time.time() - start_time
         print(f"✅ Encoding completed in {elapsed:.2f}s ({len(texts)/elapsed:.1f} texts/sec)")
@@ -151,6 +137,7 @@ async def save_to_postgres_async(df, filename: str) -> Optional[str]:
         )
         
         if success:
+            await loop.run_in_executor(processor.executor, retention.register_token, token, filename)
             total_time = time.time() - start_time
             print(f"🎉 Total process completed in {total_time:.2f}s (token: {token})")
             return token
@@ -166,97 +153,152 @@ def save_to_postgres_fast(df, filename: str) -> Optional[str]:
     """Hızlandırılmış senkron versiyon"""
     return asyncio.run(save_to_postgres_async(df, filename))
 
+# Hybrid retrieval ayarları
+# Lexical (trigram) skorunun füzyondaki ağırlığı - 0 ise yalnızca vektör sıralaması
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "0"))
+# Lexical füzyon için vektör sıralamasından alınacak aday çarpanı
+HYBRID_CANDIDATE_MULTIPLIER = 4
+
+# Token başına bilinen filtre değerleri (ilçeler, tipler) cache'i
+_known_values_cache = {}
+
+async def get_known_values(token: str) -> dict:
+    """Token'ın veri setindeki ilçe ve abone tipi değerleri (soru eşleştirmesi için)"""
+    if token in _known_values_cache:
+        return _known_values_cache[token]
+    
+    known = await repository.known_values(token)
+    if known["counties"] or known["types"]:
+        _known_values_cache[token] = known
+    return known
+
+async def _project_query(token: str, vectors):
+    """Token'ın projeksiyonu varsa sorgu vektör(ler)ini indirge; (vektörler, indirgenmiş boyut - 0 = tam)"""
+    reducer = await projection.for_token(token)
+    if reducer is None:
+        return vectors, 0
+    return reducer.transform(vectors), reducer.output_dim
+
+async def hybrid_retrieve_context_async(token: str, question: str, top_k: int = 10,
+                                        lexical_weight: float = None) -> str:
+    """Hybrid retrieval - sorudan çıkarılan ilçe/tarih/tip filtreleri vektör aramasından önce
+    WHERE koşulu olarak uygulanır, opsiyonel trigram skoru vektör skoruyla birleştirilir"""
+    if lexical_weight is None:
+        lexical_weight = HYBRID_LEXICAL_WEIGHT
+    
+    try:
+        # Encoding thread havuzunda, DB sorguları async havuzda - birbirini beklemez
+        loop = asyncio.get_event_loop()
+        q_emb, known, _ = await asyncio.gather(
+            loop.run_in_executor(processor.executor, lambda: processor.model.encode([question])[0]),
+            get_known_values(token),
+            repository.touch_token(token),
+        )
+        filters = query_filters.extract_filters(question, known["counties"], known["types"])
+        q_emb, reduced = await _project_query(token, q_emb)
+        
+        async def search(active_filters):
+            return await repository.filtered_search(
+                token, question, q_emb, active_filters, top_k,
+                lexical_weight, HYBRID_CANDIDATE_MULTIPLIER, reduced
+            )
+        
+        texts = await search(filters)
+        # Filtreler hiç satır döndürmezse (eski token'lar, fazla dar filtre) saf vektör aramasına dön
+        if not texts and query_filters.has_filters(filters):
+            texts = await search({})
+        
+        if not texts:
+            return f"Token '{token}' için veri bulunamadı"
+        
+        return "\n".join(texts)
+    
+    except Exception as e:
+        print(f"❌ Hybrid retrieval hatası: {e}")
+        return f"Arama hatası: {str(e)}"
+
 # Retrieval - optimize edilmiş
-async def retrieve_context_async(token: str, question: str, top_k: int = None) -> str:
-    """Asenkron retrieval"""
+async def retrieve_context_async(token: str, question: str, top_k: int = None, hybrid: bool = True,
+                                 token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Asenkron retrieval - top_k verildiğinde hybrid top-k, verilmezse token bütçeli MMR context"""
+    if top_k is not None and hybrid:
+        return await hybrid_retrieve_context_async(token, question, top_k)
+    
     try:
         # Soruyu encode et
         loop = asyncio.get_event_loop()
-        q_emb = await loop.run_in_executor(
-            processor.executor,
-            lambda: processor.model.encode([question])[0]
+        q_emb, _ = await asyncio.gather(
+            loop.run_in_executor(processor.executor, lambda: processor.model.encode([question])[0]),
+            repository.touch_token(token),
         )
         
-        # Database sorgusu
-        def db_query():
-            conn = get_connection()
-            if conn is None:
-                return []
-            
-            cur = conn.cursor()
-            
-            # Eğer top_k None ise tüm veriyi al, değilse limit uygula
-            if top_k is None:
-                cur.execute("""
-                    SELECT content FROM documents
-                    WHERE token = %s
-                    ORDER BY created_at
-                """, (token,))
-            else:
-                cur.execute("""
-                    SELECT content FROM documents
-                    WHERE token = %s
-                    ORDER BY embedding <=> %s::vector 
-                    LIMIT %s
-                """, (token, q_emb.tolist(), top_k))
-            
-            rows = cur.fetchall()
-            conn.close()
-            return rows
+        # Token projeksiyonla kaydedildiyse sorgu da aynı matrisle indirgenir
+        q_emb, reduced = await _project_query(token, q_emb)
         
-        rows = await loop.run_in_executor(processor.executor, db_query)
+        # top_k yoksa tüm token yerine bütçeye sığan, tekrarsız en alakalı kayıtlar
+        if top_k is None:
+            texts = await build_context(token, question, q_emb, token_budget, await get_known_values(token), reduced)
+        else:
+            texts = await repository.vector_search(token, q_emb, top_k, reduced)
         
-        if not rows:
+        if not texts:
             return f"Token '{token}' için veri bulunamadı"
             
-        return "\n".join([r[0] for r in rows])
+        return "\n".join(texts)
         
     except Exception as e:
         print(f"❌ Async retrieval hatası: {e}")
         return f"Arama hatası: {str(e)}"
 
-# Gemini fonksiyonları - async
+def _vector_literal(vector) -> str:
+    return "[" + ",".join(map(repr, vector.tolist())) + "]"
+
+async def retrieve_context_batch_async(token: str, questions: List[str], top_k: int = 10) -> List[Optional[str]]:
+    """Toplu retrieval - tüm sorular tek model çağrısıyla encode edilir,
+    tüm top-k aramaları LATERAL ile tek SQL sorgusunda çözülür.
+    Soru sırasında context listesi döner (veri yoksa None); arama hatası exception olarak yükselir"""
+    if not questions:
+        return []
+    
+    loop = asyncio.get_event_loop()
+    q_embs, _ = await asyncio.gather(
+        loop.run_in_executor(
+            processor.executor,
+            lambda: processor.batcher.encode(questions, normalize_embeddings=False)
+        ),
+        repository.touch_token(token),
+    )
+    
+    q_embs, reduced = await _project_query(token, q_embs)
+    grouped = await repository.batch_vector_search(token, [_vector_literal(v) for v in q_embs], top_k, reduced)
+    return ["\n".join(contents) if contents else None for contents in grouped]
+
+class AIUnavailableError(RuntimeError):
+    """Gemini veya database geçici olarak kullanılamıyor - hata metni yanıt olarak cache'lenmemeli"""
+
+
+# Gemini fonksiyonları - async (başarısızlıkta AIUnavailableError)
 async def generate_summary_pg_async(token: str) -> str:
     """Asenkron AI özet - Akıllı veri özetleme ile"""
     
     # Tüm veriyi al ama akıllıca özetle
-    def get_data_summary():
-        conn = get_connection()
-        if conn is None:
-            return "Database bağlantısı yok"
-        
-        cur = conn.cursor()
-        
-        # Basit istatistikler al (hızlı)
-        cur.execute("""
-            SELECT 
-                COUNT(*) as toplam_kayit,
-                MIN(created_at) as min_tarih,
-                MAX(created_at) as max_tarih
-            FROM documents 
-            WHERE token = %s
-        """, (token,))
-        
-        stats = cur.fetchone()
-        
-        # Sample veri al (ilk 100 kayıt)
-        cur.execute("""
-            SELECT content
-            FROM documents 
-            WHERE token = %s
-            ORDER BY created_at
-            LIMIT 100
-        """, (token,))
-        
-        sample_data = cur.fetchall()
-        conn.close()
+    async def get_data_summary():
+        try:
+            # Sayım ve örnek sorguları ayrı havuz bağlantılarında eşzamanlı
+            stats, sample_data, _ = await asyncio.gather(
+                repository.document_stats(token),
+                repository.sample_contents(token, 100),
+                repository.touch_token(token),
+            )
+        except (OSError, asyncpg.PostgresError) as e:
+            print(f"Database bağlantı hatası: {e}")
+            raise AIUnavailableError("Database bağlantısı yok") from e
         
         # Sample veriden bilgi çıkar
         ilce_list = []
         abone_toplam = 0
         
-        for row in sample_data:
-            content = row[0]
+        for content in sample_data:
             # Basit string parsing
             if 'İlçe:' in content and 'Abone:' in content:
                 try:
@@ -287,8 +329,8 @@ Istanbul Metropolitan Municipality Wi-Fi subscriber data - {stats[0]:,} log anal
         
         return summary
     
+    data_summary = await get_data_summary()
     loop = asyncio.get_event_loop()
-    data_summary = await loop.run_in_executor(processor.executor, get_data_summary)
     
     prompt = f"""
 Istanbul Metropolitan Municipality Wi-Fi subscriber data summary:
@@ -319,9 +361,9 @@ Conduct a brief analysis:
                     time.sleep(5)
                     continue
                 else:
-                    return f"AI analiz hatası: {str(e)}"
+                    raise AIUnavailableError(f"AI analiz hatası: {str(e)}") from e
         
-        return "AI analizi şu anda kullanılamıyor, lütfen daha sonra tekrar deneyin."
+        raise AIUnavailableError("AI analizi şu anda kullanılamıyor, lütfen daha sonra tekrar deneyin.")
     
     return await loop.run_in_executor(processor.executor, generate_with_retry)
 
@@ -329,38 +371,21 @@ async def generate_actions_pg_async(token: str, kpi: dict) -> List[str]:
     """Asenkron AI önerileri - Optimize edilmiş"""
     
     # KPI'dan basit özet çıkar (retrieval yerine)
-    def get_simple_data_summary():
-        conn = get_connection()
-        if conn is None:
-            return "Database bağlantısı yok"
-        
-        cur = conn.cursor()
-        
-        # Basit istatistikler
-        cur.execute("""
-            SELECT COUNT(*) as total
-            FROM documents 
-            WHERE token = %s
-        """, (token,))
-        
-        total = cur.fetchone()[0]
-        
-        # İlk 20 kayıt al (hızlı)
-        cur.execute("""
-            SELECT content
-            FROM documents 
-            WHERE token = %s
-            ORDER BY created_at
-            LIMIT 20
-        """, (token,))
-        
-        sample_rows = cur.fetchall()
-        conn.close()
+    async def get_simple_data_summary():
+        try:
+            stats, sample_rows, _ = await asyncio.gather(
+                repository.document_stats(token),
+                repository.sample_contents(token, 20),
+                repository.touch_token(token),
+            )
+        except (OSError, asyncpg.PostgresError) as e:
+            print(f"Database bağlantı hatası: {e}")
+            raise AIUnavailableError("Database bağlantısı yok") from e
+        total = stats["total"]
         
         # Basit analiz
         ilce_count = {}
-        for row in sample_rows:
-            content = row[0]
+        for content in sample_rows:
             if 'İlçe:' in content:
                 try:
                     ilce = content.split('İlçe:')[1].split(',')[0].strip()
@@ -372,8 +397,8 @@ async def generate_actions_pg_async(token: str, kpi: dict) -> List[str]:
         
         return f"Toplam {total:,} kayıt. Öne çıkan ilçeler: {', '.join([f'{ilce}({count})' for ilce, count in top_ilceler])}"
     
+    data_summary = await get_simple_data_summary()
     loop = asyncio.get_event_loop()
-    data_summary = await loop.run_in_executor(processor.executor, get_simple_data_summary)
     
     prompt = f"""
 Istanbul Metropolitan Municipality Wi-Fi subscriber data:
@@ -404,9 +429,9 @@ Write 3 short suggestions:
                     time.sleep(20)
                     continue
                 else:
-                    return [f"AI önerisi hatası: {str(e)[:100]}..."]
+                    raise AIUnavailableError(f"AI önerisi hatası: {str(e)[:100]}...") from e
         
-        return ["AI önerileri şu anda kullanılamıyor, lütfen daha sonra tekrar deneyin."]
+        raise AIUnavailableError("AI önerileri şu anda kullanılamıyor, lütfen daha sonra tekrar deneyin.")
     
     return await loop.run_in_executor(processor.executor, generate_with_retry)
 
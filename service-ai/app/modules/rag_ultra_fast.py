@@ -9,32 +9,38 @@ from typing import List, Optional
 import torch
 import psycopg2
 import psycopg2.extras
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 import time
-import multiprocessing as mp
-from functools import partial
-import asyncpg
+import threading
+from pgvector.psycopg2 import register_vector
 import json
+from .query_filters import row_metadata
+from . import retention, rollup, projection, repository, embedding_store
+from .batching import AdaptiveBatcher
 
 # GPU desteği kontrol et
 device = "cuda" if torch.cuda.is_available() else "cpu"
 print(f"🚀 Ultra Fast Embedding device: {device}")
 
-# Model yükleme (global)
-model = None
+# Model seçenekleri
+FAST_MODELS = {
+    "fastest": "all-MiniLM-L6-v2",
+    "balanced": "all-mpnet-base-v2",
+    "multilingual": "paraphrase-multilingual-MiniLM-L12-v2"
+}
+
+# Model yükleme (global) - süreç başına model yolu başına tek kopya, rag_optimized de aynı kopyayı kullanır
+_models = {}
+_models_lock = threading.Lock()
+
 def get_model(model_name: str = "fastest"):
-    global model
-    if model is None:
-        FAST_MODELS = {
-            "fastest": "all-MiniLM-L6-v2",
-            "balanced": "all-mpnet-base-v2",
-            "multilingual": "paraphrase-multilingual-MiniLM-L12-v2"
-        }
-        model_path = FAST_MODELS.get(model_name, FAST_MODELS["fastest"])
-        print(f"📥 Loading ultra fast model: {model_path}")
-        model = SentenceTransformer(model_path, device=device)
-        print(f"✅ Ultra fast model loaded on {device}")
-    return model
+    model_path = FAST_MODELS.get(model_name, FAST_MODELS["fastest"])
+    with _models_lock:
+        if model_path not in _models:
+            print(f"📥 Loading ultra fast model: {model_path}")
+            _models[model_path] = SentenceTransformer(model_path, device=device)
+            print(f"✅ Ultra fast model loaded on {device}")
+        return _models[model_path]
 
 # Gemini ayarı
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
@@ -45,11 +51,11 @@ DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://service_user:service_pass
 class UltraFastEmbeddingProcessor:
     def __init__(self, 
                  model_name: str = "fastest", 
-                 batch_size: int = 64,  # Daha büyük batch
                  db_workers: int = 8,   # Paralel DB worker
                  db_batch_size: int = 5000):  # Büyük DB batch
         self.model = get_model(model_name)
-        self.batch_size = batch_size
+        # Batch boyutu sabit değil: token uzunluğu ve ölçülen bellek bütçesine göre
+        self.batcher = AdaptiveBatcher(self.model, name=model_name)
         self.db_workers = db_workers
         self.db_batch_size = db_batch_size
         self.executor = ThreadPoolExecutor(max_workers=db_workers)
@@ -66,99 +72,123 @@ class UltraFastEmbeddingProcessor:
     
     def ultra_fast_encode(self, texts: List[str]) -> np.ndarray:
         """Ultra hızlı GPU encoding"""
-        print(f"🚀 Ultra fast encoding {len(texts)} texts in batches of {self.batch_size}")
+        print(f"🚀 Ultra fast encoding {len(texts)} texts (token budget {self.batcher.token_budget}/batch)")
         start_time = time.time()
         
-        embeddings = self.model.encode(
-            texts, 
-            batch_size=self.batch_size,
-            show_progress_bar=True,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-            device=device
-        )
+        embeddings = self.batcher.encode(texts, normalize_embeddings=True)
         
         elapsed = time.time() - start_time
         print(f"⚡ Ultra fast encoding completed in {elapsed:.2f}s ({len(texts)/elapsed:.1f} texts/sec)")
         return embeddings
 
-def db_worker_insert(args):
-    """Paralel database worker fonksiyonu"""
-    worker_id, data_chunk, token, filename = args
-    
-    try:
-        # Her worker kendi connection'ı kullanır
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
-        start_time = time.time()
-        
-        # Çok hızlı bulk insert
-        psycopg2.extras.execute_values(
-            cur,
-            """
-            INSERT INTO documents (token, filename, content, embedding)
-            VALUES %s
-            """,
-            data_chunk,
-            template=None,
-            page_size=2000,  # Büyük page size
-            fetch=False  # Return değeri almıyoruz (daha hızlı)
-        )
-        
-        conn.commit()
-        conn.close()
-        
-        elapsed = time.time() - start_time
-        speed = len(data_chunk) / elapsed
-        print(f"💾 Worker {worker_id}: {len(data_chunk)} kayıt {elapsed:.2f}s'de kaydedildi ({speed:.0f} records/sec)")
-        
-        return len(data_chunk)
-        
-    except Exception as e:
-        print(f"❌ Worker {worker_id} hatası: {e}")
-        if 'conn' in locals():
-            conn.close()
-        return 0
-
 class UltraFastDatabaseInserter:
+    """Uzun ömürlü insert havuzu - thread'ler kalıcı bağlantılarını tekrar kullanır.
+    psycopg2 ağ I/O sırasında GIL'i bırakır; embedding'ler pickle edilmeden numpy view olarak paylaşılır."""
+    
     def __init__(self, workers: int = 8, chunk_size: int = 5000):
         self.workers = workers
         self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-insert")
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+    
+    def _connection(self):
+        """Thread'e ait kalıcı bağlantı (kopmuşsa yeniden açılır)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(DATABASE_URL)
+            register_vector(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
     
-    def parallel_bulk_insert(self, token: str, filename: str, texts: List[str], embeddings: np.ndarray) -> bool:
-        """Paralel bulk insert ile ultra hızlı kaydetme"""
+    def _reset_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local.conn = None
+    
+    def _insert_chunk(self, chunk_id: int, token: str, filename: str, texts: List[str],
+                      embeddings: np.ndarray, metadata: List[tuple], rows: range,
+                      embedding_column: str = "embedding", ids_out: Optional[np.ndarray] = None) -> int:
+        """Tüm listelerin rows aralığındaki chunk'ı thread'in kalıcı bağlantısıyla yaz (bağlantı hatasında
+        bir kez yeniden dener); ids_out verilirse (chunk'ın view'ı) documents.id değerleri aynı sırayla yazılır"""
+        # numpy satırları pgvector adapter'ı ile doğrudan yazılır (tolist() kopyası yok)
+        data_chunk = [
+            (token, filename, texts[i], embeddings[i], *metadata[i])
+            for i in rows
+        ]
+        
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                cur = conn.cursor()
+                start_time = time.time()
+                
+                # id'ler yalnızca embedding store açıkken döndürülür (aksi halde fetch maliyeti yok)
+                returning = " RETURNING id" if ids_out is not None else ""
+                rows = psycopg2.extras.execute_values(
+                    cur,
+                    f"""
+                    INSERT INTO documents (token, filename, content, {embedding_column}, county, subscription_date, subscriber_type)
+                    VALUES %s{returning}
+                    """,
+                    data_chunk,
+                    template=None,
+                    page_size=2000,  # Büyük page size
+                    fetch=ids_out is not None
+                )
+                conn.commit()
+                if ids_out is not None:
+                    ids_out[:] = [r[0] for r in rows]
+                
+                elapsed = time.time() - start_time
+                speed = len(data_chunk) / elapsed if elapsed else float("inf")
+                print(f"💾 Chunk {chunk_id} ({threading.current_thread().name}): {len(data_chunk)} kayıt {elapsed:.2f}s'de kaydedildi ({speed:.0f} records/sec)")
+                return len(data_chunk)
+            
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                print(f"⚠️ Chunk {chunk_id} bağlantı hatası, yeniden bağlanılıyor: {e}")
+                self._reset_connection()
+            except Exception as e:
+                print(f"❌ Chunk {chunk_id} hatası: {e}")
+                try:
+                    conn.rollback()
+                except Exception:
+                    self._reset_connection()
+                return 0
+        return 0
+    
+    def parallel_bulk_insert(self, token: str, filename: str, texts: List[str], embeddings: np.ndarray,
+                             metadata: List[tuple], embedding_column: str = "embedding",
+                             ids_out: Optional[np.ndarray] = None) -> bool:
+        """Paralel bulk insert ile ultra hızlı kaydetme (metadata: satır başına ilçe, tarih, tip;
+        embedding_column: indirgenmiş vektörler için "embedding_reduced";
+        ids_out: len(texts) boyutlu int64 dizi - documents.id değerleri chunk'lar tarafından doldurulur)"""
         try:
             print(f"🔥 Ultra fast parallel insert: {len(texts)} kayıt, {self.workers} worker")
             start_time = time.time()
             
-            # Veriyi chunk'lara böl
-            data_chunks = []
-            for i in range(0, len(texts), self.chunk_size):
-                chunk_texts = texts[i:i+self.chunk_size]
-                chunk_embeddings = embeddings[i:i+self.chunk_size]
-                
-                chunk_data = [
-                    (token, filename, text, embedding.tolist())
-                    for text, embedding in zip(chunk_texts, chunk_embeddings)
-                ]
-                data_chunks.append(chunk_data)
-            
-            print(f"📊 {len(data_chunks)} chunk oluşturuldu, chunk başına ~{self.chunk_size} kayıt")
-            
-            # Paralel işleme için worker argümanları hazırla
-            worker_args = [
-                (i, chunk, token, filename) 
-                for i, chunk in enumerate(data_chunks)
+            # Liste dilimleri kopya olurdu; thread'lere tüm listeler ve satır aralığı verilir,
+            # her chunk satırları kendi thread'inde indeksle okur (ids_out dilimi numpy view'dır)
+            futures = [
+                self.executor.submit(
+                    self._insert_chunk, i // self.chunk_size, token, filename,
+                    texts, embeddings, metadata, range(i, min(i + self.chunk_size, len(texts))),
+                    embedding_column, None if ids_out is None else ids_out[i:i+self.chunk_size]
+                )
+                for i in range(0, len(texts), self.chunk_size)
             ]
+            print(f"📊 {len(futures)} chunk oluşturuldu, chunk başına ~{self.chunk_size} kayıt")
             
-            # ProcessPoolExecutor ile paralel insert
-            with ProcessPoolExecutor(max_workers=self.workers) as executor:
-                results = list(executor.map(db_worker_insert, worker_args))
-            
-            total_inserted = sum(results)
+            total_inserted = sum(f.result() for f in futures)
             elapsed = time.time() - start_time
-            speed = total_inserted / elapsed
+            speed = total_inserted / elapsed if elapsed else float("inf")
             
             print(f"🎉 Ultra fast insert tamamlandı!")
             print(f"📈 {total_inserted} kayıt {elapsed:.2f}s'de kaydedildi")
@@ -169,21 +199,43 @@ class UltraFastDatabaseInserter:
         except Exception as e:
             print(f"❌ Ultra fast insert hatası: {e}")
             return False
+    
+    def close(self):
+        """Havuzu ve kalıcı bağlantıları kapat"""
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
 
 # Global processor instances
 ultra_processor = UltraFastEmbeddingProcessor()
 ultra_inserter = UltraFastDatabaseInserter()
 
-async def ultra_fast_save_to_postgres(df, filename: str) -> Optional[str]:
-    """Ultra hızlı asenkron embedding ve kaydetme"""
+async def ultra_fast_save_to_postgres(df, filename: str, ttl_seconds: Optional[int] = None,
+                                      chunking: Optional[str] = None, group_keys=None,
+                                      reduction: Optional[tuple] = None) -> Optional[str]:
+    """Ultra hızlı asenkron embedding ve kaydetme (ttl_seconds: retention süresi, None ise varsayılan;
+    chunking: "row" satır başına, "rollup" group_keys gruplarına göre özet doküman;
+    reduction: (yöntem, boyut) verilirse token'a özel projeksiyonla indirgenmiş vektörler saklanır)"""
     token = str(uuid.uuid4())
+    chunking = chunking or rollup.DEFAULT_CHUNKING
     
-    print(f"🚀 Ultra Fast: {len(df)} satır işleniyor")
+    print(f"🚀 Ultra Fast: {len(df)} satır işleniyor (chunking: {chunking})")
     total_start = time.time()
+    registered = False
     
     try:
         # 1. Metinleri oluştur (hızlı)
-        texts = ultra_processor.create_texts_from_df(df)
+        if chunking == "rollup":
+            texts, metadata = rollup.build_rollup_documents(df, group_keys)
+            print(f"🧮 Rollup: {len(df)} satır -> {len(texts)} doküman")
+        else:
+            texts = ultra_processor.create_texts_from_df(df)
+            metadata = row_metadata(df)
         if not texts:
             return None
         
@@ -195,14 +247,46 @@ async def ultra_fast_save_to_postgres(df, filename: str) -> Optional[str]:
             texts
         )
         
-        # 3. Paralel ultra hızlı database insert
+        # 2b. Opsiyonel boyut indirgeme - projeksiyon örneklem üzerinde fit edilir, tüm vektörlere uygulanır
+        reducer = None
+        embedding_column = "embedding"
+        if reduction:
+            method, dim = reduction
+            reducer = await loop.run_in_executor(ultra_processor.executor, projection.Projection.fit, embeddings, method, dim)
+            embeddings = reducer.transform(embeddings)
+            embedding_column = "embedding_reduced"
+            variance = f", açıklanan varyans {reducer.explained_variance:.1%}" if reducer.explained_variance else ""
+            print(f"📉 Projeksiyon ({method}): {embeddings.shape[1]} boyut{variance}")
+        
+        # 3. Token insert'ten önce kaydedilir - yarıda kalan insert'in satırları da sweeper'ın kapsamında kalır
+        if not await loop.run_in_executor(
+            ultra_processor.executor,
+            retention.register_token,
+            token, filename, ttl_seconds
+        ):
+            return None
+        registered = True
+        
+        # 4. Paralel ultra hızlı database insert (shard'lar için documents.id'ler yalnızca store açıkken)
+        ids = np.empty(len(texts), dtype=np.int64) if embedding_store.enabled() else None
         success = await loop.run_in_executor(
             ultra_processor.executor,
             ultra_inserter.parallel_bulk_insert,
-            token, filename, texts, embeddings
+            token, filename, texts, embeddings, metadata, embedding_column, ids
         )
         
         if success:
+            # Projeksiyon token'a bağlı (retention ile birlikte silinir) - sorgular aynı matrisle indirgenir
+            # (kaydedilemezse indirgenmiş satırlar sorgulanamaz - token temizlenir)
+            if reducer is not None and not await loop.run_in_executor(
+                ultra_processor.executor, projection.save, token, reducer
+            ):
+                await _discard_token(token)
+                return None
+            # Vektörler atılmaz: yeniden index/yükleme/bellek içi arama için mmap shard'ları
+            # (arka planda yazılır, yanıtı bekletmez)
+            embedding_store.save_async(token, filename, ids, texts, embeddings, metadata,
+                                       embedding_column, reducer, chunking)
             total_time = time.time() - total_start
             total_speed = len(texts) / total_time
             print(f"🎯 ULTRA FAST TOPLAM: {len(texts)} kayıt {total_time:.2f}s'de tamamlandı")
@@ -210,39 +294,41 @@ async def ultra_fast_save_to_postgres(df, filename: str) -> Optional[str]:
             print(f"🎫 Token: {token}")
             return token
         else:
+            # Bazı chunk'lar yazılamadı - commit edilen kısmi satırlar token'la birlikte silinir
+            await _discard_token(token)
             return None
             
     except Exception as e:
         print(f"❌ Ultra fast process hatası: {e}")
+        if registered:
+            await _discard_token(token)
         return None
 
-# AsyncPG ile daha hızlı retrieval (opsiyonel)
+
+async def _discard_token(token: str):
+    """Başarısız ingestion'ın satırlarını ve retention kaydını sil"""
+    loop = asyncio.get_event_loop()
+    deleted = await loop.run_in_executor(ultra_processor.executor, retention.delete_token, token)
+    print(f"🗑️ Başarısız ingestion temizlendi: {deleted} kısmi satır silindi (token: {token})")
+
+# Ultra fast encoder ile retrieval - sorgu paylaşılan asyncpg havuzunda (repository)
 async def ultra_fast_retrieve_context(token: str, question: str, top_k: int = 10) -> str:
-    """Ultra hızlı asenkron retrieval"""
+    """Ultra hızlı asenkron retrieval - token'ın projeksiyonu varsa indirgenmiş kolonda arar"""
     try:
-        # Soruyu encode et
         loop = asyncio.get_event_loop()
         q_emb = await loop.run_in_executor(
             ultra_processor.executor,
-            lambda: ultra_processor.model.encode([question])[0]
+            lambda: ultra_processor.batcher.encode([question], normalize_embeddings=True)[0]
         )
+        reducer = await projection.for_token(token)
+        if reducer is not None:
+            q_emb = reducer.transform(q_emb)
+        contents = await repository.vector_search(token, q_emb, top_k, reduced=reducer.output_dim if reducer else 0)
         
-        # AsyncPG ile hızlı query
-        conn = await asyncpg.connect(DATABASE_URL)
-        
-        rows = await conn.fetch("""
-            SELECT content FROM documents
-            WHERE token = $1
-            ORDER BY embedding <=> $2::vector 
-            LIMIT $3
-        """, token, q_emb.tolist(), top_k)
-        
-        await conn.close()
-        
-        if not rows:
+        if not contents:
             return f"Token '{token}' için veri bulunamadı"
             
-        return "\n".join([row['content'] for row in rows])
+        return "\n".join(contents)
         
     except Exception as e:
         print(f"❌ Ultra fast retrieval hatası: {e}")
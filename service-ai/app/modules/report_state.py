@@ -0,0 +1,152 @@
+import os
+import json
+import time
+from typing import Optional
+
+from . import repository
+
+# Tek aktif rapor - tüm worker'lar aynı satırı okur/yazar
+STATE_KEY = "active"
+# Database'e ulaşılamazsa bu süre boyunca yerel duruma düşülür (her istekte bağlantı denenmez)
+RETRY_AFTER_SECONDS = int(os.getenv("REPORT_STATE_RETRY_SECONDS", "30"))
+# Sürüm kontrolü en fazla bu sıklıkta yapılır; aradaki istekler worker'ın cache'ini kullanır (0 = her istekte)
+CHECK_INTERVAL_MS = int(os.getenv("REPORT_STATE_CHECK_INTERVAL_MS", "250"))
+
+STATE_FIELDS = ("report_id", "filename", "file_hash", "dataset_path", "token", "embedding_status", "sketch")
+# JSONB olarak saklanan alanlar
+JSON_FIELDS = ("embedding_status", "sketch")
+
+CREATE_STATE_SQL = """
+    CREATE TABLE IF NOT EXISTS report_state (
+        state_key VARCHAR(64) PRIMARY KEY,
+        report_id VARCHAR(64),
+        filename VARCHAR(255),
+        file_hash CHAR(64),
+        dataset_path TEXT,
+        token VARCHAR(255),
+        embedding_status JSONB,
+        sketch JSONB,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    ALTER TABLE report_state ADD COLUMN IF NOT EXISTS sketch JSONB;
+"""
+LOAD_STATE_SQL = """
+    SELECT report_id, filename, file_hash, dataset_path, token, embedding_status::text AS embedding_status,
+           sketch::text AS sketch, updated_at
+    FROM report_state
+    WHERE state_key = $1
+"""
+# Her istekte yalnızca sürüm okunur; satırın tamamı (sketch JSONB dahil) sürüm değişince çekilir
+STATE_VERSION_SQL = "SELECT updated_at FROM report_state WHERE state_key = $1"
+
+_table_ready = False
+_unavailable_until = 0.0
+# Worker'ın son okuduğu durum (updated_at, durum)
+_cached = None
+# Son başarılı sürüm kontrolünün zamanı (time.monotonic)
+_checked_at = 0.0
+# Yerel duruma düşüldüğünden beri paylaşılan durum olmadan sunulan istek sayısı
+_degraded_requests = 0
+
+
+def available() -> bool:
+    return time.time() >= _unavailable_until
+
+
+def degraded() -> bool:
+    """Database hatası sonrası yerel duruma düşülmüş mü (sağlık kontrolü için)"""
+    return _unavailable_until > 0
+
+
+def _mark_unavailable(e: Exception):
+    global _unavailable_until
+    entering = not degraded()
+    _unavailable_until = time.time() + RETRY_AFTER_SECONDS
+    if entering:
+        print(f"⚠️ Paylaşılan rapor durumu kullanılamıyor, yerel duruma düşülüyor "
+              f"({RETRY_AFTER_SECONDS}s sonra tekrar denenecek; worker'lar farklı rapor görebilir): {e}")
+    else:
+        print(f"⚠️ Paylaşılan rapor durumu hâlâ kullanılamıyor ({_degraded_requests} istek yerel durumla sunuldu): {e}")
+
+
+def _mark_available():
+    global _unavailable_until, _degraded_requests
+    if degraded():
+        print(f"✅ Paylaşılan rapor durumu tekrar kullanılabilir ({_degraded_requests} istek yerel durumla sunuldu)")
+        _unavailable_until = 0.0
+        _degraded_requests = 0
+
+
+async def _pool():
+    global _table_ready
+    pool = await repository.get_pool()
+    if not _table_ready:
+        await pool.execute(CREATE_STATE_SQL)
+        _table_ready = True
+    return pool
+
+
+async def load() -> Optional[dict]:
+    """Paylaşılan durumu oku; database yoksa (veya henüz durum yazılmadıysa) None.
+    Worker başına cache'lenir - updated_at değişmedikçe aynı dict döner (değiştirilmemeli).
+    Diğer worker'ların yazdıkları en geç CHECK_INTERVAL_MS sonra görülür"""
+    global _cached, _checked_at, _degraded_requests
+    if not available():
+        _degraded_requests += 1
+        return None
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL_MS / 1000:
+        return _cached[1] if _cached is not None else None
+    try:
+        pool = await _pool()
+        version = await pool.fetchval(STATE_VERSION_SQL, STATE_KEY)
+        if version is not None and (_cached is None or _cached[0] != version):
+            row = await pool.fetchrow(LOAD_STATE_SQL, STATE_KEY)
+            _cached = _parse(row) if row is not None else None
+    except Exception as e:
+        _degraded_requests += 1
+        _mark_unavailable(e)
+        return None
+    _mark_available()
+    _checked_at = now
+    if version is None:
+        _cached = None
+        return None
+    return _cached[1]
+
+
+def _parse(row) -> tuple:
+    state = dict(row)
+    for name in JSON_FIELDS:
+        if state[name]:
+            state[name] = json.loads(state[name])
+    return state["updated_at"], state
+
+
+async def update(**fields) -> bool:
+    """Verilen alanları upsert et (diğer alanlar korunur)"""
+    global _checked_at
+    unknown = set(fields) - set(STATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Bilinmeyen durum alanı: {', '.join(sorted(unknown))}")
+    if not fields or not available():
+        return False
+
+    names = list(fields)
+    values = [json.dumps(fields[n], default=str) if n in JSON_FIELDS else fields[n] for n in names]
+    placeholders = [f"${i + 2}::jsonb" if n in JSON_FIELDS else f"${i + 2}" for i, n in enumerate(names)]
+    assignments = ", ".join(f"{n} = EXCLUDED.{n}" for n in names)
+    sql = f"""
+        INSERT INTO report_state (state_key, {', '.join(names)}, updated_at)
+        VALUES ($1, {', '.join(placeholders)}, CURRENT_TIMESTAMP)
+        ON CONFLICT (state_key) DO UPDATE SET {assignments}, updated_at = CURRENT_TIMESTAMP
+    """
+    try:
+        await (await _pool()).execute(sql, STATE_KEY, *values)
+    except Exception as e:
+        _mark_unavailable(e)
+        return False
+    _mark_available()
+    # Worker kendi yazdığını bir sonraki load'da hemen görsün
+    _checked_at = 0.0
+    return True
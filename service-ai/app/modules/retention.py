@@ -0,0 +1,291 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .db import get_connection
+from . import embedding_store
+
+# Varsayılan TTL: son erişimden bu kadar saniye sonra token silinir
+DEFAULT_TTL_SECONDS = int(os.getenv("REPORT_TTL_SECONDS", str(7 * 24 * 3600)))
+# Sweeper çalışma aralığı (0 = kapalı)
+SWEEP_INTERVAL_SECONDS = int(os.getenv("RETENTION_SWEEP_INTERVAL_SECONDS", "3600"))
+# Tek DELETE ifadesinde silinecek en fazla satır (kilit ve WAL patlamasını önler)
+SWEEP_BATCH_SIZE = int(os.getenv("RETENTION_SWEEP_BATCH_SIZE", "5000"))
+# Bir sweep turunda silinecek en fazla token
+SWEEP_MAX_TOKENS = int(os.getenv("RETENTION_SWEEP_MAX_TOKENS", "20"))
+# Silinen satırlar tablonun bu oranını aşarsa ivfflat index yeniden oluşturulur
+REINDEX_FRACTION = float(os.getenv("RETENTION_REINDEX_FRACTION", "0.2"))
+# last_accessed_at güncellemesi token başına en fazla bu sıklıkta yapılır
+TOUCH_INTERVAL_SECONDS = 60
+# Birden fazla worker varken sweep'i yalnızca kilidi alan çalıştırır
+SWEEP_LOCK_ID = 7_310_042
+
+# Sweeper kendi thread'inde çalışır, encoding/Gemini executor'larını bekletmez
+_sweeper_executor = ThreadPoolExecutor(max_workers=1)
+_last_touch = {}
+_orphans_adopted = False
+
+
+def register_token(token: str, filename: str, ttl_seconds: Optional[int] = None) -> bool:
+    """Yeni embedding token'ını retention tablosuna kaydet"""
+    conn = get_connection()
+    if conn is None:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO report_tokens (token, filename, ttl_seconds)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (token) DO UPDATE
+            SET last_accessed_at = CURRENT_TIMESTAMP, ttl_seconds = EXCLUDED.ttl_seconds
+        """, (token, filename, ttl_seconds or DEFAULT_TTL_SECONDS))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Token kayıt hatası: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def should_touch(token: str, force: bool = False) -> bool:
+    """Token başına dakikada en fazla bir last_accessed_at güncellemesi"""
+    now = time.time()
+    if not force and now - _last_touch.get(token, 0) < TOUCH_INTERVAL_SECONDS:
+        return False
+    _last_touch[token] = now
+    return True
+
+
+def touch_token(token: str, force: bool = False):
+    """Retrieval sırasında son erişim zamanını güncelle (token başına dakikada en fazla bir kez)"""
+    if not should_touch(token, force):
+        return
+
+    conn = get_connection()
+    if conn is None:
+        return
+    try:
+        cur = conn.cursor()
+        cur.execute("UPDATE report_tokens SET last_accessed_at = CURRENT_TIMESTAMP WHERE token = %s", (token,))
+        conn.commit()
+    except Exception as e:
+        print(f"❌ Token touch hatası: {e}")
+    finally:
+        conn.close()
+
+
+def set_ttl(token: str, ttl_seconds: int) -> bool:
+    conn = get_connection()
+    if conn is None:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("UPDATE report_tokens SET ttl_seconds = %s WHERE token = %s", (ttl_seconds, token))
+        updated = cur.rowcount > 0
+        conn.commit()
+        return updated
+    finally:
+        conn.close()
+
+
+def _adopt_orphan_tokens(cur):
+    """report_tokens tablosundan önce oluşmuş token'ları varsayılan TTL ile sahiplen"""
+    cur.execute("""
+        INSERT INTO report_tokens (token, filename, created_at, last_accessed_at, ttl_seconds)
+        SELECT d.token, MIN(d.filename), MIN(d.created_at), MAX(d.created_at), %s
+        FROM documents d
+        WHERE NOT EXISTS (SELECT 1 FROM report_tokens r WHERE r.token = d.token)
+        GROUP BY d.token
+        ON CONFLICT (token) DO NOTHING
+    """, (DEFAULT_TTL_SECONDS,))
+    return cur.rowcount
+
+
+def _delete_token(conn, token: str) -> int:
+    """Token'ın satırlarını sınırlı batch'ler halinde sil, her batch ayrı transaction"""
+    cur = conn.cursor()
+    deleted = 0
+    while True:
+        cur.execute("""
+            DELETE FROM documents
+            WHERE id IN (SELECT id FROM documents WHERE token = %s LIMIT %s)
+        """, (token, SWEEP_BATCH_SIZE))
+        batch = cur.rowcount
+        conn.commit()
+        deleted += batch
+        if batch < SWEEP_BATCH_SIZE:
+            break
+    cur.execute("DELETE FROM report_tokens WHERE token = %s", (token,))
+    conn.commit()
+    _last_touch.pop(token, None)
+    embedding_store.remove(token)
+    return deleted
+
+
+def delete_token(token: str) -> int:
+    """Token'ı hemen sil (yarıda kalan ingestion'ın satırlarını temizlemek için)"""
+    conn = get_connection()
+    if conn is None:
+        return 0
+    try:
+        return _delete_token(conn, token)
+    except Exception as e:
+        print(f"❌ Token silme hatası: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def sweep_once(max_tokens: int = SWEEP_MAX_TOKENS) -> dict:
+    """Süresi dolmuş token'ları sil, ardından VACUUM ANALYZE / gerekirse REINDEX"""
+    global _orphans_adopted
+    conn = get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database bağlantısı yok"}
+
+    start = time.time()
+    locked = False
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (SWEEP_LOCK_ID,))
+        locked = cur.fetchone()[0]
+        conn.commit()
+        if not locked:
+            return {"status": "skipped", "message": "Sweep başka bir worker'da çalışıyor"}
+
+        if not _orphans_adopted:
+            adopted = _adopt_orphan_tokens(cur)
+            conn.commit()
+            _orphans_adopted = True
+            if adopted:
+                print(f"🧹 {adopted} sahipsiz token retention tablosuna eklendi")
+
+        cur.execute("""
+            SELECT token FROM report_tokens
+            WHERE last_accessed_at + ttl_seconds * INTERVAL '1 second' < CURRENT_TIMESTAMP
+            ORDER BY last_accessed_at
+            LIMIT %s
+        """, (max_tokens,))
+        expired = [r[0] for r in cur.fetchall()]
+
+        deleted_rows = 0
+        for token in expired:
+            deleted_rows += _delete_token(conn, token)
+
+        maintenance = None
+        if deleted_rows:
+            cur.execute("SELECT COUNT(*) FROM documents")
+            remaining_rows = cur.fetchone()[0]
+            conn.commit()
+
+            # VACUUM/REINDEX CONCURRENTLY transaction dışında çalışmalı
+            conn.autocommit = True
+            cur.execute("VACUUM (ANALYZE) documents")
+            maintenance = "vacuum"
+            if deleted_rows >= REINDEX_FRACTION * (deleted_rows + remaining_rows):
+                cur.execute("REINDEX INDEX CONCURRENTLY documents_embedding_idx")
+                maintenance = "vacuum+reindex"
+
+        result = {
+            "status": "ok",
+            "expired_tokens": len(expired),
+            "deleted_rows": deleted_rows,
+            "maintenance": maintenance,
+            "elapsed_seconds": round(time.time() - start, 2),
+        }
+        if expired:
+            print(f"🧹 Retention sweep: {len(expired)} token, {deleted_rows} satır silindi ({maintenance})")
+        return result
+    except Exception as e:
+        print(f"❌ Retention sweep hatası: {e}")
+        return {"status": "error", "message": str(e)}
+    finally:
+        if locked:
+            try:
+                conn.rollback()
+                conn.cursor().execute("SELECT pg_advisory_unlock(%s)", (SWEEP_LOCK_ID,))
+            except Exception:
+                pass
+        conn.close()
+
+
+def storage_report(limit: int = 100) -> dict:
+    """Token başına satır sayısı, yaklaşık disk kullanımı ve son kullanma zamanı"""
+    conn = get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database bağlantısı yok"}
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT d.token,
+                   MIN(d.filename),
+                   COUNT(*) AS rows,
+                   SUM(pg_column_size(d.content) + COALESCE(pg_column_size(d.embedding), 0)
+                       + COALESCE(pg_column_size(d.embedding_reduced), 0)) AS bytes,
+                   r.created_at, r.last_accessed_at, r.ttl_seconds,
+                   r.last_accessed_at + r.ttl_seconds * INTERVAL '1 second' AS expires_at
+            FROM documents d
+            LEFT JOIN report_tokens r ON r.token = d.token
+            GROUP BY d.token, r.created_at, r.last_accessed_at, r.ttl_seconds
+            ORDER BY bytes DESC
+            LIMIT %s
+        """, (limit,))
+        tokens: List[dict] = [
+            {
+                "token": row[0],
+                "filename": row[1],
+                "rows": row[2],
+                "bytes": row[3],
+                "created_at": row[4],
+                "last_accessed_at": row[5],
+                "ttl_seconds": row[6],
+                "expires_at": row[7],
+            }
+            for row in cur.fetchall()
+        ]
+        cur.execute("""
+            SELECT pg_total_relation_size('documents'),
+                   pg_relation_size('documents'),
+                   pg_indexes_size('documents')
+        """)
+        total, table, indexes = cur.fetchone()
+        return {
+            "status": "ok",
+            "tokens": tokens,
+            "documents_total_bytes": total,
+            "documents_table_bytes": table,
+            "documents_index_bytes": indexes,
+        }
+    finally:
+        conn.close()
+
+
+async def sweeper_loop():
+    """Uygulama açıkken periyodik retention sweep"""
+    if SWEEP_INTERVAL_SECONDS <= 0:
+        return
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            await loop.run_in_executor(_sweeper_executor, sweep_once)
+        except Exception as e:
+            print(f"❌ Sweeper hatası: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+
+
+async def run_sweep_async() -> dict:
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_sweeper_executor, sweep_once)
+
+
+async def set_ttl_async(token: str, ttl_seconds: int) -> bool:
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, set_ttl, token, ttl_seconds)
+
+
+async def storage_report_async(limit: int = 100) -> dict:
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_sweeper_executor, storage_report, limit)
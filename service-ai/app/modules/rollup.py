@@ -0,0 +1,134 @@
+import os
+from typing import List, Tuple
+
+import pandas as pd
+
+from .trend import GROUP_COLUMNS
+from .dataset_store import to_datetime
+
+# Embedding stratejisi: "row" = satır başına bir doküman, "rollup" = grup başına özet doküman
+DEFAULT_CHUNKING = os.getenv("EMBEDDING_CHUNKING", "row")
+# Rollup grup anahtarları (virgülle ayrılmış): kırılım kolonları + en fazla bir dönem
+DEFAULT_GROUP_KEYS = os.getenv("ROLLUP_GROUP_KEYS", "county,month")
+
+CHUNKING_STRATEGIES = ("row", "rollup")
+
+# Dönem anahtarı -> pandas Period frekansı (W-SUN: Pazartesi başlayan hafta)
+PERIODS = {
+    "day": "D",
+    "week": "W-SUN",
+    "month": "M",
+    "quarter": "Q",
+    "year": "Y",
+}
+
+# Doküman metnindeki etiketler - özet/aksiyon parse'ı "İlçe:" ve "Abone:" alanlarını okur
+_DIMENSION_LABELS = {"county": "İlçe", "type": "Tip"}
+
+
+def parse_group_keys(group_keys=None) -> List[str]:
+    """'county,month' gibi anahtarları doğrula; en fazla bir dönem anahtarına izin verilir"""
+    if group_keys is None:
+        group_keys = DEFAULT_GROUP_KEYS
+    if isinstance(group_keys, str):
+        group_keys = [k.strip() for k in group_keys.split(",")]
+    keys = [k for k in group_keys if k]
+
+    if not keys:
+        raise ValueError("En az bir grup anahtarı gerekli")
+    unknown = [k for k in keys if k not in GROUP_COLUMNS and k not in PERIODS]
+    if unknown:
+        raise ValueError(f"Geçersiz grup anahtarı: {', '.join(unknown)} "
+                         f"(geçerli: {', '.join([*GROUP_COLUMNS, *PERIODS])})")
+    if sum(k in PERIODS for k in keys) > 1:
+        raise ValueError("En fazla bir dönem anahtarı kullanılabilir")
+    if len(set(keys)) != len(keys):
+        raise ValueError("Grup anahtarları tekrar edemez")
+    return keys
+
+
+def _period_label(start: pd.Timestamp, period: str) -> str:
+    if period == "day":
+        return start.strftime("%Y-%m-%d")
+    if period == "week":
+        return f"{start:%Y-%m-%d} haftası"
+    if period == "month":
+        return start.strftime("%Y-%m")
+    if period == "quarter":
+        return f"{start.year}Q{start.quarter}"
+    return str(start.year)
+
+
+def build_rollup_documents(df, group_keys=None) -> Tuple[List[str], List[tuple]]:
+    """Satırları (ilçe, ay) gibi gruplara topla; grup başına özet metin ve filtre metadata'sı üret.
+    Metadata tarihi dönemin başlangıcıdır, böylece tarih filtreleri rollup dokümanlarında da çalışır."""
+    keys = parse_group_keys(group_keys)
+    dimensions = [k for k in keys if k in GROUP_COLUMNS]
+    period = next((k for k in keys if k in PERIODS), None)
+
+    missing = [GROUP_COLUMNS[k] for k in dimensions if GROUP_COLUMNS[k] not in df.columns]
+    if period and 'SUBSCRIPTION_DATE' not in df.columns:
+        missing.append('SUBSCRIPTION_DATE')
+    if 'NUMBER_OF_SUBSCRIBER' not in df.columns:
+        missing.append('NUMBER_OF_SUBSCRIBER')
+    if missing:
+        raise ValueError(f"Rollup için kolon bulunamadı: {', '.join(missing)}")
+
+    # Tip kırılımı grup anahtarı değilse metne yerli/yabancı dağılımı eklenir
+    type_column = GROUP_COLUMNS["type"]
+    with_breakdown = "type" not in dimensions and type_column in df.columns
+
+    frame = pd.DataFrame({"value": pd.to_numeric(df['NUMBER_OF_SUBSCRIBER'], errors='coerce').fillna(0).to_numpy()})
+    for key in dimensions + (["type"] if with_breakdown else []):
+        frame[key] = df[GROUP_COLUMNS[key]].astype(str).to_numpy()
+    if period:
+        dates = to_datetime(df['SUBSCRIPTION_DATE']).to_numpy()
+        frame["period"] = dates
+        frame = frame[frame["period"].notna()]
+        frame["period"] = frame["period"].dt.to_period(PERIODS[period]).dt.start_time
+
+    group_columns = dimensions + (["period"] if period else [])
+    if frame.empty:
+        return [], []
+
+    grouped = frame.groupby(group_columns, sort=True)["value"]
+    stats = grouped.agg(["sum", "count", "mean", "min", "max"])
+
+    # Grubun ait olduğu dönemdeki (dönem yoksa tüm veri) toplam içindeki payı
+    if period and dimensions:
+        period_totals = stats["sum"].groupby(level="period").transform("sum")
+    else:
+        period_totals = pd.Series(stats["sum"].sum(), index=stats.index)
+    shares = (stats["sum"] / period_totals.where(period_totals != 0)).fillna(0) * 100
+
+    breakdown = None
+    if with_breakdown:
+        breakdown = frame.groupby(group_columns + ["type"], sort=True)["value"].sum().unstack(fill_value=0)
+        breakdown = breakdown.reindex(stats.index, fill_value=0)
+
+    texts, metadata = [], []
+    for position, (index, row) in enumerate(stats.iterrows()):
+        values = dict(zip(group_columns, index if isinstance(index, tuple) else (index,)))
+        parts = []
+        if period:
+            parts.append(f"Dönem:{_period_label(values['period'], period)}")
+        for key in dimensions:
+            parts.append(f"{_DIMENSION_LABELS[key]}:{values[key]}")
+        parts.append(f"Abone:{row['sum']:.0f}")
+        parts.append(f"Kayıt:{row['count']:.0f}")
+        parts.append(f"Ortalama:{row['mean']:.1f}")
+        parts.append(f"Min:{row['min']:.0f}")
+        parts.append(f"Max:{row['max']:.0f}")
+        parts.append(f"Pay:%{shares.iloc[position]:.1f}")
+        if breakdown is not None:
+            parts.extend(f"{name}:{value:.0f}" for name, value in breakdown.iloc[position].items())
+        texts.append(", ".join(parts))
+
+        metadata.append((
+            values.get("county"),
+            values["period"].date() if period else None,
+            values.get("type"),
+        ))
+
+    return texts, metadata
+
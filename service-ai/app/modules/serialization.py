@@ -0,0 +1,42 @@
+import datetime
+import numpy as np
+import pandas as pd
+import orjson
+from fastapi.responses import JSONResponse
+
+# numpy dizileri/skalerleri ve str olmayan anahtarlar orjson tarafından doğrudan serileştirilir
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """orjson'un doğrudan tanımadığı numpy/pandas tipleri"""
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Timestamp, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        # object dtype (ör. kolon adları) orjson'un numpy yolunda serileştirilemez
+        return obj.tolist() if obj.dtype == object else obj.to_numpy()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="list")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Serileştirilemeyen tip: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson tabanlı response - jsonable_encoder adımını atlar, numpy/pandas tiplerini doğrudan yazar"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,244 @@
+import os
+import math
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Bu boyuttan büyük dosyalar arka planda parse edilir; parse sürerken yaklaşık sonuçlar döner
+STREAMING_MIN_BYTES = int(os.getenv("SKETCH_STREAMING_MIN_BYTES", str(64 * 1024 ** 2)))
+# Yaklaşık sonuçların diğer worker'lara yayınlanma aralığı
+PUBLISH_INTERVAL_SECONDS = float(os.getenv("SKETCH_PUBLISH_INTERVAL_SECONDS", "1.0"))
+# Space-saving sayaç sayısı (farklı değer sayısı bunu aşmazsa sonuçlar kesin)
+TOP_K_CAPACITY = int(os.getenv("SKETCH_TOP_K_CAPACITY", "256"))
+# HyperLogLog register sayısı 2^p (p=14 -> ~%0.8 standart hata)
+HLL_PRECISION = int(os.getenv("SKETCH_HLL_PRECISION", "14"))
+# Quantile tahmini için reservoir örneklem boyutu
+RESERVOIR_SIZE = int(os.getenv("SKETCH_RESERVOIR_SIZE", "10000"))
+# Quantile hata sınırları için güven düzeyi (1 - delta)
+CONFIDENCE_DELTA = 0.05
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class SpaceSaving:
+    """Ağırlıklı space-saving: en büyük k anahtarın toplamı, anahtar başına üst hata sınırıyla"""
+
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, float] = {}
+        self.errors: Dict[str, float] = {}
+        self.total = 0.0
+
+    def update(self, keys, weights):
+        # Parça önce anahtar bazında toplanır - döngü farklı değer sayısı kadar döner
+        grouped = pd.Series(weights, copy=False).groupby(pd.Series(keys, copy=False).astype(str), sort=False).sum()
+        self.total += float(grouped.sum())
+        for key, weight in grouped.items():
+            if key in self.counts:
+                self.counts[key] += weight
+            elif len(self.counts) < self.capacity:
+                self.counts[key] = weight
+                self.errors[key] = 0.0
+            else:
+                # En küçük sayacı devral; eski değeri yeni anahtarın hata sınırı olur
+                victim = min(self.counts, key=self.counts.get)
+                floor = self.counts.pop(victim)
+                self.errors.pop(victim)
+                self.counts[key] = floor + weight
+                self.errors[key] = floor
+
+    def top(self, n: Optional[int] = None) -> Dict[str, float]:
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return dict(ranked[:n] if n else ranked)
+
+    def bounds(self) -> dict:
+        return {
+            "exact": not any(self.errors.values()),
+            "max_overcount": max(self.errors.values(), default=0.0),
+            # Space-saving garantisi: her tahmin gerçek değeri en fazla total/k aşar
+            "guarantee": self.total / self.capacity,
+        }
+
+
+class HyperLogLog:
+    """Farklı değer sayısı tahmini - pandas hash'i üzerinde vektörel register güncellemesi"""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        unique = pd.unique(pd.Series(values, copy=False).dropna().astype(str))
+        if len(unique) == 0:
+            return
+        hashes = pd.util.hash_array(np.asarray(unique, dtype=object))
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # frexp üssü = bit uzunluğu (rest < 2^53 olduğu için float dönüşümü kesin)
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (64 - self.p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Küçük kardinalitede linear counting
+            return self.m * math.log(self.m / zeros)
+        return float(raw)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+
+class RunningStats:
+    """Kesin toplam/ortalama/std/min/max - tek geçişte"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray):
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        self.sum_sq += float(np.square(values).sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        mean = self.sum / self.count
+        variance = max(self.sum_sq / self.count - mean * mean, 0.0)
+        return {"count": self.count, "sum": self.sum, "mean": round(mean, 4),
+                "std": round(math.sqrt(variance), 4), "min": self.min, "max": self.max}
+
+
+class Reservoir:
+    """Bottom-k örnekleme: her değere rastgele öncelik, en küçük k öncelik tutulur (düzgün örneklem)"""
+
+    def __init__(self, size: int = RESERVOIR_SIZE, seed: int = 0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.values = np.empty(0)
+        self.seen = 0
+
+    def update(self, values: np.ndarray):
+        if values.size == 0:
+            return
+        self.seen += int(values.size)
+        keys = np.concatenate([self.keys, self.rng.random(values.size)])
+        merged = np.concatenate([self.values, values])
+        if keys.size > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, merged = keys[keep], merged[keep]
+        self.keys, self.values = keys, merged
+
+    def quantiles(self) -> dict:
+        if self.values.size == 0:
+            return {}
+        return {f"p{int(q * 100)}": float(v) for q, v in zip(QUANTILES, np.quantile(self.values, QUANTILES))}
+
+    @property
+    def rank_error(self) -> float:
+        # Tam veri okunduysa ve örneklem taşmadıysa kesin; değilse DKW sınırı
+        if self.seen <= self.size:
+            return 0.0
+        return math.sqrt(math.log(2 / CONFIDENCE_DELTA) / (2 * self.values.size))
+
+
+class ReportSketch:
+    """Upload parse edilirken parça parça güncellenen özet; /kpi, /insights, /status yaklaşık cevapları"""
+
+    def __init__(self, filename: str = None, total_bytes: int = None):
+        self.filename = filename
+        self.total_bytes = total_bytes
+        self.started_at = time.time()
+        self.rows = 0
+        self.frames = 0
+        self.columns = []
+        self.subscribers = RunningStats()
+        self.quantiles = Reservoir()
+        self.counties = SpaceSaving()
+        self.types = SpaceSaving()
+        self.dates = SpaceSaving()
+        self.distinct_counties = HyperLogLog()
+        self.distinct_dates = HyperLogLog()
+
+    def update(self, frame: pd.DataFrame):
+        self.frames += 1
+        self.rows += len(frame)
+        if not self.columns:
+            self.columns = [str(c) for c in frame.columns]
+        if 'NUMBER_OF_SUBSCRIBER' not in frame.columns:
+            return
+
+        values = pd.to_numeric(frame['NUMBER_OF_SUBSCRIBER'], errors='coerce').to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        self.subscribers.update(values[present])
+        self.quantiles.update(values[present])
+        weights = np.where(present, values, 0.0)
+        if 'SUBSCRIPTION_COUNTY' in frame.columns:
+            self.counties.update(frame['SUBSCRIPTION_COUNTY'].to_numpy(), weights)
+            self.distinct_counties.update(frame['SUBSCRIPTION_COUNTY'].to_numpy())
+        if 'SUBSCRIBER_DOMESTIC_FOREIGN' in frame.columns:
+            self.types.update(frame['SUBSCRIBER_DOMESTIC_FOREIGN'].to_numpy(), weights)
+        if 'SUBSCRIPTION_DATE' in frame.columns:
+            self.dates.update(frame['SUBSCRIPTION_DATE'].to_numpy(), weights)
+            self.distinct_dates.update(frame['SUBSCRIPTION_DATE'].to_numpy())
+
+    def _insights(self) -> list:
+        # key_insights ile aynı cümleler, yaklaşık olduğu belirtilerek
+        insights = []
+        if self.counties.counts:
+            insights.append(f"En çok abone {next(iter(self.counties.top(1)))} ilçesinde bağlandı (yaklaşık).")
+        if self.dates.counts:
+            insights.append(f"En yoğun tarih {next(iter(self.dates.top(1)))} oldu (yaklaşık).")
+        return insights
+
+    def snapshot(self, status: str = "parsing") -> dict:
+        """JSON'a yazılabilir özet - report_state üzerinden worker'lar arasında paylaşılır"""
+        kpi = {}
+        error_bounds = {}
+        if self.subscribers.count:
+            # Toplam kesin: running sum
+            kpi["total_subscribers"] = self.subscribers.sum
+        if self.counties.counts:
+            kpi["county_distribution"] = self.counties.top()
+            error_bounds["county_distribution"] = self.counties.bounds()
+        if self.types.counts:
+            kpi["domestic_foreign_distribution"] = self.types.top()
+            error_bounds["domestic_foreign_distribution"] = self.types.bounds()
+
+        return {
+            "status": status,
+            "filename": self.filename,
+            "rows_processed": self.rows,
+            "frames_processed": self.frames,
+            "elapsed_seconds": round(time.time() - self.started_at, 2),
+            "columns": self.columns,
+            "kpi": kpi,
+            "error_bounds": error_bounds,
+            "insights": self._insights(),
+            "distinct": {
+                "counties": round(self.distinct_counties.estimate()),
+                "dates": round(self.distinct_dates.estimate()),
+                "relative_error": round(self.distinct_counties.relative_error, 4),
+            },
+            "subscriber_stats": {
+                **self.subscribers.summary(),
+                "quantiles": self.quantiles.quantiles(),
+                "quantile_rank_error": round(self.quantiles.rank_error, 4),
+            },
+        }
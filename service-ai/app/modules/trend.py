@@ -1,6 +1,199 @@
-def compute_trend(df):
+import base64
+import weakref
+import numpy as np
+import pandas as pd
+from . import downsample
+from .dataset_store import to_datetime
+
+# Desteklenen zaman çözünürlükleri (pandas offset alias)
+GRANULARITIES = {
+    "day": "D",
+    "week": "W-MON",
+    "month": "MS",
+    "quarter": "QS",
+    "year": "YS",
+}
+
+# Kırılım parametresi -> kolon adı
+GROUP_COLUMNS = {
+    "county": "SUBSCRIPTION_COUNTY",
+    "type": "SUBSCRIBER_DOMESTIC_FOREIGN",
+}
+
+# DataFrame başına tarih indeksli seri cache'i (id(df) -> entry)
+_series_cache = {}
+
+
+def _cache_entry(df):
+    """DataFrame için tarih indeksli çerçeveyi ve hesaplanmış serileri cache'ten getir"""
+    key = id(df)
+    entry = _series_cache.get(key)
+    if entry is not None and entry["ref"]() is df:
+        return entry
+
+    entry = {"ref": weakref.ref(df), "frame": None, "series": {}}
+    _series_cache[key] = entry
+    weakref.finalize(df, _series_cache.pop, key, None)
+    return entry
+
+
+def _date_frame(df, entry):
+    """Tarih indeksli çerçeveyi ilk ihtiyaçta oluştur"""
+    if entry["frame"] is None:
+        columns = ['NUMBER_OF_SUBSCRIBER'] + [c for c in GROUP_COLUMNS.values() if c in df.columns]
+        frame = df[columns].copy()
+        frame.index = to_datetime(df['SUBSCRIPTION_DATE'])
+        entry["frame"] = frame[frame.index.notna()].sort_index()
+    return entry["frame"]
+
+
+def _raw_series(df):
+    """Ham SUBSCRIPTION_DATE değerlerine göre toplam (legacy trend)"""
+    entry = _cache_entry(df)
+    if "raw" not in entry["series"]:
+        entry["series"]["raw"] = df.groupby('SUBSCRIPTION_DATE', observed=True)['NUMBER_OF_SUBSCRIBER'].sum()
+    return entry["series"]["raw"]
+
+
+def _resampled(df, granularity: str, group_by: str = None):
+    """Seçilen çözünürlükte toplam (Series) veya kırılım (DataFrame) hesapla - vektörel"""
+    entry = _cache_entry(df)
+    key = (granularity, group_by)
+    if key in entry["series"]:
+        return entry["series"][key]
+
+    frame = _date_frame(df, entry)
+    rule = GRANULARITIES[granularity]
+    if group_by is None:
+        result = frame['NUMBER_OF_SUBSCRIBER'].resample(rule, label='left', closed='left').sum()
+    else:
+        column = GROUP_COLUMNS[group_by]
+        if column not in frame.columns:
+            raise ValueError(f"'{column}' kolonu bulunamadı")
+        total = _resampled(df, granularity)
+        grouper = pd.Grouper(freq=rule, label='left', closed='left')
+        result = (
+            frame.groupby([grouper, column], observed=True)['NUMBER_OF_SUBSCRIBER'].sum()
+            .unstack(fill_value=0)
+            .reindex(total.index, fill_value=0)
+        )
+
+    entry["series"][key] = result
+    return result
+
+
+def _labels(index):
+    return index.strftime("%Y-%m-%d").tolist()
+
+
+def _downsample_positions(series, max_points: int, method: str) -> np.ndarray:
+    """Seri için korunacak pozisyonlar - x ekseni tarihse gerçek zaman aralıkları kullanılır"""
+    x = pd.to_datetime(series.index, errors='coerce')
+    if isinstance(x, pd.DatetimeIndex) and not x.hasnans:
+        x = x.asi8.astype(float)
+    else:
+        x = np.arange(len(series), dtype=float)
+    return downsample.select_indices(x, series.to_numpy(), max_points, method)
+
+
+def compute_trend(df, max_points: int = None, method: str = "lttb"):
     trend = {}
     if 'SUBSCRIPTION_DATE' in df.columns and 'NUMBER_OF_SUBSCRIBER' in df.columns:
-        trend_series = df.groupby('SUBSCRIPTION_DATE')['NUMBER_OF_SUBSCRIBER'].sum()
-        trend = {str(k): int(v) for k,v in trend_series.to_dict().items()}
+        trend_series = _raw_series(df)
+        if max_points and len(trend_series) > max_points:
+            trend_series = trend_series.iloc[_downsample_positions(trend_series, max_points, method)]
+        trend = dict(zip(map(str, trend_series.index), trend_series.to_numpy()))
     return trend
+
+
+def compute_trend_series(df, granularity: str = "day", group_by: str = None, rolling: int = None,
+                         max_points: int = None, method: str = "lttb"):
+    """Yeniden örneklenmiş trend: toplam seri, opsiyonel kırılım, hareketli ortalama ve görsel örnekleme"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Geçersiz granularity: {granularity}")
+    if group_by is not None and group_by not in GROUP_COLUMNS:
+        raise ValueError(f"Geçersiz group_by: {group_by}")
+
+    result = {"granularity": granularity, "series": {}}
+    if 'SUBSCRIPTION_DATE' not in df.columns or 'NUMBER_OF_SUBSCRIBER' not in df.columns:
+        return result
+
+    total = _resampled(df, granularity)
+    breakdown = _resampled(df, granularity, group_by) if group_by is not None else None
+    rolled = total.rolling(rolling, min_periods=1).mean().round(2) if rolling else None
+    rolled_breakdown = None
+    if rolling and breakdown is not None:
+        rolled_breakdown = breakdown.rolling(rolling, min_periods=1).mean().round(2)
+
+    # Toplam serinin seçilen noktaları tüm alt serilere uygulanır (ortak x ekseni)
+    if max_points and len(total) > max_points:
+        positions = _downsample_positions(total, max_points, method)
+        result["downsampled"] = {"method": method, "original_points": len(total), "points": len(positions)}
+        total = total.iloc[positions]
+        if breakdown is not None:
+            breakdown = breakdown.iloc[positions]
+        if rolled is not None:
+            rolled = rolled.iloc[positions]
+        if rolled_breakdown is not None:
+            rolled_breakdown = rolled_breakdown.iloc[positions]
+
+    labels = _labels(total.index)
+    result["series"] = dict(zip(labels, total.tolist()))
+
+    if breakdown is not None:
+        result["group_by"] = group_by
+        result["breakdown"] = {
+            str(name): dict(zip(labels, breakdown[name].tolist()))
+            for name in breakdown.columns
+        }
+
+    if rolled is not None:
+        result["rolling_window"] = rolling
+        result["rolling"] = {"series": dict(zip(labels, rolled.tolist()))}
+        if rolled_breakdown is not None:
+            result["rolling"]["breakdown"] = {
+                str(name): dict(zip(labels, rolled_breakdown[name].tolist()))
+                for name in rolled_breakdown.columns
+            }
+
+    return result
+
+
+def _encode_cursor(label: str) -> str:
+    return base64.urlsafe_b64encode(label.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except Exception:
+        raise ValueError("Geçersiz cursor")
+
+
+def trend_page(df, granularity: str = None, cursor: str = None, limit: int = 1000):
+    """Ham trend noktalarına cursor tabanlı sayfalı erişim"""
+    if 'SUBSCRIPTION_DATE' not in df.columns or 'NUMBER_OF_SUBSCRIBER' not in df.columns:
+        return {"points": [], "next_cursor": None, "total_points": 0}
+
+    if granularity is None:
+        series = _raw_series(df)
+        labels = pd.Index(series.index.map(str))
+    else:
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Geçersiz granularity: {granularity}")
+        series = _resampled(df, granularity)
+        labels = pd.Index(_labels(series.index))
+
+    start = 0
+    if cursor:
+        after = _decode_cursor(cursor)
+        if after not in labels:
+            raise ValueError("Geçersiz cursor")
+        start = labels.get_loc(after) + 1
+
+    end = min(start + limit, len(series))
+    page_labels = labels[start:end].tolist()
+    points = [{"date": d, "value": v} for d, v in zip(page_labels, series.iloc[start:end].tolist())]
+    next_cursor = _encode_cursor(page_labels[-1]) if end < len(series) and page_labels else None
+
+    return {"points": points, "next_cursor": next_cursor, "total_points": len(series)}
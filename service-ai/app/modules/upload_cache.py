@@ -0,0 +1,32 @@
+import hashlib
+from typing import Optional, Tuple
+
+from . import rollup
+
+# Upload okunurken hash'e beslenen parça boyutu
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+async def read_and_hash(file) -> Tuple[bytes, str]:
+    """UploadFile'ı parça parça oku, okurken SHA-256 hesapla (ikinci bir geçiş yok)"""
+    digest = hashlib.sha256()
+    chunks = []
+    while True:
+        chunk = await file.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+def embedding_key(chunking: Optional[str], group_keys=None, reduction: Optional[tuple] = None) -> str:
+    """Aynı dosya farklı chunking/boyut indirgeme ayarıyla farklı token üretir - dedup anahtarına dahil edilir"""
+    chunking = chunking or rollup.DEFAULT_CHUNKING
+    key = chunking
+    if chunking == "rollup":
+        key = f"rollup:{','.join(rollup.parse_group_keys(group_keys))}"
+    if reduction:
+        key += f"|{reduction[0]}{reduction[1]}"
+    return key
+
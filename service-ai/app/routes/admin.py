@@ -0,0 +1,78 @@
+from fastapi import APIRouter, HTTPException, Header, Depends, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+import os
+import secrets
+
+from ..modules import retention, profiler
+from ..modules.serialization import FastJSONResponse
+
+# Admin endpoint'leri yalnızca ADMIN_API_KEY tanımlıysa ve X-Admin-Key eşleşirse açılır
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+
+
+def require_admin(x_admin_key: str = Header(None)):
+    """Admin yetkisi kontrolü"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin endpoint'leri devre dışı (ADMIN_API_KEY tanımlı değil)")
+    # Sabit süreli karşılaştırma - yanıt süresinden anahtar tahmin edilemesin
+    if not secrets.compare_digest((x_admin_key or "").encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Geçersiz admin anahtarı")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)], default_response_class=FastJSONResponse)
+
+
+class TokenTTL(BaseModel):
+    ttl_seconds: int = Field(..., ge=60)
+
+
+@router.get("/storage")
+async def get_storage(limit: int = Query(100, ge=1, le=1000)):
+    """Token başına depolama raporu"""
+    report = await retention.storage_report_async(limit)
+    if report.get("status") == "error":
+        raise HTTPException(status_code=503, detail=report["message"])
+    return FastJSONResponse(report)
+
+
+@router.post("/retention/sweep")
+async def run_retention_sweep():
+    """Süresi dolmuş token'ları hemen temizle"""
+    result = await retention.run_sweep_async()
+    if result.get("status") == "error":
+        raise HTTPException(status_code=503, detail=result["message"])
+    return result
+
+
+@router.put("/tokens/{token}/ttl")
+async def update_token_ttl(token: str, body: TokenTTL):
+    """Token'ın TTL değerini güncelle"""
+    if not await retention.set_ttl_async(token, body.ttl_seconds):
+        raise HTTPException(status_code=404, detail="Token bulunamadı")
+    return {"token": token, "ttl_seconds": body.ttl_seconds}
+
+
+@router.post("/profile")
+async def run_profile(
+    seconds: float = Query(None, gt=0, le=profiler.MAX_SECONDS, description="Canlı zaman penceresi"),
+    requests: int = Query(None, ge=1, le=10000, description="Sonraki N isteği profille"),
+    timeout: float = Query(60, gt=0, le=profiler.MAX_SECONDS, description="requests modunda en uzun bekleme"),
+    interval_ms: float = Query(profiler.DEFAULT_INTERVAL_MS, ge=1, le=1000),
+    include_idle: bool = False,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+):
+    """Örnekleyen profiler - tüm thread'ler (event loop, encode/Gemini executor'ları, insert havuzu).
+    Yalnızca bu isteği karşılayan worker process'i profillenir (rapordaki pid)."""
+    if (seconds is None) == (requests is None):
+        raise HTTPException(status_code=400, detail="seconds veya requests parametrelerinden yalnızca biri verilmeli")
+    try:
+        session = profiler.start(interval_ms, include_idle, requests)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    await session.wait(seconds if seconds is not None else timeout)
+    report = session.report()
+    if format == "collapsed":
+        return PlainTextResponse("\n".join(report["collapsed"]) + "\n")
+    return FastJSONResponse(report)
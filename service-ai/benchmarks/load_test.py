@@ -0,0 +1,314 @@
+"""
+AI servisi için yük testi.
+
+app.main uygulamasını aynı process içinde bir thread'de uvicorn ile ayağa kaldırır,
+Gemini çağrılarını ayarlanabilir gecikme ve 429 oranına sahip sahte bir modelle değiştirir
+ve eşzamanlı sanal kullanıcılarla karışık iş yükü uygular:
+  - farklı boyutlarda upload'lar
+  - dashboard polling: /kpi, /trend, /status, /embedding-status
+  - /chat ve /summary
+
+Endpoint başına p50/p95/p99 gecikme, throughput ve hata oranı raporlanır.
+
+Kullanım:
+    python -m benchmarks.load_test --users 50 --duration 60 --gemini-latency-ms 800 --gemini-429-rate 0.05
+    python -m benchmarks.load_test --mix kpi=10,trend=5,status=5,chat=1 --json sonuc.json
+
+Varsayılan olarak upload'lar enable_ai=false ile yapılır (PostgreSQL gerekmez);
+embedding/retrieval yolunu da ölçmek için --enable-ai kullanın.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+# Sahte anahtar: /chat route'u import sırasında GEMINI_API_KEY kontrol eder
+os.environ.setdefault("GEMINI_API_KEY", "load-test")
+
+import google.generativeai as genai  # noqa: E402
+
+from benchmarks.serialization_bench import build_dataset  # noqa: E402
+
+DEFAULT_MIX = "upload_small=1,upload_medium=0.5,upload_large=0.1,kpi=8,trend=6,status=6,embedding_status=6,chat=2,summary=1"
+UPLOAD_SIZES = {"upload_small": 1_000, "upload_medium": 50_000, "upload_large": 500_000}
+
+
+class FakeGemini:
+    """genai.GenerativeModel yerine geçen sahte model - gecikme ve 429 oranı ayarlanabilir"""
+    latency = 0.5
+    jitter = 0.2
+    rate_limit_ratio = 0.0
+    stream_chunks = 8
+
+    def __init__(self, model_name=None, *args, **kwargs):
+        self.model_name = model_name
+
+    @classmethod
+    def _delay(cls) -> float:
+        return max(0.0, random.gauss(cls.latency, cls.latency * cls.jitter))
+
+    @classmethod
+    def _maybe_rate_limit(cls):
+        if random.random() < cls.rate_limit_ratio:
+            raise Exception("429 Resource has been exhausted (e.g. check quota).")
+
+    @staticmethod
+    def _response(prompt: str):
+        words = f"Sahte analiz yanıtı ({len(prompt)} karakterlik prompt): ilçe bazında artış, hizmet geliştirme önerisi".split()
+        return words
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self._delay())
+        self._maybe_rate_limit()
+        return _FakeResponse(" ".join(self._response(prompt)))
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        if stream:
+            self._maybe_rate_limit()
+            return _FakeStream(self._response(prompt), self._delay(), self.stream_chunks)
+        await asyncio.sleep(self._delay())
+        self._maybe_rate_limit()
+        return _FakeResponse(" ".join(self._response(prompt)))
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeStream:
+    """Toplam gecikmeyi parçalara yayarak token akıtan sahte stream"""
+
+    def __init__(self, words, total_delay: float, chunks: int):
+        self.words = words
+        self.step = total_delay / max(chunks, 1)
+        self.chunks = chunks
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        size = max(1, len(self.words) // self.chunks)
+        for i in range(0, len(self.words), size):
+            await asyncio.sleep(self.step)
+            yield _FakeResponse(" ".join(self.words[i:i + size]) + " ")
+
+
+def install_fake_gemini(latency_ms: float, rate_limit_ratio: float):
+    FakeGemini.latency = latency_ms / 1000
+    FakeGemini.rate_limit_ratio = rate_limit_ratio
+    genai.GenerativeModel = FakeGemini
+    genai.configure = lambda *args, **kwargs: None
+
+
+class ServerThread(threading.Thread):
+    """uvicorn'u arka plan thread'inde çalıştır"""
+
+    def __init__(self, app, host: str, port: int):
+        super().__init__(daemon=True)
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning",
+                                                    timeout_keep_alive=120))
+
+    def run(self):
+        self.server.run()
+
+    def wait_started(self, timeout: float = 120):
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline or not self.is_alive():
+                raise RuntimeError("Sunucu başlatılamadı")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join(timeout=10)
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(UPLOAD_SIZES) - {"kpi", "trend", "status", "embedding_status", "chat", "summary"}
+    if unknown:
+        raise SystemExit(f"Bilinmeyen iş yükü: {', '.join(sorted(unknown))}")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def build_uploads(mix: dict) -> dict:
+    """İş yükündeki her upload boyutu için CSV içeriğini bir kez üret"""
+    uploads = {}
+    for name, rows in UPLOAD_SIZES.items():
+        if name in mix:
+            uploads[name] = build_dataset(rows, dates=min(rows, 3000), counties=39).to_csv(index=False).encode()
+    return uploads
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, elapsed: float, status):
+        self.latencies[name].append(elapsed)
+        self.statuses[name][status] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[name] += 1
+
+    def report(self, wall_seconds: float) -> dict:
+        rows = {}
+        for name, values in sorted(self.latencies.items()):
+            ms = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            rows[name] = {
+                "requests": len(values),
+                "errors": self.errors[name],
+                "error_rate": self.errors[name] / len(values),
+                "throughput_rps": len(values) / wall_seconds,
+                "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": ms.max(),
+                "statuses": {str(k): v for k, v in self.statuses[name].items()},
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        errors = sum(self.errors.values())
+        return {
+            "endpoints": rows,
+            "total": {
+                "requests": total,
+                "errors": errors,
+                "error_rate": errors / total if total else 0.0,
+                "throughput_rps": total / wall_seconds,
+                "wall_seconds": wall_seconds,
+            },
+        }
+
+
+async def run_operation(client: httpx.AsyncClient, name: str, uploads: dict, enable_ai: bool):
+    """Tek isteği gönder, HTTP durum kodunu (SSE error event'inde "sse_error") döndür"""
+    response = await _request(client, name, uploads, enable_ai)
+    return response if isinstance(response, str) else response.status_code
+
+
+async def _request(client: httpx.AsyncClient, name: str, uploads: dict, enable_ai: bool):
+    if name in uploads:
+        return await client.post(
+            "/analyze/upload",
+            params={"enable_ai": str(enable_ai).lower()},
+            files={"file": (f"{name}.csv", uploads[name], "text/csv")},
+        )
+    if name == "kpi":
+        return await client.get("/analyze/kpi")
+    if name == "trend":
+        params = random.choice([{}, {"granularity": "week"}, {"granularity": "month", "group_by": "county"}])
+        return await client.get("/analyze/trend", params=params)
+    if name == "status":
+        return await client.get("/analyze/status")
+    if name == "embedding_status":
+        return await client.get("/analyze/embedding-status")
+    if name == "summary":
+        return await client.get("/analyze/summary")
+    if name == "chat":
+        stream = random.random() < 0.5
+        payload = {"message": "Kadıköy'de son ayda abone sayısı nasıl değişti?",
+                   "include_data_context": enable_ai, "stream": stream}
+        if not stream:
+            return await client.post("/analyze/chat", json=payload)
+        # SSE: yanıt tamamen okunana kadar süre ölçülür, error event'i hata sayılır
+        async with client.stream("POST", "/analyze/chat", json=payload) as response:
+            body = b"".join([chunk async for chunk in response.aiter_bytes()])
+        return "sse_error" if b"event: error" in body else response
+    raise ValueError(name)
+
+
+async def virtual_user(client, names, weights, uploads, enable_ai, deadline, recorder, think_time):
+    while time.time() < deadline:
+        name = random.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = await run_operation(client, name, uploads, enable_ai)
+        except Exception as e:
+            status = type(e).__name__
+        recorder.record(name, time.perf_counter() - start, status)
+        if think_time:
+            await asyncio.sleep(random.uniform(0, 2 * think_time))
+
+
+async def run_load(base_url: str, args, mix: dict, uploads: dict) -> dict:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        # Dashboard endpoint'leri için başlangıçta bir veri seti yüklü olsun
+        seed = uploads.get("upload_small") or build_dataset(1_000, 365, 39).to_csv(index=False).encode()
+        response = await client.post("/analyze/upload", params={"enable_ai": str(args.enable_ai).lower()},
+                                     files={"file": ("seed.csv", seed, "text/csv")})
+        response.raise_for_status()
+
+        recorder = Recorder()
+        names, weights = list(mix), list(mix.values())
+        started = time.time()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            virtual_user(client, names, weights, uploads, args.enable_ai, deadline, recorder, args.think_time)
+            for _ in range(args.users)
+        ])
+        return recorder.report(time.time() - started)
+
+
+def print_report(report: dict):
+    print(f"\n{'endpoint':<18}{'req':>8}{'err%':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<18}{row['requests']:>8}{row['error_rate'] * 100:>7.1f}%{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    total = report["total"]
+    print(f"{'TOPLAM':<18}{total['requests']:>8}{total['error_rate'] * 100:>7.1f}%{total['throughput_rps']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI servisi karışık iş yükü yük testi")
+    parser.add_argument("--users", type=int, default=20, help="Eşzamanlı sanal kullanıcı")
+    parser.add_argument("--duration", type=float, default=30, help="Test süresi (saniye)")
+    parser.add_argument("--think-time", type=float, default=0.1, help="İstekler arası ortalama bekleme (saniye)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="iş_yükü=ağırlık listesi")
+    parser.add_argument("--gemini-latency-ms", type=float, default=500)
+    parser.add_argument("--gemini-429-rate", type=float, default=0.0)
+    parser.add_argument("--enable-ai", action="store_true", help="Upload'larda embedding (PostgreSQL gerekir)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Raporu bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    mix = parse_mix(args.mix)
+    install_fake_gemini(args.gemini_latency_ms, args.gemini_429_rate)
+
+    # Sahte Gemini kurulduktan sonra import edilir
+    from app.main import app
+
+    uploads = build_uploads(mix)
+    server = ServerThread(app, args.host, args.port)
+    server.start()
+    server.wait_started()
+    print(f"🚀 {args.users} kullanıcı, {args.duration:.0f}s, Gemini {args.gemini_latency_ms:.0f}ms / "
+          f"%{args.gemini_429_rate * 100:.1f} 429, iş yükü: {mix}")
+    try:
+        report = asyncio.run(run_load(f"http://{args.host}:{args.port}", args, mix, uploads))
+    finally:
+        server.stop()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Boyut indirgeme için recall / boyut raporu.
+
+Sentetik (veya --file ile verilen) veri setinden upload ile aynı doküman metinlerini üretir,
+aynı modelle encode eder ve her yöntem/boyut için:
+  - recall@k: indirgenmiş vektörlerle bulunan top-k'nın tam boyutlu top-k ile kesişimi
+  - vektör başına depolama (pgvector: 4 * boyut + 8 byte) ve tam boyuta oranı
+  - tüm sorgular için brute-force arama süresi ve hızlanma
+  - PCA için açıklanan varyans ve fit süresi
+raporlanır. Sorgular veri setindeki ilçe/tarih/tip değerlerinden üretilen doğal dil sorularıdır.
+
+Kullanım:
+    python -m benchmarks.projection_recall --rows 50000 --dims 32,64,96,128,192 --k 10
+    python -m benchmarks.projection_recall --file veri.csv --rollup --json recall.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.modules import parser as file_parser, rollup
+from app.modules.projection import Projection
+from app.modules.rag_ultra_fast import ultra_processor
+from benchmarks.serialization_bench import build_dataset
+
+QUESTION_TEMPLATES = (
+    "{county} ilçesinde {date} tarihinde kaç abone var?",
+    "{county} {month} ayı abone sayısı",
+    "{date} günü {kind} abone sayısı nedir?",
+    "{county} ilçesindeki {kind} aboneler",
+    "{month} döneminde en çok abone hangi ilçede?",
+)
+
+
+def build_questions(df, count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    counties = df["SUBSCRIPTION_COUNTY"].astype(str).unique()
+    dates = df["SUBSCRIPTION_DATE"].astype(str).unique()
+    kinds = df["SUBSCRIBER_DOMESTIC_FOREIGN"].astype(str).unique() if "SUBSCRIBER_DOMESTIC_FOREIGN" in df else ["Yerli"]
+    questions = []
+    for i in range(count):
+        date = str(rng.choice(dates))
+        questions.append(QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)].format(
+            county=rng.choice(counties), date=date, month=date[:7], kind=rng.choice(kinds)
+        ))
+    return questions
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def top_k(documents: np.ndarray, queries: np.ndarray, k: int):
+    """Kosinüs benzerliğine göre sorgu başına top-k indeksleri ve süre (ms)"""
+    start = time.perf_counter()
+    scores = _normalize(queries) @ _normalize(documents).T
+    idx = np.argpartition(-scores, k, axis=1)[:, :k]
+    return idx, (time.perf_counter() - start) * 1000
+
+
+def recall_at_k(exact: np.ndarray, approx: np.ndarray) -> float:
+    k = exact.shape[1]
+    return float(np.mean([len(set(e) & set(a)) / k for e, a in zip(exact, approx)]))
+
+
+def run(documents: np.ndarray, queries: np.ndarray, dims, methods, k: int, seed: int) -> dict:
+    full_dim = documents.shape[1]
+    exact, full_ms = top_k(documents, queries, k)
+    rows = [{"method": "full", "dim": full_dim, "recall": 1.0, "bytes_per_vector": 4 * full_dim + 8,
+             "storage_ratio": 1.0, "search_ms": round(full_ms, 2), "speedup": 1.0}]
+    for method in methods:
+        for dim in dims:
+            start = time.perf_counter()
+            projection = Projection.fit(documents, method, dim, seed=seed)
+            fit_ms = (time.perf_counter() - start) * 1000
+            approx, search_ms = top_k(projection.transform(documents), projection.transform(queries), k)
+            size = 4 * dim + 8
+            rows.append({
+                "method": method,
+                "dim": dim,
+                "recall": round(recall_at_k(exact, approx), 4),
+                "bytes_per_vector": size,
+                "storage_ratio": round((4 * full_dim + 8) / size, 2),
+                "search_ms": round(search_ms, 2),
+                "speedup": round(full_ms / search_ms, 2) if search_ms else None,
+                "fit_ms": round(fit_ms, 1),
+                "explained_variance": projection.explained_variance,
+            })
+    return {"documents": len(documents), "queries": len(queries), "k": k, "results": rows}
+
+
+def print_report(report: dict):
+    print(f"\n{report['documents']} doküman, {report['queries']} sorgu, recall@{report['k']}")
+    print(f"{'yöntem':<8}{'boyut':>7}{'recall':>9}{'byte':>7}{'depolama':>10}{'arama ms':>10}{'hız':>7}{'varyans':>9}")
+    for row in report["results"]:
+        variance = f"{row['explained_variance']:.1%}" if row.get("explained_variance") else "-"
+        print(f"{row['method']:<8}{row['dim']:>7}{row['recall']:>9.3f}{row['bytes_per_vector']:>7}"
+              f"{row['storage_ratio']:>9.1f}x{row['search_ms']:>10.1f}{row['speedup']:>6.1f}x{variance:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding boyut indirgeme recall raporu")
+    parser.add_argument("--file", help="Sentetik veri yerine bu dosyayı kullan (csv/xlsx/pdf)")
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--dates", type=int, default=730)
+    parser.add_argument("--counties", type=int, default=39)
+    parser.add_argument("--rollup", action="store_true", help="Satır yerine rollup dokümanları")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", default="32,64,96,128,192")
+    parser.add_argument("--methods", default="pca,random")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Raporu bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            df = file_parser.parse_file(args.file, f.read())
+    else:
+        df = build_dataset(args.rows, args.dates, args.counties, seed=args.seed)
+    if args.rollup:
+        texts, _ = rollup.build_rollup_documents(df, rollup.DEFAULT_GROUP_KEYS)
+    else:
+        texts = ultra_processor.create_texts_from_df(df)
+
+    documents = ultra_processor.ultra_fast_encode(texts)
+    queries = ultra_processor.batcher.encode(build_questions(df, args.queries, args.seed), normalize_embeddings=True)
+    report = run(documents, queries, [int(d) for d in args.dims.split(",")], args.methods.split(","),
+                 min(args.k, len(texts) - 1), args.seed)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Rapor yazıldı: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
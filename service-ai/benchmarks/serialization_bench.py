@@ -0,0 +1,91 @@
+"""
+Endpoint bazında JSON serileştirme benchmark'ı.
+
+Sentetik bir İBB Wi-Fi veri seti üzerinde /kpi, /trend, /status yanıtlarını ve
+compare() çıktısını oluşturur ve iki yolu karşılaştırır:
+  - default: int() dönüşüm döngüleri + jsonable_encoder + json.dumps (FastAPI varsayılanı)
+  - orjson:  numpy tipleri olduğu gibi FastJSONResponse.render
+
+Kullanım:
+    python -m benchmarks.serialization_bench --rows 1000000 --dates 3000 --counties 39
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from app.modules import kpi, trend, compare
+from app.modules.serialization import FastJSONResponse
+
+
+def build_dataset(rows: int, dates: int, counties: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    date_values = pd.date_range("2015-01-01", periods=dates).strftime("%Y-%m-%d").to_numpy()
+    county_values = np.array([f"ILCE-{i:02d}" for i in range(counties)])
+    return pd.DataFrame({
+        "SUBSCRIPTION_DATE": date_values[rng.integers(0, dates, rows)],
+        "SUBSCRIPTION_COUNTY": county_values[rng.integers(0, counties, rows)],
+        "SUBSCRIBER_DOMESTIC_FOREIGN": np.where(rng.random(rows) < 0.8, "Yerli", "Yabancı"),
+        "NUMBER_OF_SUBSCRIBER": rng.integers(1, 500, rows),
+    })
+
+
+def legacy_ints(obj):
+    """Eski int(v) döngülerinin eşdeğeri - numpy skalerlerini Python int'e çevirir"""
+    if isinstance(obj, dict):
+        return {str(k): legacy_ints(v) for k, v in obj.items()}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def default_render(payload) -> bytes:
+    content = jsonable_encoder(legacy_ints(payload))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def orjson_render(payload) -> bytes:
+    return FastJSONResponse(payload).body
+
+
+def timed(fn, payload, repeat: int):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(payload)
+        best = min(best, time.perf_counter() - start)
+        size = len(body)
+    return best * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint serileştirme benchmark'ı")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dates", type=int, default=3000)
+    parser.add_argument("--counties", type=int, default=39)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = build_dataset(args.rows, args.dates, args.counties)
+    payloads = {
+        "/kpi": {"kpi": kpi.compute_kpi(df)},
+        "/trend": {"trend": trend.compute_trend(df)},
+        "/trend?granularity=day&group_by=county": trend.compute_trend_series(df, "day", "county"),
+        "/status": {"status": "data_loaded", "rows": len(df), "columns": list(df.columns)},
+        "compare()": {"compare": compare.compare(df, "ILCE-00", "ILCE-01")},
+    }
+
+    print(f"{'endpoint':<42}{'default ms':>12}{'orjson ms':>12}{'speedup':>10}{'bytes':>12}")
+    for endpoint, payload in payloads.items():
+        default_ms, _ = timed(default_render, payload, args.repeat)
+        orjson_ms, size = timed(orjson_render, payload, args.repeat)
+        speedup = default_ms / orjson_ms if orjson_ms else float("inf")
+        print(f"{endpoint:<42}{default_ms:>12.2f}{orjson_ms:>12.2f}{speedup:>9.1f}x{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@
 -- Create pgvector extension
 CREATE EXTENSION IF NOT EXISTS vector;
 
+-- Trigram extension (optional lexical score for hybrid retrieval)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create documents table for embeddings
 CREATE TABLE IF NOT EXISTS documents (
     id SERIAL PRIMARY KEY,
@@ -11,6 +14,15 @@ CREATE TABLE IF NOT EXISTS documents (
     filename VARCHAR(255) NOT NULL,
     content TEXT NOT NULL,
     embedding vector(384),
+    -- Reduced vector for tokens ingested with a per-token projection (dimension varies per token).
+    -- Indexed per dimension at runtime (projection.ensure_index):
+    --   CREATE INDEX documents_embedding_reduced_<N>_idx ON documents
+    --   USING hnsw ((embedding_reduced::vector(<N>)) vector_cosine_ops)
+    --   WHERE vector_dims(embedding_reduced) = <N>;
+    embedding_reduced vector,
+    county VARCHAR(255),
+    subscription_date DATE,
+    subscriber_type VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -22,6 +34,64 @@ WITH (lists = 100);
 -- Create index for token-based queries
 CREATE INDEX IF NOT EXISTS documents_token_idx ON documents(token);
 
+-- Create index for structured filter pushdown (hybrid retrieval)
+CREATE INDEX IF NOT EXISTS documents_token_filters_idx ON documents(token, county, subscription_date);
+
+-- Retention metadata: per-token TTL and last access time
+CREATE TABLE IF NOT EXISTS report_tokens (
+    token VARCHAR(255) PRIMARY KEY,
+    filename VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ttl_seconds INTEGER NOT NULL DEFAULT 604800
+);
+
+-- Per-token projection matrix for the reduced embedding mode
+CREATE TABLE IF NOT EXISTS token_projections (
+    token VARCHAR(255) PRIMARY KEY REFERENCES report_tokens(token) ON DELETE CASCADE,
+    method VARCHAR(16) NOT NULL,
+    input_dim INTEGER NOT NULL,
+    output_dim INTEGER NOT NULL,
+    mean BYTEA NOT NULL,
+    components BYTEA NOT NULL,
+    explained_variance REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Upload dedup: content hash + embedding settings -> existing token
+CREATE TABLE IF NOT EXISTS upload_hashes (
+    file_hash CHAR(64) NOT NULL,
+    embedding_key VARCHAR(255) NOT NULL,
+    token VARCHAR(255) NOT NULL REFERENCES report_tokens(token) ON DELETE CASCADE,
+    filename VARCHAR(255),
+    row_count INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (file_hash, embedding_key)
+);
+
+-- Active report state shared by all uvicorn workers
+CREATE TABLE IF NOT EXISTS report_state (
+    state_key VARCHAR(64) PRIMARY KEY,
+    report_id VARCHAR(64),
+    filename VARCHAR(255),
+    file_hash CHAR(64),
+    dataset_path TEXT,
+    token VARCHAR(255),
+    embedding_status JSONB,
+    sketch JSONB,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Precomputed dashboard / AI responses, written after embedding completes
+CREATE TABLE IF NOT EXISTS report_artifacts (
+    token VARCHAR(255) REFERENCES report_tokens(token) ON DELETE CASCADE,
+    name VARCHAR(32) NOT NULL,
+    file_hash CHAR(64) NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (token, name)
+);
+
 -- Grant permissions
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO service_user;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO service_user;
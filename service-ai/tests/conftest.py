@@ -0,0 +1,68 @@
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.modules import dataset_store, repository
+
+
+def _make_frame(days: int = 60, counties=("Kadıköy", "Beşiktaş", "Şişli"), seed: int = 0) -> pd.DataFrame:
+    """Gerçek kolon adlarıyla gün x ilçe x tip başına bir satır"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=days, freq="D").strftime("%Y-%m-%d")
+    rows = [
+        (date, county, kind)
+        for date in dates
+        for county in counties
+        for kind in ("Yerli", "Yabancı")
+    ]
+    df = pd.DataFrame(rows, columns=["SUBSCRIPTION_DATE", "SUBSCRIPTION_COUNTY", "SUBSCRIBER_DOMESTIC_FOREIGN"])
+    df["NUMBER_OF_SUBSCRIBER"] = rng.integers(1, 100, len(df))
+    return df
+
+
+@pytest.fixture
+def frame_factory():
+    """frame_factory(days=60, counties=(...), seed=0) -> abone DataFrame'i"""
+    return _make_frame
+
+
+@pytest.fixture
+def subscriber_frame(frame_factory) -> pd.DataFrame:
+    return frame_factory()
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """Geçici dizinde boş veri seti deposu (mmap cache'i test başına temiz)"""
+    monkeypatch.setattr(dataset_store, "DATASET_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(dataset_store, "_mapped", {})
+    return tmp_path
+
+
+@pytest.fixture
+def use_pool(monkeypatch):
+    """use_pool(fake) -> repository.get_pool verilen sahte havuzu döndürür"""
+    def install(pool):
+        async def get_pool():
+            return pool
+
+        monkeypatch.setattr(repository, "get_pool", get_pool)
+        return pool
+
+    return install
+
+
+@pytest.fixture
+def fake_rag(monkeypatch):
+    """fake_rag(**fonksiyonlar) -> app.modules.rag_optimized yerine sahte modül.
+    Gerçek modül import edilirken encoder modelini yükler; route'lar onu fonksiyon içinde import eder"""
+    def install(**functions):
+        module = types.ModuleType("app.modules.rag_optimized")
+        module.__dict__.update(functions)
+        monkeypatch.setitem(sys.modules, "app.modules.rag_optimized", module)
+        return module
+
+    return install
@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.routes import admin
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_API_KEY", "gizli-anahtar")
+
+    async def storage_report_async(limit):
+        return {"status": "ok", "tokens": [], "limit": limit}
+
+    monkeypatch.setattr(admin.retention, "storage_report_async", storage_report_async)
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/admin")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("key", [None, "", "yanlis-anahtar", "gizli-anahtar ", "gizli-anahtarx"])
+def test_wrong_or_missing_key_is_rejected(client, key):
+    headers = {} if key is None else {"X-Admin-Key": key}
+    response = client.get("/admin/storage", headers=headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Geçersiz admin anahtarı"
+
+
+def test_correct_key_is_accepted(client):
+    response = client.get("/admin/storage?limit=5", headers={"X-Admin-Key": "gizli-anahtar"})
+    assert response.status_code == 200
+    assert response.json()["limit"] == 5
+
+
+def test_disabled_without_configured_key(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_API_KEY", None)
+    with pytest.raises(HTTPException) as error:
+        admin.require_admin("herhangi")
+    assert error.value.status_code == 403
+    assert "devre dışı" in error.value.detail
+
+
+def test_comparison_is_constant_time(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_API_KEY", "gizli-anahtar")
+    compared = []
+    real = admin.secrets.compare_digest
+
+    def compare_digest(a, b):
+        compared.append((a, b))
+        return real(a, b)
+
+    monkeypatch.setattr(admin.secrets, "compare_digest", compare_digest)
+    admin.require_admin("gizli-anahtar")
+    assert compared == [(b"gizli-anahtar", b"gizli-anahtar")]
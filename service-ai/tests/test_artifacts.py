@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+
+from app.modules import artifacts
+from app.routes import analyze_optimized
+
+
+class FakePool:
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+
+    async def fetchval(self, sql, token, name, file_hash):
+        self.reads += 1
+        return self.rows.get((token, name, file_hash))
+
+    async def execute(self, sql, token, name, file_hash, payload):
+        self.rows[(token, name, file_hash)] = payload
+
+
+@pytest.fixture
+def pool(monkeypatch, use_pool):
+    monkeypatch.setattr(artifacts, "_memory", artifacts.OrderedDict())
+    return use_pool(FakePool())
+
+
+def test_put_then_get_prefers_memory(pool):
+    body = asyncio.run(artifacts.put("tok", "kpi", "h1", {"kpi": {"toplam": 3}}))
+    assert json.loads(body) == {"kpi": {"toplam": 3}}
+    assert asyncio.run(artifacts.get("tok", "kpi", "h1")) == body
+    assert pool.reads == 0
+
+    # Başka worker: bellekte yok, tablodan okunur ve belleğe alınır
+    artifacts._memory.clear()
+    assert asyncio.run(artifacts.get("tok", "kpi", "h1")) == body
+    assert asyncio.run(artifacts.get("tok", "kpi", "h1")) == body
+    assert pool.reads == 1
+
+
+def test_get_misses_on_other_file_hash_or_missing_token(pool):
+    asyncio.run(artifacts.put("tok", "kpi", "h1", {"kpi": {}}))
+    assert asyncio.run(artifacts.get("tok", "kpi", "h2")) is None
+    assert asyncio.run(artifacts.get(None, "kpi", "h1")) is None
+
+
+def test_memory_cache_is_lru_bounded(pool, monkeypatch):
+    monkeypatch.setattr(artifacts, "MEMORY_CACHE_SIZE", 2)
+    for name in ("kpi", "trend"):
+        asyncio.run(artifacts.put("tok", name, "h", {name: 1}))
+    asyncio.run(artifacts.get("tok", "kpi", "h"))  # kpi en yeni olur
+    asyncio.run(artifacts.put("tok", "insights", "h", {"insights": 1}))
+    assert list(artifacts._memory) == [("tok", "kpi", "h"), ("tok", "insights", "h")]
+
+
+def test_submit_drops_jobs_when_queue_is_full(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(artifacts, "_queue", asyncio.Queue(maxsize=1))
+
+        async def job():
+            pass
+
+        assert artifacts.submit(job)
+        assert not artifacts.submit(job)
+
+    asyncio.run(scenario())
+    monkeypatch.setattr(artifacts, "_queue", None)
+    assert not artifacts.submit(lambda: None)
+
+
+def test_worker_survives_failing_job(monkeypatch, capsys):
+    done = []
+
+    async def failing():
+        raise RuntimeError("patladı")
+
+    async def succeeding():
+        done.append(True)
+
+    async def scenario():
+        artifacts.start_workers()
+        try:
+            artifacts.submit(failing)
+            artifacts.submit(succeeding)
+            await asyncio.wait_for(artifacts._queue.join(), 1)
+        finally:
+            await artifacts.stop_workers()
+
+    asyncio.run(scenario())
+    assert done == [True]
+    assert "Artifact warm-up hatası: patladı" in capsys.readouterr().out
+
+
+def test_failed_ai_generation_is_not_cached(pool, monkeypatch, fake_rag, subscriber_frame):
+    class AIUnavailableError(RuntimeError):
+        pass
+
+    async def failing_summary(token):
+        raise AIUnavailableError("AI analiz hatası: 429 Resource exhausted")
+
+    async def failing_actions(token, kpi_result):
+        raise AIUnavailableError("Database bağlantısı yok")
+
+    async def document_file(token):
+        return {"total": len(subscriber_frame), "filename": "x.csv"}
+
+    fake_rag(generate_summary_pg_async=failing_summary, generate_actions_pg_async=failing_actions)
+    monkeypatch.setattr(analyze_optimized.repository, "document_file", document_file)
+
+    asyncio.run(analyze_optimized.warm_up_artifacts("tok", subscriber_frame, "h"))
+
+    assert {name for _, name, _ in pool.rows} == {"kpi", "trend", "insights"}
+    assert asyncio.run(artifacts.get("tok", "summary", "h")) is None
+    assert asyncio.run(artifacts.get("tok", "actions", "h")) is None
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.modules import batching
+from app.modules.batching import AdaptiveBatcher
+
+
+class FakeModel:
+    """Tokenizer'sız encoder - embedding metnin (uzunluk, numarası); max_tokens aşılırsa OOM"""
+    device = "cpu"
+    max_seq_length = 512
+
+    def __init__(self, max_tokens=None):
+        self.max_tokens = max_tokens
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        longest = max(len(t) // 4 + 2 for t in texts)
+        if self.max_tokens is not None and len(texts) * longest > self.max_tokens:
+            raise torch.cuda.OutOfMemoryError("CUDA out of memory")
+        self.batches.append(list(texts))
+        return np.array([[len(t), float(t.split("#")[1]) if "#" in t else -1] for t in texts], dtype=np.float32)
+
+
+def _texts(lengths):
+    return [f"#{i}#" + "x" * length for i, length in enumerate(lengths)]
+
+
+def test_encode_restores_input_order():
+    model = FakeModel()
+    texts = _texts([10, 400, 40, 0, 200, 40])
+    output = AdaptiveBatcher(model, token_budget=128).encode(texts)
+
+    assert output[:, 1].tolist() == list(range(len(texts)))
+    # Batch'ler en uzun metinden başlar
+    assert model.batches[0][0] == texts[1]
+    assert sum(len(b) for b in model.batches) == len(texts)
+
+
+def test_encode_empty_input_keeps_dimension():
+    assert AdaptiveBatcher(FakeModel()).encode([]).shape == (0, 2)
+
+
+def test_out_of_memory_halves_budget_and_retries(capsys):
+    model = FakeModel(max_tokens=100)
+    batcher = AdaptiveBatcher(model, token_budget=400)
+    texts = _texts([37] * 12)  # metin başına 40 karakter = 12 token
+
+    output = batcher.encode(texts)
+    assert batcher.token_budget == 100
+    assert output[:, 1].tolist() == list(range(12))
+    assert "token bütçesi 200'e düşürüldü" in capsys.readouterr().out
+
+
+def test_out_of_memory_is_raised_when_budget_cannot_shrink():
+    batcher = AdaptiveBatcher(FakeModel(max_tokens=0), token_budget=400)
+    with pytest.raises(torch.cuda.OutOfMemoryError):
+        batcher.encode(_texts([37] * 3))
+    # Bütçe en uzun metnin altına inmez
+    assert batcher.token_budget == 12
+
+
+def test_plan_boundaries():
+    batcher = AdaptiveBatcher(FakeModel(), token_budget=100, max_batch_size=4)
+    lengths = np.array([200, 50, 50, 30, 10, 10, 10, 10, 10, 10])
+    # Bütçeden uzun metin tek başına; sonra bütçe // en uzun, en fazla max_batch_size
+    assert batcher.plan(lengths) == [(0, 1), (1, 3), (3, 6), (6, 10)]
+    assert batcher.plan(np.array([0, 0])) == [(0, 2)]
+    assert batcher.plan(np.array([], dtype=np.int64)) == []
+
+
+def test_calibration_is_shared_through_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(batching, "CALIBRATION_FILE", str(tmp_path / "calibration.json"))
+    measured = []
+
+    def calibrate(self, texts):
+        measured.append(self.name)
+        return {"token_budget": 4096, "texts_per_sec": 1000.0, "measured": {"4096": 1000.0}}
+
+    monkeypatch.setattr(AdaptiveBatcher, "calibrate", calibrate)
+
+    first = AdaptiveBatcher(FakeModel(), name="fastest").warm_up(sample_count=64)
+    second_batcher = AdaptiveBatcher(FakeModel(), name="fastest")
+    second = second_batcher.warm_up(sample_count=64)
+
+    assert measured == ["fastest"]
+    assert (first["source"], second["source"]) == ("measured", "shared")
+    assert second_batcher.token_budget == 4096 and second_batcher.calibrated
+
+    # Başka model ayrı anahtarla ölçülür
+    AdaptiveBatcher(FakeModel(), name="balanced").warm_up(sample_count=64)
+    assert measured == ["fastest", "balanced"]
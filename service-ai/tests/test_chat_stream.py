@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.routes import analyze_optimized
+from app.routes.analyze_optimized import ChatMessage
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Sahte Gemini stream'i - iptal edilip edilmediği kaydedilir"""
+    state = {"cancelled": False, "sent": 0}
+
+    class Response:
+        async def __aiter__(self):
+            try:
+                for i in range(20):
+                    await asyncio.sleep(0.005)
+                    state["sent"] += 1
+                    yield Chunk(f"t{i} ")
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+    class Model:
+        def __init__(self, name):
+            pass
+
+        async def generate_content_async(self, prompt, stream=False):
+            return Response()
+
+    monkeypatch.setattr(analyze_optimized.genai, "GenerativeModel", Model)
+    return state
+
+
+class Request:
+    def __init__(self, disconnect_after=None):
+        self.checks = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.disconnect_after is not None and self.checks > self.disconnect_after
+
+
+def _message():
+    return ChatMessage(message="Kadıköy'de kaç abone var?", include_data_context=False, stream=True)
+
+
+def test_full_stream_ends_with_done(upstream):
+    async def scenario():
+        return [event async for event in analyze_optimized._chat_event_stream(Request(), _message())]
+
+    events = asyncio.run(scenario())
+    assert events[0].startswith("event: meta")
+    assert sum(e.startswith("event: token") for e in events) == 20
+    assert events[-1].startswith("event: done")
+    assert not upstream["cancelled"]
+
+
+def test_client_disconnect_cancels_upstream(upstream):
+    async def scenario():
+        events = [event async for event in analyze_optimized._chat_event_stream(Request(disconnect_after=3), _message())]
+        # İptal edilen task'ın CancelledError'ı işlemesine izin ver
+        await asyncio.sleep(0.02)
+        return events
+
+    events = asyncio.run(scenario())
+    assert sum(e.startswith("event: token") for e in events) == 3
+    assert upstream["cancelled"]
+    assert upstream["sent"] < 20
+
+
+def test_closing_the_stream_cancels_upstream(upstream):
+    async def scenario():
+        stream = analyze_optimized._chat_event_stream(Request(), _message())
+        await stream.__anext__()  # meta
+        await stream.__anext__()  # ilk token
+        # StreamingResponse istemci gidince generator'ı kapatır
+        await stream.aclose()
+        await asyncio.sleep(0.02)
+
+    asyncio.run(scenario())
+    assert upstream["cancelled"]
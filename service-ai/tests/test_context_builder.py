@@ -0,0 +1,64 @@
+import asyncio
+
+import numpy as np
+
+from app.modules import context_builder
+from app.modules.context_builder import ContextPacker, estimate_tokens
+
+QUERY = np.array([1.0, 0.0, 0.0])
+
+
+def test_most_relevant_first_and_budget_respected():
+    texts = ["a" * 40, "b" * 40, "c" * 40]
+    vectors = np.array([[0.2, 1, 0], [1, 0.1, 0], [0.6, 0, 1]])
+    packer = ContextPacker(QUERY, token_budget=2 * estimate_tokens(texts[0]), mmr_lambda=1.0)
+    packer.add_batch(texts, vectors)
+    assert packer.selected_texts == [texts[1], texts[2]]
+    assert packer.remaining == 0 and packer.full
+
+
+def test_near_duplicates_are_skipped():
+    vectors = np.array([[1, 0, 0], [0.999, 0.01, 0], [0.5, 0.5, 0]])
+    packer = ContextPacker(QUERY, token_budget=1000)
+    packer.add_batch(["x", "x kopya", "farklı"], vectors)
+    assert packer.selected_texts == ["x", "farklı"]
+    assert packer.skipped_duplicates == 1
+
+
+def test_mmr_prefers_diverse_candidate():
+    # İkinci aday birinciye çok yakın ama eşik altında; MMR daha az alakalı farklı kaydı öne alır
+    vectors = np.array([[1, 0.05, 0], [0.97, 0.25, 0], [0.7, 0, 0.7]])
+    packer = ContextPacker(QUERY, token_budget=2 * estimate_tokens("r1"), mmr_lambda=0.5, duplicate_threshold=0.999)
+    packer.add_batch(["r1", "r2", "r3"], vectors)
+    assert packer.selected_texts == ["r1", "r3"]
+
+
+def test_oversized_candidate_does_not_block_smaller_ones():
+    packer = ContextPacker(QUERY, token_budget=estimate_tokens("kısa"), mmr_lambda=1.0)
+    packer.add_batch(["uzun" * 50, "kısa"], np.array([[1, 0, 0], [0.5, 0.5, 0]]))
+    assert packer.selected_texts == ["kısa"]
+
+
+def test_state_carries_across_batches():
+    packer = ContextPacker(QUERY, token_budget=1000)
+    packer.add_batch(["ilk"], np.array([[1, 0, 0]]))
+    packer.add_batch(["tekrar", "yeni"], np.array([[1, 0.001, 0], [0, 1, 0]]))
+    assert packer.selected_texts == ["ilk", "yeni"]
+
+
+def test_build_context_retries_without_filters(monkeypatch):
+    calls = []
+
+    async def fake_scan(token, query, filters, on_batch, limit, batch_size, reduced):
+        calls.append(filters)
+        if filters:
+            return 0
+        on_batch(["Kadıköy kaydı"], np.array([[1.0, 0, 0]]))
+        return 1
+
+    monkeypatch.setattr(context_builder.repository, "scan_nearest", fake_scan)
+    texts = asyncio.run(context_builder.build_context(
+        "tok", "Kadıköy 2024", QUERY, known_values={"counties": ["Kadıköy"], "types": []}
+    ))
+    assert texts == ["Kadıköy kaydı"]
+    assert calls[0]["counties"] == ["Kadıköy"] and calls[1] == {}
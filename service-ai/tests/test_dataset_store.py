@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.modules import compare, dataset_store, insights, kpi, query_filters, rollup, trend
+
+
+def test_round_trip_preserves_analysis_results(store_dir, subscriber_frame):
+    path = dataset_store.save("hash1", subscriber_frame)
+    assert dataset_store.exists("hash1")
+    loaded = dataset_store.load(path)
+
+    assert len(loaded) == len(subscriber_frame)
+    assert list(loaded.columns) == list(subscriber_frame.columns)
+    assert kpi.compute_kpi(loaded) == kpi.compute_kpi(subscriber_frame)
+    assert trend.compute_trend(loaded) == trend.compute_trend(subscriber_frame)
+    assert insights.key_insights(loaded) == insights.key_insights(subscriber_frame)
+
+
+def _is_mapped(array) -> bool:
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_columns_are_memory_mapped(store_dir, subscriber_frame):
+    loaded = dataset_store.load(dataset_store.save("hash1", subscriber_frame))
+    assert isinstance(loaded["SUBSCRIPTION_COUNTY"].dtype, pd.CategoricalDtype)
+    assert _is_mapped(loaded["SUBSCRIPTION_COUNTY"].array.codes)
+    assert _is_mapped(loaded["NUMBER_OF_SUBSCRIBER"].to_numpy())
+    # Aynı path ikinci kez açılmaz
+    assert dataset_store.load(dataset_store.dataset_path("hash1")) is loaded
+
+
+def test_unused_categories_do_not_create_empty_buckets(store_dir, subscriber_frame):
+    # Kategorik kolonlar tüm kategorileri taşır; filtrelenmiş çerçevede yalnızca kalan ilçeler görünmeli
+    loaded = dataset_store.load(dataset_store.save("hash1", subscriber_frame))
+    subset = loaded[loaded["SUBSCRIPTION_COUNTY"] != "Şişli"]
+    plain = subscriber_frame[subscriber_frame["SUBSCRIPTION_COUNTY"] != "Şişli"]
+    assert "Şişli" in subset["SUBSCRIPTION_COUNTY"].cat.categories
+
+    assert kpi.compute_kpi(subset) == kpi.compute_kpi(plain)
+    assert set(kpi.compute_kpi(subset)["county_distribution"]) == {"Kadıköy", "Beşiktaş"}
+    assert compare.compare(subset, "Kadıköy", "Şişli") == compare.compare(plain, "Kadıköy", "Şişli")
+    by_county = trend.compute_trend_series(subset, granularity="week", group_by="county")
+    assert by_county == trend.compute_trend_series(plain, granularity="week", group_by="county")
+    assert insights.analyze(subset) == insights.analyze(plain)
+
+
+def test_categorical_dates_are_decoded(store_dir, subscriber_frame):
+    # pd.to_datetime kategorik girdide (>= 50 satır) kategorik döndürür - tarih kolonları çözülmeli
+    loaded = dataset_store.load(dataset_store.save("hash1", subscriber_frame))
+    dates = dataset_store.to_datetime(loaded["SUBSCRIPTION_DATE"])
+    assert dates.dtype == "datetime64[ns]"
+    assert dates.equals(pd.to_datetime(subscriber_frame["SUBSCRIPTION_DATE"]))
+
+    assert (compare.compare(loaded, "Kadıköy", "Şişli", "2024-01-10", "2024-01-20")
+            == compare.compare(subscriber_frame, "Kadıköy", "Şişli", "2024-01-10", "2024-01-20"))
+    assert rollup.build_rollup_documents(loaded, "county,month") == rollup.build_rollup_documents(subscriber_frame, "county,month")
+    assert query_filters.row_metadata(loaded) == query_filters.row_metadata(subscriber_frame)
+
+
+def test_missing_values_and_datetimes(store_dir):
+    df = pd.DataFrame({
+        "SUBSCRIPTION_COUNTY": ["Kadıköy", None, "Şişli"],
+        "NUMBER_OF_SUBSCRIBER": [1.5, np.nan, 3.0],
+        "SUBSCRIPTION_DATE": pd.to_datetime(["2024-01-01", "2024-01-02", None]),
+    })
+    loaded = dataset_store.load(dataset_store.save("hash2", df))
+    assert loaded["SUBSCRIPTION_COUNTY"].isna().tolist() == [False, True, False]
+    assert loaded["SUBSCRIPTION_COUNTY"].iloc[2] == "Şişli"
+    np.testing.assert_array_equal(loaded["NUMBER_OF_SUBSCRIBER"].to_numpy(), df["NUMBER_OF_SUBSCRIBER"].to_numpy())
+    assert loaded["SUBSCRIPTION_DATE"].equals(df["SUBSCRIPTION_DATE"])
+
+
+def test_load_missing_returns_none(store_dir):
+    assert dataset_store.load(dataset_store.dataset_path("yok")) is None
+
+
+def test_eviction_keeps_newest(store_dir, monkeypatch, frame_factory):
+    first = dataset_store.save("old", frame_factory(days=200))
+    monkeypatch.setattr(dataset_store, "DATASET_STORE_MAX_BYTES", 1)
+    second = dataset_store.save("new", frame_factory(days=200, seed=1))
+    assert not dataset_store.exists("old") and dataset_store.exists("new")
+    assert second != first
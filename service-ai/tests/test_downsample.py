@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app.modules import downsample, trend
+
+
+@pytest.fixture
+def noisy_series():
+    rng = np.random.default_rng(1)
+    x = np.arange(1000, dtype=float)
+    return x, np.sin(x / 40) * 100 + rng.normal(0, 5, len(x))
+
+
+def test_lttb_keeps_endpoints_and_returns_threshold_points(noisy_series):
+    x, y = noisy_series
+    idx = downsample.lttb(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_keeps_spike(noisy_series):
+    x, y = noisy_series
+    y = y.copy()
+    y[517] = 10_000
+    assert 517 in downsample.lttb(x, y, 50)
+
+
+def test_lttb_short_series_is_untouched():
+    assert downsample.lttb([0, 1, 2], [5, 6, 7], 10).tolist() == [0, 1, 2]
+
+
+def test_min_max_keeps_extremes_within_budget(noisy_series):
+    _, y = noisy_series
+    idx = downsample.min_max(y, 100)
+    assert len(idx) <= 100
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert y.argmax() in idx and y.argmin() in idx
+
+
+def test_select_indices_rejects_unknown_method(noisy_series):
+    x, y = noisy_series
+    with pytest.raises(ValueError):
+        downsample.select_indices(x, y, 10, "average")
+
+
+def test_compute_trend_downsampled(frame_factory):
+    df = frame_factory(days=400)
+    result = trend.compute_trend(df, max_points=50)
+    labels = list(result)
+    assert len(labels) == 50
+    assert labels[0] == "2024-01-01" and labels[-1] == df["SUBSCRIPTION_DATE"].max()
+
+
+def test_trend_page_cursor_round_trip(frame_factory):
+    df = frame_factory(days=95)
+    points, cursor = [], None
+    while True:
+        page = trend.trend_page(df, cursor=cursor, limit=20)
+        points.extend(page["points"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert page["total_points"] == 95
+    expected = trend.compute_trend(df)
+    assert [p["date"] for p in points] == list(expected)
+    assert [p["value"] for p in points] == [int(v) for v in expected.values()]
+
+
+def test_trend_page_granularity_and_invalid_cursor(frame_factory):
+    df = frame_factory(days=95)
+    page = trend.trend_page(df, granularity="month", limit=2)
+    assert [p["date"] for p in page["points"]] == ["2024-01-01", "2024-02-01"]
+    assert trend.trend_page(df, "month", page["next_cursor"])["points"][0]["date"] == "2024-03-01"
+    with pytest.raises(ValueError):
+        trend.trend_page(df, cursor="bm90LWEtZGF0ZQ==")
@@ -0,0 +1,115 @@
+import datetime
+import os
+
+import numpy as np
+import pytest
+
+from app.modules import embedding_store
+from app.modules.projection import Projection
+
+
+@pytest.fixture
+def embedding_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path))
+    yield tmp_path
+    embedding_store.flush()
+
+
+def _documents(n=2_500, dim=384, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    # documents.id paralel chunk'larda sıralı/ardışık olmak zorunda değil
+    ids = rng.permutation(np.arange(10_000, 10_000 + 3 * n, 3)).astype(np.int64)
+    texts = [f"doküman {i}" for i in range(n)]
+    metadata = [("Kadıköy", datetime.date(2024, 1, 1 + i % 28) if i % 7 else None, "Yerli") for i in range(n)]
+    return ids, texts, embeddings, metadata
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", "")
+    ids, texts, embeddings, metadata = _documents(n=10)
+    assert not embedding_store.enabled()
+    assert embedding_store.save_async("tok", "x.csv", ids, texts, embeddings, metadata) is None
+    assert embedding_store.list_tokens() == []
+
+
+def test_validate_requires_persistent_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store.tempfile, "gettempdir", lambda: str(tmp_path / "tmp"))
+
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path / "tmp" / "store"))
+    assert not embedding_store.validate()
+    assert not embedding_store.enabled()
+
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", "relative/store")
+    assert not embedding_store.validate()
+
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path / "store"))
+    assert embedding_store.validate()
+    assert os.path.isdir(tmp_path / "store")
+
+
+def test_search_matches_brute_force_and_returns_document_ids(embedding_dir):
+    ids, texts, embeddings, metadata = _documents()
+    embedding_store.save("tok", "x.csv", ids, texts, embeddings, metadata, shard_rows=1_000)
+    searcher = embedding_store.ShardSearcher("tok")
+    assert len(searcher.shards) == 3
+
+    queries = np.random.default_rng(1).standard_normal((5, embeddings.shape[1])).astype(np.float32)
+    hits = searcher.search(queries, k=10)
+    normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    exact = np.argsort(-(normalized @ embeddings.T), axis=1)[:, :10]
+    for row, expected in zip(hits, exact):
+        assert [doc_id for doc_id, _ in row] == ids[expected].tolist()
+
+    wanted = [int(ids[0]), int(ids[1_500]), int(ids[-1])]
+    documents = searcher.documents(wanted)
+    assert documents[int(ids[1_500])] == (texts[1_500], metadata[1_500])
+    assert set(documents) == set(wanted)
+
+
+def test_iter_shards_round_trip(embedding_dir):
+    ids, texts, embeddings, metadata = _documents(n=300)
+    embedding_store.save("tok", "x.csv", ids, texts, embeddings, metadata, shard_rows=128)
+    shards = list(embedding_store.iter_shards("tok", with_documents=True))
+    assert np.array_equal(np.concatenate([s[0] for s in shards]), ids)
+    assert np.allclose(np.concatenate([s[1] for s in shards]), embeddings)
+    assert [d for s in shards for d in s[2]] == list(zip(texts, metadata))
+    assert embedding_store.manifest("tok")["version"] == embedding_store.MANIFEST_VERSION
+
+
+def test_projection_is_stored_with_shards(embedding_dir):
+    ids, texts, embeddings, metadata = _documents(n=500)
+    reducer = Projection.fit(embeddings, "pca", 32)
+    embedding_store.save("tok", "x.csv", ids, texts, reducer.transform(embeddings), metadata,
+                         "embedding_reduced", reducer)
+    loaded = embedding_store.load_projection("tok")
+    assert loaded.method == "pca"
+    assert np.allclose(loaded.transform(embeddings[:5]), reducer.transform(embeddings[:5]))
+    assert embedding_store.ShardSearcher("tok").search(embeddings[:1], k=1)[0][0][0] == ids[0]
+
+
+def test_eviction_keeps_store_under_cap(embedding_dir, monkeypatch):
+    ids, texts, embeddings, metadata = _documents(n=200)
+    embedding_store.save("old", "x.csv", ids, texts, embeddings, metadata)
+    os.utime(embedding_store.token_path("old"), (1, 1))
+    size = embedding_store.list_tokens()[0]["bytes"]
+
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_MAX_BYTES", int(size * 1.5))
+    embedding_store.save("new", "x.csv", ids, texts, embeddings, metadata)
+    assert [t["token"] for t in embedding_store.list_tokens()] == ["new"]
+
+
+def test_background_writes_are_bounded_and_ordered(embedding_dir, monkeypatch):
+    ids, texts, embeddings, metadata = _documents(n=50)
+    assert embedding_store.save_async("tok", "x.csv", ids, texts, embeddings, metadata) is not None
+    embedding_store.flush()
+    assert embedding_store.manifest("tok")["rows"] == 50
+
+    monkeypatch.setattr(embedding_store, "_pending", embedding_store.MAX_PENDING_WRITES)
+    assert embedding_store.save_async("full", "x.csv", ids, texts, embeddings, metadata) is None
+
+    # Silme bekleyen yazımdan sonra sıralanır
+    embedding_store.remove("tok")
+    embedding_store.flush()
+    assert embedding_store.manifest("tok") is None
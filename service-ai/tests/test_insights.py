@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from app.modules import insights
+
+
+def _flat_frame(days=42, value=10):
+    # 2024-01-01 pazartesi - 6 tam hafta
+    dates = pd.date_range("2024-01-01", periods=days, freq="D").strftime("%Y-%m-%d")
+    rows = [(d, c, "Yerli", value) for d in dates for c in ("Kadıköy", "Şişli")]
+    return pd.DataFrame(rows, columns=["SUBSCRIPTION_DATE", "SUBSCRIPTION_COUNTY",
+                                       "SUBSCRIBER_DOMESTIC_FOREIGN", "NUMBER_OF_SUBSCRIBER"])
+
+
+def test_spike_z_score_matches_reference():
+    df = _flat_frame()
+    df.loc[(df["SUBSCRIPTION_COUNTY"] == "Şişli") & (df["SUBSCRIPTION_DATE"] == "2024-01-20"),
+           "NUMBER_OF_SUBSCRIBER"] = 200
+    anomalies = insights.analyze(df)["details"]["anomalies"]
+    assert len(anomalies) == 1
+    spike = anomalies[0]
+    assert (spike["county"], spike["date"], spike["kind"], spike["value"]) == ("Şişli", "2024-01-20", "spike", 200)
+
+    series = df[df["SUBSCRIPTION_COUNTY"] == "Şişli"]["NUMBER_OF_SUBSCRIBER"].to_numpy(dtype=float)
+    assert spike["z_score"] == pytest.approx((200 - series.mean()) / series.std(), abs=0.01)
+    assert any("olağandışı sıçrama" in line for line in insights.key_insights(df))
+
+
+def test_constant_series_has_no_anomalies():
+    assert insights.analyze(_flat_frame())["details"]["anomalies"] == []
+
+
+def test_week_over_week_matches_pandas(frame_factory):
+    df = frame_factory(days=45)
+    changes = insights.analyze(df)["details"]["week_over_week"]
+
+    frame = df.assign(date=pd.to_datetime(df["SUBSCRIPTION_DATE"]))
+    weekly = frame.groupby(["SUBSCRIPTION_COUNTY", pd.Grouper(key="date", freq="W-MON", label="left",
+                                                              closed="left")])["NUMBER_OF_SUBSCRIBER"].sum()
+    # 45 gün: 6 tam hafta, son 3 gün yarım hafta olarak atılır
+    last, prev = pd.Timestamp(changes["last_week"]), pd.Timestamp(changes["previous_week"])
+    assert (last, prev) == (pd.Timestamp("2024-02-05"), pd.Timestamp("2024-01-29"))
+    delta = weekly.xs(last, level="date") - weekly.xs(prev, level="date")
+    assert changes["total_change"] == delta.sum()
+    top = changes["contributions"][0]
+    assert top["change"] == delta.loc[delta.abs().idxmax()]
+    for leader in changes["growth_leaders"]:
+        county = leader["county"]
+        expected = (weekly[(county, last)] - weekly[(county, prev)]) / weekly[(county, prev)] * 100
+        assert leader["growth_pct"] == pytest.approx(expected, abs=0.1)
+
+
+def test_foreign_share_shift():
+    df = _flat_frame()
+    last_week = pd.to_datetime(df["SUBSCRIPTION_DATE"]) >= "2024-02-05"
+    df.loc[last_week & (df["SUBSCRIPTION_COUNTY"] == "Kadıköy"), "SUBSCRIBER_DOMESTIC_FOREIGN"] = "Yabancı"
+    shift = insights.analyze(df)["details"]["week_over_week"]["share_shifts"][0]
+    assert (shift["county"], shift["previous_foreign_pct"], shift["last_foreign_pct"]) == ("Kadıköy", 0.0, 100.0)
+
+
+def test_categorical_columns_give_same_result(frame_factory):
+    df = frame_factory(days=30)
+    categorical = df.astype({c: "category" for c in ("SUBSCRIPTION_DATE", "SUBSCRIPTION_COUNTY",
+                                                     "SUBSCRIBER_DOMESTIC_FOREIGN")})
+    assert insights.analyze(categorical) == insights.analyze(df)
+
+
+def test_top_county_counts_rows_without_dates():
+    df = _flat_frame(days=7)
+    extra = pd.DataFrame([("tarih yok", "Şişli", "Yerli", 1000)], columns=df.columns)
+    lines = insights.key_insights(pd.concat([df, extra], ignore_index=True))
+    assert lines[0] == "En çok abone Şişli ilçesinde bağlandı."
+
+
+def test_without_dates_only_county_summary():
+    df = _flat_frame().drop(columns=["SUBSCRIPTION_DATE"])
+    df.loc[0, "NUMBER_OF_SUBSCRIBER"] = 99
+    assert insights.analyze(df) == {"key_insights": ["En çok abone Kadıköy ilçesinde bağlandı."], "details": {}}
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from app.modules import parser
+
+
+def _frames(pages):
+    return list(parser._pdf_batches_to_frames(iter([pages])))
+
+
+def test_csv_is_streamed_in_chunks(monkeypatch, subscriber_frame):
+    monkeypatch.setattr(parser, "CSV_CHUNK_ROWS", 100)
+    data = subscriber_frame.to_csv(index=False).encode()
+    seen = []
+    df = parser.parse_file("veri.csv", data, on_frame=lambda frame: seen.append(len(frame)))
+    assert seen[0] == 100 and sum(seen) == len(subscriber_frame)
+    pd.testing.assert_frame_equal(df, subscriber_frame)
+
+
+def test_pdf_table_header_requires_numeric_rows():
+    pages = [
+        (1, "Aylık rapor\nDATE COUNTY COUNT\n2024-01-01 Kadikoy 12\n2024-01-02 Sisli 7\nSayfa 1"),
+        (2, "DATE COUNTY COUNT\n2024-01-03 Besiktas 5"),
+    ]
+    (frame,) = _frames(pages)
+    assert list(frame.columns) == ["DATE", "COUNTY", "COUNT"]
+    assert frame["COUNT"].tolist() == [12, 7, 5]
+
+
+def test_prose_pdf_falls_back_to_text_lines():
+    pages = [(1, "Annual report\nThis document describes subscriber growth\nIt has several lines\nEnd"),
+             (2, "Second page text")]
+    (frame,) = _frames(pages)
+    assert list(frame.columns) == ["PAGE", "TEXT"]
+    assert frame["TEXT"].tolist() == ["Annual report", "This document describes subscriber growth",
+                                      "It has several lines", "End", "Second page text"]
+    assert frame["PAGE"].tolist() == [1, 1, 1, 1, 2]
+
+
+def test_unknown_extension_returns_empty_frame():
+    assert parser.parse_file("notlar.bin", b"\x00\x01").empty
@@ -0,0 +1,106 @@
+import asyncio
+import re
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.modules import profiler
+
+
+@pytest.fixture(autouse=True)
+def no_session(monkeypatch):
+    monkeypatch.setattr(profiler, "_session", None)
+    yield
+    if profiler._session is not None:
+        profiler._session.stop()
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(profiler.RequestTracker)
+
+    @app.get("/work")
+    async def work():
+        return {"ok": True}
+
+    @app.get("/admin/profile")
+    async def admin_route():
+        return {"ok": True}
+
+    return app
+
+
+def test_request_mode_stops_after_limit():
+    async def scenario():
+        session = profiler.start(interval_ms=1, request_limit=2)
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/admin/profile")  # admin istekleri sayılmaz
+            await client.get("/work")
+            assert session.stopped_at is None
+            await client.get("/work?x=1")
+            await client.get("/work")  # oturum bitti, kaydedilmez
+        # Limit dolunca wait beklemeden döner
+        began = time.perf_counter()
+        await session.wait(5)
+        return session, time.perf_counter() - began
+
+    session, waited = asyncio.run(scenario())
+    assert session.stopped_at is not None
+    assert waited < 1
+    assert [(r["method"], r["path"], r["status"]) for r in session.requests] == [("GET", "/work", 200)] * 2
+    assert all(r["ms"] >= 0 for r in session.requests)
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_report_and_collapsed_shape():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop,), name="busy-worker_3")
+
+    async def scenario():
+        session = profiler.start(interval_ms=1)
+        worker.start()
+        await session.wait(0.2)
+        stop.set()
+        worker.join()
+        return session
+
+    session = asyncio.run(scenario())
+    report = session.report()
+
+    assert set(report) == {"pid", "duration_seconds", "interval_ms", "samples", "idle_samples_skipped",
+                           "threads", "functions", "hot_functions", "requests", "collapsed"}
+    assert report["samples"] > 0 and report["interval_ms"] == 1.0
+    # Thread numarası atılır: busy-worker_3 -> busy-worker
+    assert "busy-worker" in report["threads"]
+    row = next(r for r in report["functions"] if r["function"].startswith("_busy "))
+    assert set(row) == {"function", "cumulative_seconds", "self_seconds", "cumulative_samples", "self_samples"}
+    assert row["cumulative_samples"] >= row["self_samples"]
+    assert len(report["functions"]) <= profiler.TOP_FUNCTIONS
+
+    collapsed = session.collapsed()
+    assert collapsed == report["collapsed"]
+    assert all(re.fullmatch(r"[^;]+(;[^;]+)+ \d+", line) for line in collapsed)
+    assert any(line.startswith("busy-worker;") and "_busy (" in line for line in collapsed)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in collapsed) == sum(session.stacks.values())
+
+
+def test_only_one_session_at_a_time():
+    async def scenario():
+        session = profiler.start(interval_ms=5)
+        try:
+            with pytest.raises(RuntimeError):
+                profiler.start()
+        finally:
+            session.stop()
+        # Biten oturumdan sonra yenisi başlatılabilir
+        profiler.start(interval_ms=5).stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app.modules import projection
+from app.modules.projection import Projection
+
+
+def _embeddings(n=3_000, dim=384, rank=24, seed=0):
+    """Düşük boyutlu yapı + gürültü, birim normlu (sentence-transformers çıktısı gibi)"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, rank)) @ rng.standard_normal((rank, dim)) + 0.3 * rng.standard_normal((n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _top_k(documents, queries, k):
+    documents = documents / np.linalg.norm(documents, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+
+def _recall(documents, queries, reducer, k=10):
+    exact = _top_k(documents, queries, k)
+    approx = _top_k(reducer.transform(documents), reducer.transform(queries), k)
+    return np.mean([len(set(e) & set(a)) / k for e, a in zip(exact, approx)])
+
+
+def test_pca_recall_clears_threshold():
+    data = _embeddings()
+    documents, queries = data[:2_800], data[2_800:]
+    reducer = Projection.fit(documents, "pca", 64)
+    assert reducer.transform(documents).shape == (2_800, 64)
+    assert reducer.transform(documents).dtype == np.float32
+    assert 0.5 < reducer.explained_variance <= 1.0
+    assert _recall(documents, queries, reducer) >= 0.9
+
+
+def test_random_projection_recall_and_inner_products():
+    data = _embeddings(seed=1)
+    documents, queries = data[:2_800], data[2_800:]
+    reducer = Projection.fit(documents, "random", 128)
+    assert reducer.explained_variance is None
+    assert _recall(documents, queries, reducer) >= 0.6
+    # Johnson-Lindenstrauss: iç çarpımlar ortalamada korunur
+    original = documents[:200] @ documents[200:400].T
+    projected = reducer.transform(documents[:200]) @ reducer.transform(documents[200:400]).T
+    assert np.abs(projected - original).mean() < 0.1
+
+
+def test_pca_fit_is_deterministic_with_sampling():
+    data = _embeddings(n=1_000)
+    first = Projection.fit(data, "pca", 16, sample_size=500, seed=3)
+    second = Projection.fit(data, "pca", 16, sample_size=500, seed=3)
+    np.testing.assert_array_equal(first.components, second.components)
+
+
+def test_record_round_trip():
+    reducer = Projection.fit(_embeddings(n=500), "pca", 32)
+    token, method, input_dim, output_dim, mean, components, variance = reducer.to_row("tok")
+    restored = Projection.from_record({"method": method, "input_dim": input_dim, "output_dim": output_dim,
+                                       "mean": mean, "components": components, "explained_variance": variance})
+    vectors = _embeddings(n=10, seed=5)
+    np.testing.assert_array_equal(restored.transform(vectors), reducer.transform(vectors))
+    assert (token, input_dim, output_dim) == ("tok", 384, 32)
+
+
+def test_resolve(monkeypatch):
+    monkeypatch.setattr(projection, "DEFAULT_REDUCED_DIM", 0)
+    assert projection.resolve(None, None) is None
+    assert projection.resolve(None, 64) == (projection.DEFAULT_METHOD, 64)
+    assert projection.resolve("random", 32) == ("random", 32)
+    for method, dim in (("svd", 64), ("pca", 384), ("pca", -1)):
+        with pytest.raises(ValueError):
+            projection.resolve(method, dim)
+
+
+def test_reduced_search_matches_partial_index():
+    """Sorgu ifadesi ve koşulu boyut index'inin tanımıyla birebir aynı olmalı, yoksa planner index'i kullanmaz"""
+    from app.modules import repository
+
+    index_sql = projection.REDUCED_INDEX_SQL.format(name=projection.index_name(64), dim=64)
+    assert f"({repository._column(64)})" in index_sql
+    assert repository._dims(64).replace(" AND ", "WHERE ") in index_sql
+    sql = repository.VECTOR_SEARCH_SQL.format(column=repository._column(64), dims=repository._dims(64))
+    assert "ORDER BY embedding_reduced::vector(64) <=>" in sql
+    assert repository._column(0) == "embedding" and repository._dims(0) == ""
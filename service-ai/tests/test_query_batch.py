@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.modules import repository
+from app.routes import analyze_optimized
+from app.routes.analyze_optimized import BatchQuery
+
+
+class FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.args = None
+
+    async def fetch(self, sql, *args):
+        self.args = args
+        return self.rows
+
+
+def test_batch_vector_search_groups_rows_in_query_order(use_pool):
+    # (ordinality, içerik) - ikinci sorgu için satır yok
+    pool = use_pool(FakePool([(3, "c1"), (1, "a1"), (3, "c2"), (1, "a2")]))
+    grouped = asyncio.run(repository.batch_vector_search("tok", ["[1]", "[2]", "[3]"], 2))
+    assert grouped == [["a1", "a2"], [], ["c1", "c2"]]
+    assert pool.args == (["[1]", "[2]", "[3]"], "tok", 2)
+
+
+@pytest.fixture
+def ready(monkeypatch):
+    monkeypatch.setattr(analyze_optimized, "current_token", "tok")
+    monkeypatch.setattr(analyze_optimized, "embedding_status", {"status": "completed"})
+
+    async def load():
+        return {"report_id": "report-1"}
+
+    monkeypatch.setattr(analyze_optimized.report_state, "load", load)
+
+
+def test_results_follow_question_order_and_flag_missing_data(ready, fake_rag):
+    async def retrieve(token, questions, top_k):
+        return [None if "boş" in q else f"{q} kayıtları" for q in questions]
+
+    fake_rag(retrieve_context_batch_async=retrieve)
+    questions = ["Kadıköy ocak", "boş soru", "Şişli şubat"]
+    response = asyncio.run(analyze_optimized.query_batch(BatchQuery(questions=questions, top_k=3)))
+
+    assert [r["question"] for r in response["results"]] == questions
+    assert [r["found"] for r in response["results"]] == [True, False, True]
+    assert response["results"][0]["context"] == "Kadıköy ocak kayıtları"
+    assert response["results"][1]["context"] == ""
+    assert response["count"] == 3 and response["top_k"] == 3
+
+
+def test_search_error_is_a_service_error(ready, fake_rag):
+    async def retrieve(token, questions, top_k):
+        raise ConnectionError("bağlantı yok")
+
+    fake_rag(retrieve_context_batch_async=retrieve)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(analyze_optimized.query_batch(BatchQuery(questions=["Kadıköy ocak"])))
+    assert error.value.status_code == 503
+
+
+def test_report_id_must_match_active_report(ready, fake_rag):
+    async def retrieve(token, questions, top_k):
+        return ["kayıt"] * len(questions)
+
+    fake_rag(retrieve_context_batch_async=retrieve)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(analyze_optimized.query_batch(BatchQuery(questions=["soru"], report_id="report-2")))
+    assert error.value.status_code == 404
+
+    response = asyncio.run(analyze_optimized.query_batch(BatchQuery(questions=["soru"], report_id="report-1")))
+    assert response["results"][0]["found"]
+
+
+def test_rejects_until_embedding_is_ready(monkeypatch):
+    monkeypatch.setattr(analyze_optimized, "current_token", None)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(analyze_optimized.query_batch(BatchQuery(questions=["soru"])))
+    assert error.value.status_code == 400
@@ -0,0 +1,54 @@
+import datetime
+
+from app.modules import query_filters
+from app.modules.repository import to_asyncpg
+
+D = datetime.date
+
+
+def test_normalize_folds_turkish_characters():
+    assert query_filters.normalize("KADIKÖY") == query_filters.normalize("Kadıköy") == "kadikoy"
+    assert query_filters.normalize("Şişli Üsküdar Çağlayan İstanbul") == "sisli uskudar caglayan istanbul"
+
+
+def test_iso_day_and_month():
+    assert query_filters.extract_date_ranges("2024-03-15 ve 2023-12 verileri") == [
+        (D(2024, 3, 15), D(2024, 3, 16)),
+        (D(2023, 12, 1), D(2024, 1, 1)),
+    ]
+
+
+def test_month_names_with_suffixes():
+    assert query_filters.extract_date_ranges("Şubat 2024'te ve 2023 Aralık ayında") == [
+        (D(2024, 2, 1), D(2024, 3, 1)),
+        (D(2023, 12, 1), D(2024, 1, 1)),
+    ]
+    assert query_filters.extract_date_ranges("march 2022") == [(D(2022, 3, 1), D(2022, 4, 1))]
+
+
+def test_year_only_and_invalid_dates():
+    assert query_filters.extract_date_ranges("2021 yılında") == [(D(2021, 1, 1), D(2022, 1, 1))]
+    # Geçersiz gün atlanır, sayılar yıl sanılmaz
+    assert query_filters.extract_date_ranges("2024-02-30 tarihinde 150 abone") == []
+
+
+def test_extract_filters_matches_known_values_with_suffixes():
+    filters = query_filters.extract_filters(
+        "Kadıköy'de ve BEŞİKTAŞTA foreign aboneler",
+        known_counties=["Kadıköy", "Beşiktaş", "Şişli"],
+        known_types=["Yerli", "Yabancı"],
+    )
+    assert filters["counties"] == ["Kadıköy", "Beşiktaş"]
+    assert filters["types"] == ["Yabancı"]
+    assert filters["date_ranges"] == []
+    assert not query_filters.has_filters(query_filters.extract_filters("toplam abone", ["Kadıköy"], []))
+
+
+def test_build_where_placeholders():
+    filters = {"counties": ["Kadıköy"], "types": [], "date_ranges": [(D(2024, 1, 1), D(2024, 2, 1))]}
+    where, params = query_filters.build_where("tok", filters)
+    assert where == ("token = %s AND county = ANY(%s) AND "
+                     "((subscription_date >= %s AND subscription_date < %s))")
+    assert params == ["tok", ["Kadıköy"], D(2024, 1, 1), D(2024, 2, 1)]
+    sql, args = to_asyncpg(where, params)
+    assert "$4" in sql and "%s" not in sql and args == params
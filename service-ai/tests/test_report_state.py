@@ -0,0 +1,85 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.modules import report_state
+
+
+class FakePool:
+    def __init__(self):
+        self.version = datetime.datetime(2024, 1, 1)
+        self.fail = False
+        self.row_fetches = 0
+        self.version_checks = 0
+
+    async def execute(self, sql, *args):
+        if self.fail:
+            raise ConnectionError("bağlantı yok")
+
+    async def fetchval(self, sql, *args):
+        if self.fail:
+            raise ConnectionError("bağlantı yok")
+        self.version_checks += 1
+        return self.version
+
+    async def fetchrow(self, sql, *args):
+        self.row_fetches += 1
+        return {"report_id": "r1", "filename": "x.csv", "file_hash": "h", "dataset_path": None,
+                "token": "tok", "embedding_status": '{"status": "completed"}', "sketch": None,
+                "updated_at": self.version}
+
+
+@pytest.fixture
+def pool(monkeypatch, use_pool):
+    fake = use_pool(FakePool())
+    monkeypatch.setattr(report_state, "_table_ready", True)
+    monkeypatch.setattr(report_state, "_cached", None)
+    monkeypatch.setattr(report_state, "_unavailable_until", 0.0)
+    monkeypatch.setattr(report_state, "_degraded_requests", 0)
+    monkeypatch.setattr(report_state, "_checked_at", 0.0)
+    monkeypatch.setattr(report_state, "CHECK_INTERVAL_MS", 0)
+    return fake
+
+
+def test_full_row_is_fetched_only_when_version_changes(pool):
+    first = asyncio.run(report_state.load())
+    assert first["embedding_status"] == {"status": "completed"}
+    assert asyncio.run(report_state.load()) is first
+    assert pool.row_fetches == 1
+
+    pool.version += datetime.timedelta(seconds=1)
+    assert asyncio.run(report_state.load()) is not first
+    assert pool.row_fetches == 2
+
+
+def test_degraded_mode_is_entered_and_left(pool, monkeypatch, capsys):
+    pool.fail = True
+    assert asyncio.run(report_state.load()) is None
+    assert report_state.degraded() and not report_state.available()
+    assert asyncio.run(report_state.load()) is None
+    assert "yerel duruma düşülüyor" in capsys.readouterr().out
+
+    pool.fail = False
+    monkeypatch.setattr(report_state, "_unavailable_until", 1.0)
+    assert asyncio.run(report_state.load()) is not None
+    assert not report_state.degraded()
+    assert "2 istek yerel durumla sunuldu" in capsys.readouterr().out
+
+
+def test_version_check_is_rate_limited(pool, monkeypatch):
+    monkeypatch.setattr(report_state, "CHECK_INTERVAL_MS", 60_000)
+    first = asyncio.run(report_state.load())
+    pool.version += datetime.timedelta(seconds=1)
+    # Aralık dolmadan database'e gidilmez, cache'teki durum döner
+    assert asyncio.run(report_state.load()) is first
+    assert pool.version_checks == 1
+
+    # Kendi yazımından sonra bir sonraki load hemen tazelenir
+    assert asyncio.run(report_state.update(filename="y.csv"))
+    assert asyncio.run(report_state.load()) is not first
+    assert pool.version_checks == 2 and pool.row_fetches == 2
+
+    monkeypatch.setattr(report_state, "_checked_at", 0.0)
+    asyncio.run(report_state.load())
+    assert pool.version_checks == 3
@@ -0,0 +1,148 @@
+import datetime
+
+import pytest
+
+from app.modules import retention
+
+
+class FakeConnection:
+    """documents satırlarını token listesi olarak tutan psycopg2 bağlantı taklidi"""
+
+    def __init__(self, documents, expired=(), locked=True):
+        self.documents = list(documents)
+        self.expired = list(expired)
+        self.locked = locked
+        self.statements = []
+        self.commits = 0
+        self.closed = False
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self.result = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.conn.statements.append(sql)
+        docs = self.conn.documents
+        if sql.startswith("SELECT pg_try_advisory_lock"):
+            self.result = [(self.conn.locked,)]
+        elif sql.startswith("DELETE FROM documents"):
+            token, limit = params
+            batch = [i for i, t in enumerate(docs) if t == token][:limit]
+            for i in reversed(batch):
+                del docs[i]
+            self.rowcount = len(batch)
+        elif sql.startswith("SELECT token FROM report_tokens"):
+            self.result = [(t,) for t in self.conn.expired[:params[0]]]
+        elif sql.startswith("SELECT COUNT(*) FROM documents"):
+            self.result = [(len(docs),)]
+        elif sql.startswith("SELECT d.token"):
+            tokens = sorted(set(docs), key=lambda t: -docs.count(t))[:params[0]]
+            created = datetime.datetime(2024, 1, 1)
+            self.result = [(t, "x.csv", docs.count(t), docs.count(t) * 100, created, created, 3600,
+                            created + datetime.timedelta(hours=1)) for t in tokens]
+        elif sql.startswith("SELECT pg_total_relation_size"):
+            self.result = [(3000, 2000, 1000)]
+        else:
+            self.rowcount = 0
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.fixture
+def removed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(retention.embedding_store, "remove", calls.append)
+    monkeypatch.setattr(retention, "_orphans_adopted", True)
+    return calls
+
+
+def _connect(monkeypatch, conn):
+    monkeypatch.setattr(retention, "get_connection", lambda: conn)
+    return conn
+
+
+def test_delete_token_uses_bounded_batches(monkeypatch, removed):
+    monkeypatch.setattr(retention, "SWEEP_BATCH_SIZE", 4)
+    retention._last_touch["old"] = 1.0
+    conn = _connect(monkeypatch, FakeConnection(["old"] * 10 + ["new"] * 3))
+
+    assert retention.delete_token("old") == 10
+    deletes = [s for s in conn.statements if s.startswith("DELETE FROM documents")]
+    # 4 + 4 + 2: son batch limitten küçük olunca durur, her batch ayrı transaction
+    assert len(deletes) == 3
+    assert conn.commits == 4
+    assert conn.documents == ["new"] * 3
+    assert any(s.startswith("DELETE FROM report_tokens") for s in conn.statements)
+    assert "old" not in retention._last_touch and removed == ["old"]
+    assert conn.closed
+
+
+def test_delete_token_without_database(monkeypatch):
+    monkeypatch.setattr(retention, "get_connection", lambda: None)
+    assert retention.delete_token("old") == 0
+
+
+def test_sweep_deletes_expired_tokens_and_reindexes(monkeypatch, removed):
+    monkeypatch.setattr(retention, "SWEEP_BATCH_SIZE", 5)
+    conn = _connect(monkeypatch, FakeConnection(["a"] * 6 + ["b"] * 2 + ["keep"] * 4, expired=["a", "b"]))
+
+    result = retention.sweep_once()
+    assert (result["status"], result["expired_tokens"], result["deleted_rows"]) == ("ok", 2, 8)
+    # 8 / 12 satır silindi >= REINDEX_FRACTION
+    assert result["maintenance"] == "vacuum+reindex"
+    assert conn.documents == ["keep"] * 4
+    assert conn.autocommit
+    assert conn.statements[-1].startswith("SELECT pg_advisory_unlock")
+    assert removed == ["a", "b"]
+
+
+def test_sweep_vacuums_without_reindex_for_small_deletes(monkeypatch, removed):
+    conn = _connect(monkeypatch, FakeConnection(["a"] + ["keep"] * 20, expired=["a"]))
+    assert retention.sweep_once()["maintenance"] == "vacuum"
+    assert not any(s.startswith("REINDEX") for s in conn.statements)
+
+
+def test_sweep_is_skipped_when_another_worker_holds_the_lock(monkeypatch, removed):
+    conn = _connect(monkeypatch, FakeConnection(["a"], expired=["a"], locked=False))
+    assert retention.sweep_once()["status"] == "skipped"
+    assert conn.documents == ["a"]
+    assert not any("pg_advisory_unlock" in s for s in conn.statements)
+
+
+def test_storage_report_shape(monkeypatch):
+    _connect(monkeypatch, FakeConnection(["a"] * 3 + ["b"]))
+    report = retention.storage_report(limit=10)
+
+    assert report["status"] == "ok"
+    assert (report["documents_total_bytes"], report["documents_table_bytes"],
+            report["documents_index_bytes"]) == (3000, 2000, 1000)
+    assert [t["token"] for t in report["tokens"]] == ["a", "b"]
+    assert set(report["tokens"][0]) == {"token", "filename", "rows", "bytes", "created_at",
+                                        "last_accessed_at", "ttl_seconds", "expires_at"}
+    assert report["tokens"][0]["rows"] == 3
+
+
+def test_storage_report_without_database(monkeypatch):
+    monkeypatch.setattr(retention, "get_connection", lambda: None)
+    assert retention.storage_report()["status"] == "error"
@@ -0,0 +1,60 @@
+import datetime
+import re
+
+import pytest
+
+from app.modules import rollup
+
+
+def _field(text: str, name: str) -> str:
+    return re.search(rf"{name}:([^,]+)", text).group(1)
+
+
+def test_parse_group_keys_validation():
+    assert rollup.parse_group_keys(" county , month ") == ["county", "month"]
+    for bad in ("", "city", "month,week", "county,county"):
+        with pytest.raises(ValueError):
+            rollup.parse_group_keys(bad)
+
+
+def test_county_month_groups_sum_to_source(subscriber_frame):
+    texts, metadata = rollup.build_rollup_documents(subscriber_frame, "county,month")
+    # 3 ilçe x 2 ay (60 gün: Ocak + Şubat)
+    assert len(texts) == len(metadata) == 6
+    assert sum(int(_field(t, "Abone")) for t in texts) == subscriber_frame["NUMBER_OF_SUBSCRIBER"].sum()
+
+    kadikoy_jan = subscriber_frame[
+        (subscriber_frame["SUBSCRIPTION_COUNTY"] == "Kadıköy")
+        & subscriber_frame["SUBSCRIPTION_DATE"].str.startswith("2024-01")
+    ]
+    index = metadata.index(("Kadıköy", datetime.date(2024, 1, 1), None))
+    text = texts[index]
+    assert _field(text, "Dönem") == "2024-01"
+    assert int(_field(text, "Abone")) == kadikoy_jan["NUMBER_OF_SUBSCRIBER"].sum()
+    assert int(_field(text, "Kayıt")) == len(kadikoy_jan)
+    # Tip grup anahtarı olmadığında yerli/yabancı dağılımı metne eklenir
+    yerli = kadikoy_jan.loc[kadikoy_jan["SUBSCRIBER_DOMESTIC_FOREIGN"] == "Yerli", "NUMBER_OF_SUBSCRIBER"].sum()
+    assert int(_field(text, "Yerli")) == yerli
+
+
+def test_shares_are_per_period(subscriber_frame):
+    texts, metadata = rollup.build_rollup_documents(subscriber_frame, "county,month")
+    for month in (datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)):
+        shares = [float(_field(t, "Pay").lstrip("%")) for t, m in zip(texts, metadata) if m[1] == month]
+        assert sum(shares) == pytest.approx(100, abs=0.2)
+
+
+def test_week_period_starts_on_monday(subscriber_frame):
+    _, metadata = rollup.build_rollup_documents(subscriber_frame, "week")
+    assert all(date.weekday() == 0 for _, date, _ in metadata)
+
+
+def test_type_dimension_without_period(subscriber_frame):
+    texts, metadata = rollup.build_rollup_documents(subscriber_frame, "type")
+    assert [m[2] for m in metadata] == ["Yabancı", "Yerli"]
+    assert all(m[1] is None for m in metadata)
+
+
+def test_missing_column_raises(subscriber_frame):
+    with pytest.raises(ValueError):
+        rollup.build_rollup_documents(subscriber_frame.drop(columns=["SUBSCRIPTION_COUNTY"]), "county")
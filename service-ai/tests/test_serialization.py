@@ -0,0 +1,26 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.modules import kpi
+from app.modules.serialization import FastJSONResponse
+
+
+def test_renders_numpy_and_pandas_values():
+    body = FastJSONResponse({
+        "total": np.int64(12),
+        "ratio": np.float32(0.5),
+        "series": np.arange(3),
+        "date": pd.Timestamp("2024-01-02"),
+        "by_year": {2024: 1},
+    }).body
+    assert json.loads(body) == {"total": 12, "ratio": 0.5, "series": [0, 1, 2],
+                                "date": "2024-01-02T00:00:00", "by_year": {"2024": 1}}
+
+
+def test_kpi_payload_needs_no_conversion(subscriber_frame):
+    payload = {"kpi": kpi.compute_kpi(subscriber_frame)}
+    rendered = json.loads(FastJSONResponse(payload).body)
+    assert rendered["kpi"]["total_subscribers"] == int(subscriber_frame["NUMBER_OF_SUBSCRIBER"].sum())
+    assert set(rendered["kpi"]["county_distribution"]) == {"Kadıköy", "Beşiktaş", "Şişli"}
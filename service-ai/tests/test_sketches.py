@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.modules import kpi, sketches
+
+
+def test_space_saving_exact_within_capacity():
+    rng = np.random.default_rng(0)
+    keys = rng.choice(["a", "b", "c", "d"], 10_000)
+    weights = rng.integers(1, 50, 10_000).astype(float)
+    sketch = sketches.SpaceSaving(capacity=8)
+    for start in range(0, len(keys), 1_000):
+        sketch.update(keys[start:start + 1_000], weights[start:start + 1_000])
+
+    expected = pd.Series(weights).groupby(keys).sum().sort_values(ascending=False)
+    assert sketch.top() == expected.to_dict()
+    assert list(sketch.top(2)) == list(expected.index[:2])
+    assert sketch.bounds()["exact"] and sketch.total == weights.sum()
+
+
+def test_space_saving_overflow_respects_error_bound():
+    rng = np.random.default_rng(1)
+    keys = np.concatenate([np.repeat(["heavy1", "heavy2"], 2_000), rng.integers(0, 500, 4_000).astype(str)])
+    rng.shuffle(keys)
+    weights = np.ones(len(keys))
+    sketch = sketches.SpaceSaving(capacity=20)
+    for start in range(0, len(keys), 500):
+        sketch.update(keys[start:start + 500], weights[start:start + 500])
+
+    truth = pd.Series(weights).groupby(keys).sum()
+    bounds = sketch.bounds()
+    assert not bounds["exact"]
+    assert list(sketch.top(2)) in (["heavy1", "heavy2"], ["heavy2", "heavy1"])
+    for key, estimate in sketch.counts.items():
+        # Tahmin gerçeğin altına düşmez, hata sınırı ve total/k garantisi aşılmaz
+        assert truth[key] <= estimate <= truth[key] + sketch.errors[key]
+        assert estimate - truth[key] <= bounds["guarantee"]
+
+
+def test_hyperloglog_estimate_within_error():
+    hll = sketches.HyperLogLog(precision=12)
+    for start in range(0, 50_000, 5_000):
+        # Tekrarlar kardinaliteyi değiştirmez
+        values = np.arange(start, start + 5_000).astype(str)
+        hll.update(values)
+        hll.update(values)
+    assert hll.estimate() == pytest.approx(50_000, rel=4 * hll.relative_error)
+
+    small = sketches.HyperLogLog()
+    small.update(["Kadıköy", "Şişli", "Kadıköy", None])
+    assert round(small.estimate()) == 2
+
+
+def test_running_stats_and_reservoir():
+    rng = np.random.default_rng(2)
+    values = rng.normal(50, 10, 20_000)
+    stats, reservoir = sketches.RunningStats(), sketches.Reservoir(size=5_000)
+    for chunk in np.array_split(values, 7):
+        stats.update(chunk)
+        reservoir.update(chunk)
+
+    summary = stats.summary()
+    assert summary["sum"] == pytest.approx(values.sum())
+    assert summary["std"] == pytest.approx(values.std(), abs=1e-3)
+    assert (summary["min"], summary["max"]) == (values.min(), values.max())
+    quantiles = reservoir.quantiles()
+    assert reservoir.values.size == 5_000 and reservoir.rank_error > 0
+    assert quantiles["p50"] == pytest.approx(np.median(values), abs=1.0)
+
+
+def test_report_sketch_matches_exact_kpi(frame_factory):
+    df = frame_factory(days=90)
+    sketch = sketches.ReportSketch("x.csv")
+    for start in range(0, len(df), 300):
+        sketch.update(df.iloc[start:start + 300])
+
+    snapshot = sketch.snapshot()
+    exact = kpi.compute_kpi(df)
+    assert snapshot["rows_processed"] == len(df)
+    assert snapshot["kpi"]["total_subscribers"] == exact["total_subscribers"]
+    assert snapshot["kpi"]["county_distribution"] == exact["county_distribution"]
+    assert snapshot["kpi"]["domestic_foreign_distribution"] == exact["domestic_foreign_distribution"]
+    assert snapshot["distinct"] == {"counties": 3, "dates": 90, "relative_error": pytest.approx(0.0081, abs=1e-4)}
+    assert snapshot["subscriber_stats"]["quantile_rank_error"] == 0
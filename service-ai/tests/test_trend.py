@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from app.modules import trend
+
+
+def test_daily_series_matches_groupby(subscriber_frame):
+    result = trend.compute_trend_series(subscriber_frame, "day")
+    expected = subscriber_frame.groupby("SUBSCRIPTION_DATE")["NUMBER_OF_SUBSCRIBER"].sum()
+    assert result["series"] == {k: int(v) for k, v in expected.items()}
+
+
+def test_monthly_total_is_preserved(subscriber_frame):
+    result = trend.compute_trend_series(subscriber_frame, "month")
+    assert list(result["series"]) == ["2024-01-01", "2024-02-01"]
+    assert sum(result["series"].values()) == subscriber_frame["NUMBER_OF_SUBSCRIBER"].sum()
+
+
+def test_weekly_buckets_start_on_monday(subscriber_frame):
+    labels = trend.compute_trend_series(subscriber_frame, "week")["series"]
+    assert all(pd.Timestamp(label).dayofweek == 0 for label in labels)
+
+
+def test_breakdown_sums_to_total(subscriber_frame):
+    result = trend.compute_trend_series(subscriber_frame, "week", group_by="county")
+    assert set(result["breakdown"]) == set(subscriber_frame["SUBSCRIPTION_COUNTY"])
+    for label, total in result["series"].items():
+        assert sum(series[label] for series in result["breakdown"].values()) == total
+
+
+def test_rolling_mean(subscriber_frame):
+    result = trend.compute_trend_series(subscriber_frame, "day", rolling=7)
+    totals = list(result["series"].values())
+    rolled = list(result["rolling"]["series"].values())
+    assert rolled[0] == totals[0]
+    assert rolled[10] == pytest.approx(sum(totals[4:11]) / 7, abs=0.01)
+
+
+def test_invalid_parameters_raise(subscriber_frame):
+    with pytest.raises(ValueError):
+        trend.compute_trend_series(subscriber_frame, "hour")
+    with pytest.raises(ValueError):
+        trend.compute_trend_series(subscriber_frame, "day", group_by="city")
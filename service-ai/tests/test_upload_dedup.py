@@ -0,0 +1,85 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+from fastapi import BackgroundTasks, UploadFile
+
+from app.modules import dataset_store, sketches, upload_cache
+from app.routes import analyze_optimized
+
+
+@pytest.fixture
+def upload(store_dir, monkeypatch):
+    """Database'siz upload: report_state ve repository çağrıları kaydedilir"""
+    calls = {"state": [], "touched": [], "parsed": 0}
+    for name in ("uploaded_data", "uploaded_hash", "current_token", "parse_sketch"):
+        monkeypatch.setattr(analyze_optimized, name, None)
+    monkeypatch.setattr(analyze_optimized, "embedding_status", {})
+
+    async def update(**fields):
+        calls["state"].append(fields)
+        return True
+
+    async def find_upload_token(file_hash, key):
+        return calls.get("existing")
+
+    async def touch_token(token, force=False):
+        calls["touched"].append((token, force))
+
+    def parse_file(filename, file_bytes, on_frame=None):
+        calls["parsed"] += 1
+        raise AssertionError("dedup eşleşmesinde senkron parse yapılmamalı")
+
+    monkeypatch.setattr(analyze_optimized.report_state, "update", update)
+    monkeypatch.setattr(analyze_optimized.repository, "find_upload_token", find_upload_token)
+    monkeypatch.setattr(analyze_optimized.repository, "touch_token", touch_token)
+    monkeypatch.setattr(analyze_optimized.parser, "parse_file", parse_file)
+
+    def run(content: bytes):
+        tasks = BackgroundTasks()
+        file = UploadFile(file=BytesIO(content), filename="abone.csv")
+        response = asyncio.run(analyze_optimized.upload_ultra_fast(
+            tasks, file, enable_ai=True, ttl_hours=None, chunking=None, group_by=None,
+            reduce_dim=None, reduce_method=None,
+        ))
+        return response, tasks
+
+    calls["run"] = run
+    return calls
+
+
+def _hash(content: bytes) -> str:
+    return asyncio.run(upload_cache.read_and_hash(UploadFile(file=BytesIO(content), filename="x")))[1]
+
+
+def test_dedup_hit_reactivates_token_without_encoding(upload, subscriber_frame):
+    content = b"ayni dosya"
+    dataset_store.save(_hash(content), subscriber_frame)
+    upload["existing"] = {"token": "eski-token", "row_count": len(subscriber_frame)}
+
+    response, tasks = upload["run"](content)
+
+    assert response["ai_status"] == "reused" and response["parsed"] is False
+    assert response["rows"] == len(subscriber_frame)
+    assert upload["parsed"] == 0
+    # Embedding/insert görevi kuyruğa alınmaz
+    assert tasks.tasks == []
+    assert upload["touched"] == [("eski-token", True)]
+    assert analyze_optimized.current_token == "eski-token"
+    assert analyze_optimized.embedding_status["status"] == "completed"
+    assert {"token": "eski-token"} in upload["state"]
+
+
+def test_large_dedup_hit_parses_in_background_only(upload, monkeypatch):
+    monkeypatch.setattr(sketches, "STREAMING_MIN_BYTES", 8)
+    upload["existing"] = {"token": "eski-token", "row_count": 10}
+
+    response, tasks = upload["run"](b"veri seti deposunda yok")
+
+    assert response["mode"] == "streaming_background" and response["ai_status"] == "reused"
+    assert upload["parsed"] == 0
+    # Arka plan parse'ı embedding başlatmaz (enable_ai=False)
+    [task] = tasks.tasks
+    assert task.func is analyze_optimized.background_parse_task
+    assert task.args[3] is False
+    assert analyze_optimized.current_token == "eski-token"
@@ -0,0 +1,185 @@
+"""
+Embedding shard araçları - modeli yeniden çalıştırmadan vektörleri tekrar kullanır.
+
+EMBEDDING_STORE_DIR ayarlıysa ingestion her token için vektörleri, documents.id değerlerini ve
+doküman metin/metadata'sını mmap edilebilir .npy shard'ları + manifest olarak yazar.
+Bu araçla:
+  - list:    shard'ı olan token'lar, satır/boyut ve disk kullanımı
+  - reload:  documents tablosunu shard'lardan aynı id'lerle yeniden doldur (şema değişikliği, backend taşıma)
+  - reindex: vektör index'ini yeniden kur (opsiyonel yeni ivfflat lists değeriyle)
+  - search:  PostgreSQL olmadan shard'lar üzerinde bellek içi arama
+
+Kullanım:
+    python -m tools.embedding_shards list
+    python -m tools.embedding_shards reload <token> --replace
+    python -m tools.embedding_shards reindex --lists 200
+    python -m tools.embedding_shards search <token> "Kadıköy ilçesinde Ocak 2024 abone sayısı" --k 5
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+import psycopg2.extras
+
+from app.modules import embedding_store, projection
+from app.modules.db import get_connection
+
+# Satırlar orijinal id'leriyle yazılır - shard'lar ve arama sonuçları DB ile eşleşmeye devam eder;
+# mevcut id'ler atlanır (yarıda kalan reload tekrar çalıştırılabilir)
+INSERT_SQL = """
+    INSERT INTO documents (id, token, filename, content, {column}, county, subscription_date, subscriber_type)
+    VALUES %s
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+"""
+# Yeni backend'e taşımada sequence geri kalmasın: sonraki insert'ler yüklenen id'lerle çakışmaz
+SYNC_SEQUENCE_SQL = """
+    SELECT setval(pg_get_serial_sequence('documents', 'id'), max_id)
+    FROM (SELECT MAX(id) AS max_id FROM documents) t
+    WHERE max_id > COALESCE(pg_sequence_last_value(pg_get_serial_sequence('documents', 'id')::regclass), 0)
+"""
+# Eksik token'ı varsayılan TTL ile sahiplen; mevcut TTL'e dokunma
+ADOPT_TOKEN_SQL = """
+    INSERT INTO report_tokens (token, filename) VALUES (%s, %s)
+    ON CONFLICT (token) DO NOTHING
+"""
+INDEX_NAME = "documents_embedding_idx"
+
+
+def command_list(args):
+    tokens = embedding_store.list_tokens()
+    if args.json:
+        print(json.dumps(tokens, ensure_ascii=False, indent=2))
+        return
+    print(f"📁 {embedding_store.EMBEDDING_STORE_DIR}: {len(tokens)} token")
+    for t in tokens:
+        print(f"{t['token']}  {t['rows']:>9} satır  {t['dim']:>4} boyut  {t['shards']:>3} shard  "
+              f"{t['bytes'] / 1024 ** 2:>8.1f} MB  {t['embedding_column']:<18} {t['filename']}")
+
+
+def command_reload(args):
+    info = embedding_store.manifest(args.token)
+    if info is None:
+        raise SystemExit(f"❌ Token için embedding shard'ı yok: {args.token}")
+    if info.get("version", 1) < 2:
+        raise SystemExit("❌ Shard'lar documents.id içermiyor (manifest v1) - token'ı yeniden yükleyin")
+    conn = get_connection()
+    if conn is None:
+        raise SystemExit("❌ Database bağlantısı yok")
+
+    start = time.time()
+    inserted = skipped = 0
+    try:
+        cur = conn.cursor()
+        cur.execute(ADOPT_TOKEN_SQL, (args.token, info["filename"]))
+        if args.replace:
+            cur.execute("DELETE FROM documents WHERE token = %s", (args.token,))
+            print(f"🗑️ Mevcut {cur.rowcount} satır silindi")
+        conn.commit()
+
+        sql = INSERT_SQL.format(column=info["embedding_column"])
+        for ids, vectors, documents in embedding_store.iter_shards(args.token, with_documents=True):
+            # Shard başına tek transaction - yarıda kalırsa tekrar çalıştırılabilir
+            rows = (
+                (int(doc_id), args.token, info["filename"], content, np.asarray(vector), *meta)
+                for doc_id, vector, (content, meta) in zip(ids, vectors, documents)
+            )
+            written = len(psycopg2.extras.execute_values(cur, sql, rows, page_size=args.page_size, fetch=True))
+            cur.execute(SYNC_SEQUENCE_SQL)
+            conn.commit()
+            inserted += written
+            skipped += len(documents) - written
+            print(f"💾 {inserted + skipped}/{info['rows']} satır işlendi ({inserted / (time.time() - start):.0f} kayıt/sn)")
+        if skipped:
+            print(f"⚠️ {skipped} satır atlandı: id'leri documents tablosunda zaten var (--replace ile önce silin)")
+
+        reducer = embedding_store.load_projection(args.token)
+        if reducer is not None:
+            projection.save(args.token, reducer)
+    finally:
+        conn.close()
+    print(f"✅ {inserted} satır {time.time() - start:.1f}s'de yüklendi (encode yok, id'ler korundu)")
+
+
+def command_reindex(args):
+    conn = get_connection()
+    if conn is None:
+        raise SystemExit("❌ Database bağlantısı yok")
+    # CONCURRENTLY ifadeleri transaction dışında çalışmalı
+    conn.autocommit = True
+    start = time.time()
+    try:
+        cur = conn.cursor()
+        if args.lists is None:
+            cur.execute(f"REINDEX INDEX CONCURRENTLY {INDEX_NAME}")
+        else:
+            lists = args.lists
+            if lists == 0:
+                # pgvector önerisi: 1M satıra kadar satır/1000, üstünde sqrt(satır)
+                cur.execute("SELECT COUNT(*) FROM documents WHERE embedding IS NOT NULL")
+                rows = cur.fetchone()[0]
+                lists = max(1, rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows)))
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+            cur.execute(f"""
+                CREATE INDEX CONCURRENTLY {INDEX_NAME}
+                ON documents USING ivfflat (embedding vector_cosine_ops)
+                WITH (lists = {int(lists)})
+            """)
+            print(f"🧭 ivfflat lists = {lists}")
+        cur.execute("ANALYZE documents")
+    finally:
+        conn.close()
+    print(f"✅ {INDEX_NAME} {time.time() - start:.1f}s'de yeniden oluşturuldu")
+
+
+def command_search(args):
+    # Sorgu encoder'ı yalnızca bu komutta yüklenir
+    from app.modules.rag_ultra_fast import ultra_processor
+
+    start = time.time()
+    searcher = embedding_store.ShardSearcher(args.token)
+    open_ms = (time.time() - start) * 1000
+    query = ultra_processor.batcher.encode([args.question], normalize_embeddings=True)
+    start = time.time()
+    hits = searcher.search(query, args.k)[0]
+    search_ms = (time.time() - start) * 1000
+    documents = searcher.documents([i for i, _ in hits])
+
+    print(f"🔎 {searcher.manifest['rows']} satır, {len(searcher.shards)} shard "
+          f"(açılış {open_ms:.1f}ms, arama {search_ms:.1f}ms)")
+    for rank, (doc_id, score) in enumerate(hits, 1):
+        print(f"{rank:>3}. [{doc_id}] {score:.4f}  {documents[doc_id][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding shard araçları")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="Shard'ı olan token'lar")
+    list_parser.add_argument("--json", action="store_true")
+    list_parser.set_defaults(func=command_list)
+
+    reload_parser = commands.add_parser("reload", help="documents tablosunu shard'lardan aynı id'lerle doldur")
+    reload_parser.add_argument("token")
+    reload_parser.add_argument("--replace", action="store_true", help="Token'ın mevcut satırlarını önce sil")
+    reload_parser.add_argument("--page-size", type=int, default=2000)
+    reload_parser.set_defaults(func=command_reload)
+
+    reindex_parser = commands.add_parser("reindex", help="Vektör index'ini yeniden kur")
+    reindex_parser.add_argument("--lists", type=int, help="Yeni ivfflat lists değeri (0 = satır sayısından hesapla)")
+    reindex_parser.set_defaults(func=command_reindex)
+
+    search_parser = commands.add_parser("search", help="Shard'lar üzerinde bellek içi arama")
+    search_parser.add_argument("token")
+    search_parser.add_argument("question")
+    search_parser.add_argument("--k", type=int, default=10)
+    search_parser.set_defaults(func=command_search)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
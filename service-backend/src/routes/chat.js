@@ -77,6 +77,70 @@ router.post('/', async (req, res) => {
   }
 });
 
+/**
+ * POST /chat/stream
+ * Gemini yanıtını Server-Sent Events olarak akıtır
+ */
+router.post('/stream', async (req, res) => {
+  const { message, includeDataContext = true } = req.body;
+
+  if (!message || typeof message !== 'string' || message.trim().length === 0) {
+    return res.status(400).json({
+      error: 'Geçersiz mesaj',
+      message: 'Mesaj boş olamaz ve string olmalıdır'
+    });
+  }
+
+  if (message.length > 1000) {
+    return res.status(400).json({
+      error: 'Mesaj çok uzun',
+      message: 'Mesaj 1000 karakterden kısa olmalıdır'
+    });
+  }
+
+  // İstemci bağlantıyı keserse AI servisine giden isteği de iptal et
+  const controller = new AbortController();
+  res.on('close', () => controller.abort());
+
+  try {
+    const stream = await aiService.streamChatWithGemini(message, includeDataContext, controller.signal);
+
+    // no-transform: compression middleware SSE'yi tamponlamasın
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      'Connection': 'keep-alive',
+      'X-Accel-Buffering': 'no'
+    });
+
+    stream.on('error', (error) => {
+      if (!controller.signal.aborted) {
+        console.error('Chat stream error:', error.message);
+      }
+      res.end();
+    });
+    stream.pipe(res);
+
+  } catch (error) {
+    if (controller.signal.aborted) return;
+
+    console.error('Chat stream endpoint error:', {
+      error: error.message,
+      status: error.status,
+      timestamp: new Date().toISOString()
+    });
+
+    await notificationService.notifyChatError(error.message);
+
+    res.status(error.status || 500).json({
+      success: false,
+      error: error.message || 'Chat isteği başarısız oldu',
+      details: error.details || 'Bilinmeyen hata oluştu',
+      timestamp: new Date().toISOString()
+    });
+  }
+});
+
 /**
  * GET /chat/status
  * Chat servisinin durumunu kontrol et
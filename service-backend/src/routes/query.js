@@ -132,13 +132,19 @@ router.post('/',
 
 /**
  * POST /api/query/batch
- * Process multiple queries at once
+ * Retrieve context for multiple queries about the same report at once.
+ * Each result carries the retrieved records in `context` (not a generated answer);
+ * queries with no matching records come back with success: false, in query order.
  */
 router.post('/batch',
   [
     body('queries')
       .isArray({ min: 1, max: 10 })
       .withMessage('1-10 arası sorgu gönderilebilir'),
+    body('top_k')
+      .optional()
+      .isInt({ min: 1, max: 50 })
+      .withMessage('top_k 1-50 arasında olmalı'),
     body('queries.*.query')
       .notEmpty()
       .withMessage('Her sorgu için query gerekli')
@@ -158,38 +164,38 @@ router.post('/batch',
 
     const { queries, report_id } = req.body;
 
+    // Tek istekte tek rapor sorgulanır - farklı report_id'ler reddedilir
+    const reportIds = [...new Set(queries.map(q => q.report_id || report_id).filter(Boolean))];
+    if (reportIds.length > 1) {
+      return res.status(400).json({
+        success: false,
+        error: true,
+        message: 'Geçersiz parametreler',
+        details: 'Toplu sorgudaki tüm sorular aynı rapora ait olmalı'
+      });
+    }
+    const reportId = reportIds[0] || null;
+
     console.log('📦 Toplu sorgu istendi:', { 
       queryCount: queries.length,
-      report_id 
+      report_id: reportId 
     });
 
     try {
-      // Process all queries
-      const queryPromises = queries.map(async (queryItem, index) => {
-        try {
-          const result = await aiService.queryReport(
-            queryItem.query, 
-            queryItem.report_id || report_id
-          );
-          return {
-            index,
-            query: queryItem.query,
-            success: true,
-            answer: result.answer || result.response || result,
-            confidence: result.confidence,
-            processingTime: result.processingTime
-          };
-        } catch (error) {
-          return {
-            index,
-            query: queryItem.query,
-            success: false,
-            error: error.message
-          };
-        }
-      });
+      // Tüm sorular tek istekte: AI servisi tek encode + tek SQL ile çözer
+      const { top_k: topK = 10 } = req.body;
+      const batchResponse = await aiService.queryBatch(queries.map(q => q.query), topK, reportId);
 
-      const results = await Promise.all(queryPromises);
+      const results = batchResponse.results.map((result, index) => ({
+        index,
+        query: queries[index].query,
+        reportId,
+        success: result.found,
+        ...(result.found
+          ? { context: result.context }
+          : { error: 'Bu soru için veri bulunamadı' }),
+        processingTime: batchResponse.processing_time_ms
+      }));
 
       const response = {
         totalQueries: queries.length,
@@ -208,7 +214,16 @@ router.post('/batch',
     } catch (error) {
       console.error('❌ Batch query hatası:', error.message);
 
-      res.status(500).json({
+      if (error.status === 404) {
+        return res.status(404).json({
+          success: false,
+          error: true,
+          message: 'Rapor bulunamadı',
+          details: `Report ID: ${reportId} bulunamadı`
+        });
+      }
+
+      res.status(error.status === 503 ? 503 : 500).json({
         success: false,
         error: true,
         message: 'Toplu sorgu işlenemedi',
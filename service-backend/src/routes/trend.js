@@ -7,6 +7,15 @@ import { asyncHandler } from '../middleware/errorHandler.js';
 
 const router = express.Router();
 
+// Gateway period değerleri -> AI servisi granularity değerleri
+const PERIOD_GRANULARITY = {
+  daily: 'day',
+  weekly: 'week',
+  monthly: 'month',
+  quarterly: 'quarter',
+  yearly: 'year'
+};
+
 /**
  * GET /api/trend/:reportId
  * Get trend analysis for a report
@@ -25,7 +34,19 @@ router.get('/:reportId',
     query('metrics')
       .optional()
       .isString()
-      .withMessage('Metrics string formatında olmalı')
+      .withMessage('Metrics string formatında olmalı'),
+    query('groupBy')
+      .optional()
+      .isIn(['county', 'type'])
+      .withMessage('groupBy değeri: county veya type olmalı'),
+    query('rolling')
+      .optional()
+      .isInt({ min: 2, max: 365 })
+      .withMessage('Rolling 2-365 arasında olmalı'),
+    query('maxPoints')
+      .optional()
+      .isInt({ min: 10, max: 10000 })
+      .withMessage('maxPoints 10-10000 arasında olmalı')
   ],
   asyncHandler(async (req, res) => {
     // Validation check
@@ -44,9 +65,16 @@ router.get('/:reportId',
 
     console.log('📊 Trend analizi istendi:', { reportId, period, metrics, ip: req.ip });
 
+    // Period açıkça verildiyse AI servisinde yeniden örnekle
+    const trendParams = {};
+    if (req.query.period) trendParams.granularity = PERIOD_GRANULARITY[req.query.period];
+    if (req.query.groupBy) trendParams.group_by = req.query.groupBy;
+    if (req.query.rolling) trendParams.rolling = req.query.rolling;
+    if (req.query.maxPoints) trendParams.max_points = req.query.maxPoints;
+
     try {
       // Get trends from AI service
-      const aiResponse = await aiService.getTrends(reportId);
+      const aiResponse = await aiService.getTrends(reportId, trendParams);
       
       console.log('🤖 AI trend yanıtı alındı:', {
         reportId,
@@ -118,7 +146,11 @@ router.get('/:reportId',
       // Success response - Verilen formata uygun yanıt
       const responseTrendData = aiResponse.trend || aiResponse;
       res.status(200).json({
-        trend: responseTrendData
+        trend: responseTrendData,
+        ...(aiResponse.granularity && { granularity: aiResponse.granularity }),
+        ...(aiResponse.breakdown && { breakdown: aiResponse.breakdown }),
+        ...(aiResponse.rolling && { rolling: aiResponse.rolling }),
+        ...(aiResponse.downsampled && { downsampled: aiResponse.downsampled })
       });
 
     } catch (error) {
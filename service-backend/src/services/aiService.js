@@ -103,11 +103,12 @@ class AIService {
   /**
    * Get trends for a report
    * @param {string} reportId - Report ID
+   * @param {Object} params - Optional trend params (granularity, group_by, rolling)
    * @returns {Promise<Object>} Trend data
    */
-  async getTrends(reportId) {
+  async getTrends(reportId, params = {}) {
     try {
-      const response = await this.client.get('/analyze/trend');
+      const response = await this.client.get('/analyze/trend', { params });
       return response.data;
     } catch (error) {
       throw this.handleError(error, 'Failed to get trends');
@@ -134,6 +135,28 @@ class AIService {
     }
   }
 
+  /**
+   * Retrieve context for many questions about the same report in one call
+   * @param {string[]} questions - User questions
+   * @param {number} topK - Records per question
+   * @param {string} reportId - Report ID (optional, must be the active report)
+   * @returns {Promise<Object>} Batch retrieval response, results in question order
+   */
+  async queryBatch(questions, topK = 10, reportId = null) {
+    try {
+      const payload = {
+        questions,
+        top_k: topK,
+        report_id: reportId
+      };
+
+      const response = await this.client.post('/analyze/query/batch', payload);
+      return response.data;
+    } catch (error) {
+      throw this.handleError(error, 'Batch query failed');
+    }
+  }
+
   /**
    * Get key insights from AI service
    * @param {string} reportId - Report identifier
@@ -195,6 +218,32 @@ class AIService {
     }
   }
 
+  /**
+   * Stream chat with Gemini AI as Server-Sent Events
+   * @param {string} message - User message
+   * @param {boolean} includeDataContext - Include data context in chat
+   * @param {AbortSignal} signal - Aborts the upstream request when the client disconnects
+   * @returns {Promise<Stream>} SSE byte stream
+   */
+  async streamChatWithGemini(message, includeDataContext = true, signal = undefined) {
+    try {
+      const payload = {
+        message,
+        include_data_context: includeDataContext,
+        stream: true
+      };
+
+      const response = await this.client.post('/analyze/chat', payload, {
+        responseType: 'stream',
+        timeout: 0, // Stream süresince zaman aşımı yok, iptal signal ile
+        signal
+      });
+      return response.data;
+    } catch (error) {
+      throw this.handleError(error, 'Chat stream request failed');
+    }
+  }
+
   /**
    * Check AI service health
    * @returns {Promise<Object>} Health status
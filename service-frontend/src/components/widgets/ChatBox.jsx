@@ -128,6 +128,7 @@ const ChatBox = ({ reportId, height = 400, ...props }) => {
     chatMessages, 
     isChatLoading, 
     addChatMessage, 
+    updateChatMessage,
     setChatLoading, 
     setChatError,
     clearChatError 
@@ -158,34 +159,46 @@ const ChatBox = ({ reportId, height = 400, ...props }) => {
     setError(null);
     clearChatError();
 
+    const aiMessageId = Date.now() + 1;
+    let aiMessageAdded = false;
+
     try {
-      // Use new Gemini chat API
-      const response = await reportAPI.chatWithGemini(input.trim(), true);
-      
-      const aiMessage = {
-        id: Date.now() + 1,
-        content: response.data?.response || response.response || 'I received your question but couldn\'t generate a response.',
-        isUser: false,
-        timestamp: new Date().toISOString(),
-        suggestions: response.data?.suggestions || response.suggestions || [],
-        metadata: {
-          dataContextIncluded: response.data?.data_context_included || response.data_context_included,
-          aiEmbeddingReady: response.data?.ai_embedding_ready || response.ai_embedding_ready
+      // Gemini yanıtını stream olarak al - ilk token geldiği anda göster
+      await reportAPI.chatWithGeminiStream(userMessage.content, true, {
+        onEvent: (event, payload) => {
+          if (event === 'meta') {
+            addChatMessage({
+              id: aiMessageId,
+              content: '',
+              isUser: false,
+              timestamp: new Date().toISOString(),
+              metadata: {
+                dataContextIncluded: payload.data_context_included,
+                aiEmbeddingReady: payload.ai_embedding_ready
+              }
+            });
+            aiMessageAdded = true;
+          } else if (event === 'token') {
+            setChatLoading(false);
+            updateChatMessage(aiMessageId, (message) => ({ content: message.content + payload.text }));
+          }
         }
-      };
-
-      addChatMessage(aiMessage);
+      });
 
     } catch (error) {
       console.error('Chat query error:', error);
       const errorMessage = {
-        id: Date.now() + 1,
+        id: aiMessageId,
         content: `Sorry, I encountered an error: ${error.message}. Please try again.`,
         isUser: false,
         timestamp: new Date().toISOString(),
       };
       
-      addChatMessage(errorMessage);
+      if (aiMessageAdded) {
+        updateChatMessage(aiMessageId, errorMessage);
+      } else {
+        addChatMessage(errorMessage);
+      }
       setError(error.message);
       setChatError(error.message);
       
@@ -6,6 +6,9 @@ const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api'
 
 console.log('🔗 API Base URL:', API_BASE_URL);
 
+// Trend grafiğinde gösterilecek maksimum nokta sayısı
+const TREND_MAX_POINTS = 1000;
+
 // Create axios instance for API calls
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -133,7 +136,10 @@ export const reportAPI = {
     console.log('📊 getTrends called with reportId:', reportId);
     
     try {
-      const response = await apiClient.get(`/trend/${reportId}`);
+      // Grafik piksel sayısından fazla nokta çizemez - sunucu tarafında örneklenir
+      const response = await apiClient.get(`/trend/${reportId}`, {
+        params: { maxPoints: TREND_MAX_POINTS }
+      });
       return response.data;
     } catch (error) {
       throw new Error(error.response?.data?.message || 'Failed to get trends');
@@ -207,6 +213,49 @@ export const reportAPI = {
     }
   },
 
+  // Chat with Gemini AI - Server-Sent Events ile token token yanıt
+  chatWithGeminiStream: async (message, includeDataContext = true, { onEvent, signal } = {}) => {
+    console.log('💬 chatWithGeminiStream called with message:', message.substring(0, 50) + '...');
+
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ message, includeDataContext }),
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const errorBody = await response.json().catch(() => ({}));
+      throw new Error(errorBody.error || errorBody.message || 'Chat request failed');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE olayları boş satırla ayrılır
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const rawEvent of events) {
+        let event = 'message';
+        let data = '';
+        rawEvent.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (event === 'error') throw new Error(payload.message || 'Chat request failed');
+        onEvent?.(event, payload);
+      }
+    }
+  },
+
   // Get all reports (optional - if backend provides this)
   getReports: async (page = 1, limit = 10) => {
     try {
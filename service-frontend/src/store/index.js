@@ -126,6 +126,13 @@ export const useDashboardStore = create(
       addChatMessage: (message) => set((state) => ({
         chatMessages: [...state.chatMessages, message]
       })),
+      updateChatMessage: (id, updates) => set((state) => ({
+        chatMessages: state.chatMessages.map((message) =>
+          message.id === id
+            ? { ...message, ...(typeof updates === 'function' ? updates(message) : updates) }
+            : message
+        )
+      })),
       setChatMessages: (chatMessages) => set({ chatMessages }),
       setChatLoading: (isChatLoading) => set({ isChatLoading }),
       setChatError: (chatError) => set({ chatError }),